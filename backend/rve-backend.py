@@ -2,6 +2,7 @@ import argparse
 import os
 import logging
 from src.RenderVideo import Render
+from src.FFmpeg import RenditionSpec
 
 from src.utils.Util import (
     checkForPytorchCUDA,
@@ -11,6 +12,7 @@ from src.utils.Util import (
     check_bfloat16_support,
     checkForDirectML,
     checkForDirectMLHalfPrecisionSupport,
+    parseResolution,
 
 )
 
@@ -74,7 +76,7 @@ class HandleApplication:
 
     def renderVideo(self):
         self.checkArguments()
-        Render(
+        renderSettings = dict(
                 # model settings
                 inputFile=self.args.input,
                 outputFile=self.args.output,
@@ -82,6 +84,8 @@ class HandleApplication:
                 interpolateFactor=self.args.interpolate_factor,
                 upscaleModel=self.args.upscale_model,
                 tile_size=self.args.tilesize,
+                auto_tile_size=self.args.auto_tilesize,
+                upscale_memory_bytes=self.args.upscale_memory * 1024**2,
                 # backend settings
                 device="default",
                 backend=self.args.backend,
@@ -95,7 +99,7 @@ class HandleApplication:
                 benchmark=self.args.benchmark,
                 custom_encoder=self.args.custom_encoder,
                 # misc settingss
-                pausedFile=self.args.paused_file,
+                control_address=self.args.control_address,
                 sceneDetectMethod=self.args.scene_detect_method,
                 sceneDetectSensitivity=self.args.scene_detect_threshold,
                 sharedMemoryID=self.args.shared_memory_id,
@@ -105,8 +109,32 @@ class HandleApplication:
                 slomo_mode=self.args.slomo_mode,
                 dynamic_scaled_optical_flow=self.args.dynamic_scaled_optical_flow,
                 ensemble=self.args.ensemble,
+                transport_format=self.args.transport_format,
+                order=self.args.order,
+                upscale_batch_size=self.args.upscale_batch_size,
+                interpolate_batch_size=self.args.interpolate_batch_size,
+                skip_duplicate_frames=self.args.skip_duplicate_frames,
+                duplicate_threshold=self.args.duplicate_threshold,
+                cadence_interpolation=self.args.cadence_interpolation,
+                motion_gate=self.args.motion_gate,
+                exact_frame_count=self.args.exact_frame_count,
+                checkpoint_interval=self.args.checkpoint_interval,
+                start=self.args.start,
+                end=self.args.end,
+                queue_memory_bytes=self.args.queue_memory * 1024**2 or None,
+                queue_memory_fraction=self.args.queue_memory_fraction,
+                trace_file=self.args.trace,
+                renditions=[
+                    RenditionSpec.fromString(spec) for spec in self.args.rendition
+                ],
             )
-        
+        if self.args.segments > 1:
+            from src.SegmentedRender import SegmentedRender
+
+            SegmentedRender(segments=self.args.segments, **renderSettings)
+        else:
+            Render(**renderSettings)
+
     def handleArguments(self) -> argparse.ArgumentParser:
         """_summary_
 
@@ -159,7 +187,7 @@ class HandleApplication:
         )
         parser.add_argument(
             "--interpolate_factor",
-            help="Multiplier for interpolation, will round up to nearest integer for interpolation but the fps will be correct",
+            help="Multiplier for the framerate when interpolating, can be fractional, ex: 2.5 for 24 to 60fps. Only the frames that land on the output framerate are interpolated.",
             type=float,
             default=1.0,
         )
@@ -230,6 +258,18 @@ class HandleApplication:
             default=0,
             type=int,
         )
+        parser.add_argument(
+            "--auto_tilesize",
+            help="Pick the largest tile size and batch size that fit in memory by probing the upscale model, overrides --tilesize. The result is cached next to the model, per device, precision and resolution. Only with the pytorch and tensorrt backends.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--upscale_memory",
+            help="Memory in MB --auto_tilesize can use, VRAM or RAM when rendering on the cpu. A safety margin is kept on top of it. (default=0, the memory that is free when the model is loaded)",
+            type=int,
+            default=0,
+        )
         parser.add_argument(
             "--benchmark",
             help="Benchmark without saving video",
@@ -271,14 +311,119 @@ class HandleApplication:
             action="store_true",
         )
         parser.add_argument(
-            "--paused_file",
-            help="File to store paused state (True means paused, False means unpaused)",
+            "--control_address",
+            help="Unix socket path or windows named pipe to serve the render controls (pause, resume, cancel, set_queue_memory, status) and JSON status events on.",
             type=str,
             default=None,
         )
+        parser.add_argument(
+            "--transport_format",
+            help="Pixel format frames are sent through the ffmpeg pipes in. yuv420p/nv12 halves pipe bandwidth and converts colors on the device, only works with the pytorch and tensorrt backends.",
+            default="rgb24",
+            choices=["rgb24", "yuv420p", "nv12"],
+            type=str,
+        )
+        parser.add_argument(
+            "--order",
+            help="Order of the models when both upscaling and interpolating. auto times both models on a blank frame and picks the cheaper order, upscale_first interpolates at the upscaled resolution and is only supported with the pytorch and tensorrt backends. (default=auto)",
+            default="auto",
+            choices=["auto", "interpolate_first", "upscale_first"],
+            type=str,
+        )
+        parser.add_argument(
+            "--upscale_batch_size",
+            help="Frames upscaled per forward pass when upscaling without interpolation (or upscaling first), only with the pytorch backend and without tiling. 0 picks the largest batch that fits in the free device memory, up to 8. With --benchmark the throughput of every batch size up to it is printed. (default=1, no batching)",
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--interpolate_batch_size",
+            help="Timesteps of a frame pair interpolated in one forward pass with RIFE on pytorch or tensorrt, the two frames are shared by the batch. 0 picks as many as a pair has, up to what fits in the free device memory, 1 interpolates one timestep at a time. TensorRT builds a separate engine for every batch size. (default=1)",
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--skip_duplicate_frames",
+            help="Write the previous output again for frames that are the same as the frame before them, instead of running the models on them. Speeds up animation and screen captures.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--duplicate_threshold",
+            help="Largest difference (0-255) between the thumbnails of two frames that still counts as a duplicate with --skip_duplicate_frames or --cadence_interpolation. (default=2)",
+            type=float,
+            default=2.0,
+        )
+        parser.add_argument(
+            "--cadence_interpolation",
+            help="For animation drawn on twos or threes, interpolate only between distinct drawings and spread the in-betweens evenly over the frames each drawing is held for, instead of repeating the held frames. The output frame count is unchanged.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--motion_gate",
+            help="Measure how much moves between every pair of frames with SSIM on a small copy of both. Near static pairs are blended linearly instead of running the interpolation model, pairs with little motion run the optical flow at half scale (RIFE and GMFSS on pytorch). Speeds up talking heads and static camera footage, only works with the pytorch and tensorrt backends.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--exact_frame_count",
+            help="Count every packet of the video stream with ffprobe to get an exact frame count, slower to start but correct for variable framerate and mkv input.",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--segments",
+            help="Split the video at keyframes and render this many segments in parallel processes, each with its own encoder. Every process loads its own copy of the models. (default=1, disabled)",
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--start",
+            help="Only render from this point of the video, as a frame index with an f suffix (240f), seconds (12.5), or a timestamp ([HH:]MM:SS[.ms]). The audio and subtitles are trimmed to match.",
+            type=str,
+            default=None,
+        )
+        parser.add_argument(
+            "--end",
+            help="Stop rendering at this point of the video (exclusive), in the same format as --start.",
+            type=str,
+            default=None,
+        )
+        parser.add_argument(
+            "--queue_memory",
+            help="Memory in MB the queued input and output frames can use, a larger budget absorbs more decoder and encoder jitter. (default=0, use --queue_memory_fraction)",
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            "--queue_memory_fraction",
+            help="Fraction of the available memory the queued frames can use if --queue_memory is not set. (default=0.25)",
+            type=float,
+            default=0.25,
+        )
+        parser.add_argument(
+            "--trace",
+            help="Time every pipeline stage (decode, scene detection, copies, models, encode and the queue waits between them), write the spans to this file as a chrome trace (open in ui.perfetto.dev) and print a p50/p95 summary at the end.",
+            type=str,
+            default=None,
+        )
+        parser.add_argument(
+            "--rendition",
+            help="Encode an extra output from the same rendered frames, can be used multiple times. Format: output=path,encoder=preset,crf=value,resolution=WxH, anything but output defaults to the main output settings. Ex: --rendition output=out_1080p.mp4,encoder=libx264,crf=20,resolution=1920x1080",
+            action="append",
+            default=[],
+            type=str,
+        )
+        parser.add_argument(
+            "--checkpoint_interval",
+            help="Encode the output in chunks of this many seconds of input, and keep them next to the output, so a crashed, closed or paused render continues where it stopped when it is started again with the same settings. (default=0, disabled)",
+            type=float,
+            default=0,
+        )
         parser.add_argument(
             "--upscale_output_resolution",
-            help="Resolution of output video, this is helpful for 4x models when you only want 2x upscaling. Ex: (1920x1080)",
+            help="Resolution of output video, this is helpful for 4x models when you only want 2x upscaling. With the pytorch and tensorrt backends the upscaled frames are resized on the device, otherwise the encoder scales them. Ex: (1920x1080)",
             type=str,
             default=None,
         )
@@ -297,6 +442,53 @@ class HandleApplication:
             raise os.error("Output file already exists!")
         if not os.path.isfile(self.args.input):
             raise os.error("Input file does not exist!")
+        if self.args.segments < 1:
+            raise ValueError("Segments must be at least 1")
+        if self.args.segments > 1 and (
+            self.args.benchmark or self.args.output == "PIPE"
+        ):
+            raise ValueError("Segmented rendering needs an output file")
+        if self.args.rendition and (
+            self.args.benchmark
+            or self.args.output == "PIPE"
+            or self.args.segments > 1
+            or self.args.checkpoint_interval > 0
+        ):
+            raise ValueError(
+                "Renditions can not be used with benchmark, PIPE output, segments or checkpoints"
+            )
+        for spec in self.args.rendition:
+            rendition = RenditionSpec.fromString(spec)
+            if os.path.isfile(rendition.outputFile) and not self.args.overwrite:
+                raise os.error(f"Rendition output {rendition.outputFile} already exists!")
+        if self.args.queue_memory < 0:
+            raise ValueError("Queue memory must be at least 0")
+        if not 0 < self.args.queue_memory_fraction <= 1:
+            raise ValueError("Queue memory fraction must be between 0 and 1")
+        if self.args.checkpoint_interval < 0:
+            raise ValueError("Checkpoint interval must be at least 0")
+        if self.args.checkpoint_interval > 0 and self.args.segments > 1:
+            raise ValueError("Checkpoints can not be used with segmented rendering")
+        if self.args.upscale_output_resolution is not None:
+            width, height = parseResolution(self.args.upscale_output_resolution)
+            if width % 2 or height % 2:
+                raise ValueError("Upscale output resolution must be even")
+        if self.args.cadence_interpolation and not self.args.interpolate_model:
+            raise ValueError("Cadence interpolation needs an interpolation model")
+        if self.args.cadence_interpolation and self.args.segments > 1:
+            raise ValueError("Cadence interpolation can not be used with segmented rendering")
+        if self.args.motion_gate and not self.args.interpolate_model:
+            raise ValueError("Motion gate needs an interpolation model")
+        if self.args.motion_gate and self.args.backend not in ("pytorch", "tensorrt"):
+            raise ValueError("Motion gate only works with the pytorch and tensorrt backends")
+        if self.args.duplicate_threshold < 0:
+            raise ValueError("Duplicate threshold must be at least 0")
+        if self.args.upscale_memory < 0:
+            raise ValueError("Upscale memory must be at least 0")
+        if self.args.interpolate_batch_size < 0:
+            raise ValueError("Interpolate batch size must be at least 0")
+        if self.args.upscale_batch_size < 0:
+            raise ValueError("Upscale batch size must be at least 0")
         if self.args.tilesize < 0:
             raise ValueError("Tilesize must be greater than 0")
         if self.args.interpolate_factor < 0:
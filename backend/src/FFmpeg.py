@@ -12,7 +12,25 @@ from .constants import CWD, FFMPEG_PATH, FFMPEG_LOG_FILE
 from .utils.Util import (
     log,
     printAndLog,
+    removeFile,
+    bytesToImg,
+    transportFrameSize,
+    parseFramePosition,
+    parseResolution,
+    getProcessMemory,
 )
+from .utils.FramePool import FramePool, StagedFrame
+from .utils.ByteBudgetQueue import ByteBudgetQueue, getQueueMemoryBudget
+from .utils.MediaProbe import (
+    probeVideo,
+    getSeekTime,
+    getFrameTime,
+    getFFprobePath,
+    VideoMetadata,
+)
+from .utils.Checkpoint import RenderCheckpoint, ChunkBoundary
+from .utils.Tracer import TRACER
+from .utils.Timeline import OutputTimeline
 from threading import Thread
 
 
@@ -119,6 +137,169 @@ class EncoderSettings:
 
 
    
+def getTrimArguments(start: float = None, duration: float = None) -> list[str]:
+    """Input side trim of the file the audio and subtitles are copied from"""
+    arguments = []
+    if start:
+        arguments += ["-ss", f"{start:.6f}"]
+    if duration is not None:
+        arguments += ["-t", f"{duration:.6f}"]
+    return arguments
+
+
+def getFFmpegConcatCommand(
+    concatFile: str,
+    outputFile: str,
+    inputFile: str = None,
+    audio_encoder: EncoderSettings = None,
+    audio_bitrate: str = "192k",
+    overwrite: bool = False,
+    inputStart: float = None,
+    inputDuration: float = None,
+) -> list[str]:
+    """
+    Joins video segments listed in a concat demuxer file without re-encoding them.
+    If inputFile is given, its audio and subtitle streams are muxed into the output,
+    trimmed to inputStart and inputDuration when the video only covers part of the input.
+    """
+    command = [
+        f"{FFMPEG_PATH}",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        concatFile,
+    ]
+    if inputFile is not None:
+        command += getTrimArguments(inputStart, inputDuration)
+        command += [
+            "-i",
+            f"{inputFile}",
+            "-map",
+            "0:v",
+            "-map",
+            "1:a?",
+            "-map",
+            "1:s?",
+            "-c:a",
+            audio_encoder.getPostInputSettings(),
+            "-b:a",
+            audio_bitrate,
+            "-c:s",
+            "copy",
+        ]
+    command += [
+        "-c:v",
+        "copy",
+        "-loglevel",
+        "error",
+        f"{outputFile}",
+    ]
+    if overwrite:
+        command.append("-y")
+    return command
+
+
+def concatVideoSegments(segmentFiles: list[str], concatFile: str, **kwargs):
+    """
+    Writes the concat demuxer file and runs ffmpeg, kwargs are passed to getFFmpegConcatCommand
+    """
+    with open(concatFile, "w") as f:
+        for segmentFile in segmentFiles:
+            escaped = os.path.abspath(segmentFile).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = getFFmpegConcatCommand(concatFile, **kwargs)
+    log("FFMPEG CONCAT COMMAND: " + str(command))
+    with open(FFMPEG_LOG_FILE, "a") as f:
+        subprocess.run(command, stdout=f, stderr=f, check=True)
+
+
+@dataclass
+class RenditionSpec:
+    """
+    An extra output encoded from the same rendered frames as the main output.
+    Settings left as None are taken from the main output.
+    """
+
+    outputFile: str
+    video_encoder_preset: str = None
+    crf: str = None
+    resolution: str = None  # WxH, ex: 1920x1080
+
+    @staticmethod
+    def fromString(spec: str) -> "RenditionSpec":
+        """Parses output=path,encoder=preset,crf=value,resolution=WxH, only output is required"""
+        keys = {
+            "output": "outputFile",
+            "encoder": "video_encoder_preset",
+            "crf": "crf",
+            "resolution": "resolution",
+        }
+        settings = {}
+        for item in spec.split(","):
+            key, _, value = item.partition("=")
+            if key.strip() not in keys:
+                raise ValueError(f"Unknown rendition setting: {key}")
+            settings[keys[key.strip()]] = value.strip()
+        if "outputFile" not in settings:
+            raise ValueError(f"Rendition has no output: {spec}")
+        return RenditionSpec(**settings)
+
+
+class RenditionWriter:
+    """
+    Feeds one rendition encoder from its own bounded queue on its own thread,
+    so a slow encoder only blocks the main writer once its queue is full.
+    Read pool slots put on the queue are released after every frame before them was written.
+    """
+
+    def __init__(self, spec: RenditionSpec, command: list[str], readPool: FramePool, maxQueueBytes: int):
+        self.spec = spec
+        self.command = command
+        self.readPool = readPool
+        self.queue = ByteBudgetQueue(maxQueueBytes)
+        self.failed = False
+        self.thread = Thread(target=self.writeFrames, name=f"rendition {spec.outputFile}")
+
+    def start(self, logFile):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stderr=logFile,
+            stdout=logFile,
+        )
+        self.thread.start()
+
+    def writeFrames(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if isinstance(frame, int):
+                self.readPool.release(frame)
+                continue
+            if self.failed:
+                # keep draining, so the main output is not blocked by a broken rendition
+                continue
+            try:
+                with TRACER.span("encode.rendition"):
+                    self.process.stdin.write(frame)
+            except (BrokenPipeError, OSError) as e:
+                printAndLog(f"\nERROR: Rendition {self.spec.outputFile} failed: {e}")
+                self.failed = True
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        if self.process.wait() != 0:
+            self.failed = True
+
+    def finish(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
 class FFMpegRender:
     """Args:
         inputFile (str): The path to the input file.
@@ -184,7 +365,23 @@ class FFMpegRender:
         sharedMemoryID: str = None,
         channels=3,
         upscale_output_resolution: str = None,
+        frames_resized: bool = False,
         slowmo_mode: bool = False,
+        queue_memory_bytes: int = None,
+        queue_memory_fraction: float = 0.25,
+        transport_format: str = "rgb24",
+        start_time: float = None,
+        frame_count: int = None,
+        timeline_offset: int = 0,
+        overlap_last_frame: bool = False,
+        merge_streams: bool = True,
+        progress_value=None,
+        checkpoint_interval: float = 0,
+        checkpoint_settings: dict = None,
+        start: str = None,
+        end: str = None,
+        renditions: list[RenditionSpec] = None,
+        trace_file: str = None,
     ):
         """
         Generates FFmpeg I/O commands to be used with VideoIO
@@ -196,6 +393,23 @@ class FFMpegRender:
         custom_encoder: str, The exact name of the encoder ffmpeg will use (default=libx264)
         pixelFormat: str, The pixel format ffmpeg will use, (default=yuv420p)
         overwrite: bool, overwrite existing output file if it exists
+        queue_memory_bytes: int, memory shared by the input frame pool and the output queues, overrides queue_memory_fraction
+        queue_memory_fraction: float, fraction of the available memory used for the queues if queue_memory_bytes is not set
+        transport_format: str, pixel format of the raw frames on the ffmpeg pipes (rgb24/yuv420p/nv12)
+        start_time: float, position in seconds the decoder seeks to before reading frames
+        frame_count: int, number of frames to read from start_time, reads to the end of the video if None
+        timeline_offset: int, input frames between the start of the whole render and start_time, keeps the output frames of a segment on the same grid as the rest
+        overlap_last_frame: bool, the last frame is only read as the target of the interpolation, the next segment writes it
+        merge_streams: bool, copy the audio and subtitle streams of the input into the output
+        progress_value: multiprocessing.Value, incremented for every written frame, used to report progress across processes
+        checkpoint_interval: float, seconds of input between checkpoints, the output is encoded in chunks that a new process can resume from, 0 disables it
+        checkpoint_settings: dict, everything that affects the output, a checkpoint made with different settings is discarded
+        start: str, first frame to render, as a frame index with an f suffix (240f), seconds, or a timestamp ([HH:]MM:SS[.ms])
+        end: str, frame to stop rendering at (exclusive), in the same format as start
+        renditions: list[RenditionSpec], extra outputs encoded from the same frames, the model only runs once for all of them
+        trace_file: str, enables tracing of every pipeline stage, and writes the spans to this file as a chrome trace
+        upscale_output_resolution: str, WxH of the output video, ex: 1920x1080 for a 4x model on 480p input
+        frames_resized: bool, the written frames are already at upscale_output_resolution, otherwise the encoder scales them
         """
         self.inputFile = inputFile
         self.outputFile = outputFile
@@ -204,6 +418,8 @@ class FFMpegRender:
         self.upscaleTimes = upscaleTimes
         self.interpolateFactor = interpolateFactor
         self.ceilInterpolateFactor = math.ceil(self.interpolateFactor)
+        # the model is only asked for the timesteps an output frame lands on, so 2.5x writes exactly 2.5 frames per input frame
+        self.timeline = OutputTimeline(interpolateFactor)
 
         if custom_encoder is None: # custom_encoder overrides these presets
             self.video_encoder = EncoderSettings(video_encoder_preset)
@@ -222,31 +438,174 @@ class FFMpegRender:
         self.audio_bitrate = audio_bitrate
         self.sharedMemoryID = sharedMemoryID
         self.upscale_output_resolution = upscale_output_resolution
+        # frames on the write pipe are at the scale of the model, unless the upscaler already resized them,
+        # otherwise the encoder scales them to upscale_output_resolution
+        self.pipeWidth = self.width * self.upscaleTimes
+        self.pipeHeight = self.height * self.upscaleTimes
+        self.outputResolution = None
+        if upscale_output_resolution is not None:
+            if frames_resized:
+                self.pipeWidth, self.pipeHeight = parseResolution(
+                    upscale_output_resolution
+                )
+            else:
+                self.outputResolution = upscale_output_resolution
+        self.transport_format = transport_format
+        self.start_time = start_time
+        self.frame_count = frame_count
+        # the first decoded frame is at firstFrameIndex + timelineOffset on the output timeline
+        self.timelineOffset = timeline_offset
+        # the last frame only gives the interpolation model its target, the next segment writes it
+        self.overlap_last_frame = overlap_last_frame
+        self.merge_streams = merge_streams
+        self.progress_value = progress_value
+        self.trace_file = trace_file
+        if trace_file is not None:
+            TRACER.enable()
+        # state that can be changed from the control server
+        self.isPaused = False
+        self.cancelled = False
+        self.controlServer = None
+        # per stage counters for the status events
+        self.framesDecoded = 0
+        self.framesProcessed = 0
+        self.framesSkipped = 0
+        if frame_count is not None:
+            self.totalInputFrames = frame_count
+
+        # index of the first decoded frame in the input, and whether that frame was already written by a previous run
+        self.firstFrameIndex = 0
+        self.overlap_first_frame = False
+        # part of the input the audio and subtitles are copied from, the whole file if None
+        self.trimStart = None
+        self.trimDuration = None
+        if start is not None or end is not None:
+            self.setupFrameRange(start, end)
+
+        self.checkpoint = None
+        self.checkpointFrames = 0
+        if checkpoint_interval > 0 and not self.benchmark and self.outputFile != "PIPE":
+            self.setupCheckpoint(checkpoint_interval, checkpoint_settings or {})
 
         self.subtitleFiles = []
         self.sharedMemoryThread = Thread(
             target=lambda: self.writeOutInformation(self.outputFrameChunkSize)
         )
-        self.inputFrameChunkSize = self.width * self.height * channels
-        self.outputFrameChunkSize = (
-            self.width * self.upscaleTimes * self.height * self.upscaleTimes * channels
+        self.inputFrameChunkSize = transportFrameSize(
+            self.width, self.height, self.transport_format
         )
+        # the preview is always rgb, regardless of what is sent over the pipes
+        self.outputFrameChunkSize = self.pipeWidth * self.pipeHeight * channels
         self.shm = shared_memory.SharedMemory(
             name=self.sharedMemoryID, create=True, size=self.outputFrameChunkSize
         )
-        self.totalOutputFrames = self.totalInputFrames * self.ceilInterpolateFactor
+        firstPosition = self.firstFrameIndex + self.timelineOffset
+        self.totalOutputFrames = self.timeline.frameCount(
+            firstPosition,
+            firstPosition + self.totalInputFrames - 1,
+            writeStart=not self.overlap_first_frame,
+            writeEnd=not self.overlap_last_frame,
+        )
 
         self.writeOutPipe = self.outputFile == "PIPE"
 
-        self.readQueue = queue.Queue(maxsize=50)
-        self.writeQueue = queue.Queue(maxsize=50)
+        # the read queue carries slot indices of the frame pool, the pool itself limits how many frames are in flight
+        # output frames are upscaled, so they get most of the budget, the read pool only has to absorb decoder jitter
+        queueMemory = getQueueMemoryBudget(queue_memory_bytes, queue_memory_fraction)
+        self.readPool = FramePool(self.inputFrameChunkSize, queueMemory // 4)
+        self.readQueue = queue.Queue()
+        # renditions keep references to the same frames, so they split the output budget with the write queue
+        writeQueueMemory = (queueMemory - queueMemory // 4) // (len(renditions or []) + 1)
+        self.writeQueue = ByteBudgetQueue(writeQueueMemory)
+        log(
+            f"Queue memory: {queueMemory // 1024**2}MB, read pool slots: {self.readPool.numSlots}"
+        )
 
-    def getVideoProperties(self, inputFile: str = None):
+        self.renditionWriters = [
+            RenditionWriter(
+                spec,
+                self.getFFmpegWriteCommand(
+                    outputFile=spec.outputFile,
+                    videoEncoder=(
+                        EncoderSettings(spec.video_encoder_preset)
+                        if spec.video_encoder_preset is not None
+                        else None
+                    ),
+                    crf=spec.crf,
+                    resolution=spec.resolution,
+                ),
+                self.readPool,
+                writeQueueMemory,
+            )
+            for spec in (renditions or [])
+        ]
+
+    def setupFrameRange(self, start: str | None, end: str | None):
+        startFrame = parseFramePosition(start, self.fps) if start is not None else 0
+        endFrame = (
+            parseFramePosition(end, self.fps) if end is not None else self.totalInputFrames
+        )
+        endFrame = min(endFrame, self.totalInputFrames)
+        if not 0 <= startFrame < endFrame:
+            raise ValueError(
+                f"Invalid frame range {startFrame}-{endFrame}, the video has {self.totalInputFrames} frames"
+            )
+        printAndLog(f"Rendering frames {startFrame} to {endFrame}")
+        self.firstFrameIndex = startFrame
+        self.timelineOffset -= startFrame
+        self.frame_count = endFrame - startFrame
+        self.totalInputFrames = self.frame_count
+        if startFrame > 0:
+            self.start_time = getSeekTime(self.inputFile, startFrame, self.fps)
+            self.trimStart = getFrameTime(self.inputFile, startFrame, self.fps)
+        self.trimDuration = self.frame_count / self.fps
+
+    def setupCheckpoint(self, checkpoint_interval: float, checkpoint_settings: dict):
+        self.checkpoint = RenderCheckpoint(self.outputFile, checkpoint_settings)
+        self.checkpointFrames = max(1, round(checkpoint_interval * self.fps))
+        resumeFrame = self.checkpoint.completedFrames
+        if resumeFrame == 0:
+            return
+        printAndLog(f"Resuming render from frame {resumeFrame}")
+        # the interpolation between the last written frame and the next one still has to be done,
+        # so decode the last written frame again, without writing it
+        self.overlap_first_frame = self.ceilInterpolateFactor > 1
+        skippedFrames = (
+            resumeFrame - 1 if self.overlap_first_frame else resumeFrame
+        ) - self.firstFrameIndex
+        self.firstFrameIndex += skippedFrames
+        self.start_time = getSeekTime(self.inputFile, self.firstFrameIndex, self.fps)
+        self.totalInputFrames = max(self.totalInputFrames - skippedFrames, 0)
+        if self.frame_count is not None:
+            self.frame_count = self.totalInputFrames
+
+    def getVideoProperties(self, inputFile: str = None, countPackets: bool = False):
         log("Getting Video Properties...")
         if inputFile is None:
-            cap = cv2.VideoCapture(self.inputFile)
+            inputFile = self.inputFile
+        self.videoMetadata: VideoMetadata | None = None
+        if getFFprobePath() is None:
+            printAndLog(
+                "WARN: ffprobe was not found in bin or on PATH, falling back to opencv. Frame counts may be inaccurate, reinstall the dependencies to fix this."
+            )
         else:
-            cap = cv2.VideoCapture(inputFile)
+            try:
+                self.videoMetadata = probeVideo(inputFile, countPackets=countPackets)
+            except Exception as e:
+                log(f"ffprobe failed, falling back to opencv: {e}")
+        if self.videoMetadata is not None:
+            self.width = self.videoMetadata.width
+            self.height = self.videoMetadata.height
+            self.totalInputFrames = self.videoMetadata.totalFrames
+            self.fps = self.videoMetadata.fps
+            if self.videoMetadata.isVFR:
+                printAndLog(
+                    "Variable framerate input detected, output will be constant framerate at the average fps."
+                )
+            self.outputFrameChunkSize = None
+            return
+
+        cap = cv2.VideoCapture(inputFile)
         if not cap.isOpened():
             print("Error: Could not open video.")
             exit()
@@ -260,14 +619,24 @@ class FFMpegRender:
 
     def getFFmpegReadCommand(self):
         log("Generating FFmpeg READ command...")
-        command = [
-            f"{FFMPEG_PATH}",
+        command = [f"{FFMPEG_PATH}"]
+        if self.start_time is not None:
+            command += ["-ss", f"{self.start_time:.6f}"]
+        command += [
             "-i",
             f"{self.inputFile}",
+        ]
+        if self.frame_count is not None:
+            command += ["-frames:v", str(self.frame_count)]
+        if self.transport_format != "rgb24":
+            # yuv frames would otherwise keep the matrix and range of the source, usually bt709 for hd,
+            # the device conversion expects bt601 limited range, which is also what the rgb24 pipe is encoded with
+            command += ["-vf", "scale=out_color_matrix=bt601:out_range=tv"]
+        command += [
             "-f",
             "image2pipe",
             "-pix_fmt",
-            "rgb24",
+            self.transport_format,
             "-vcodec",
             "rawvideo",
             "-s",
@@ -276,18 +645,43 @@ class FFMpegRender:
         ]
         return command
 
-    def getFFmpegWriteCommand(self):
+    def getFFmpegWriteCommand(
+        self,
+        outputFile: str = None,
+        mergeStreams: bool = None,
+        overwrite: bool = None,
+        videoEncoder: EncoderSettings = None,
+        crf: str = None,
+        resolution: str = None,
+    ):
+        """
+        The defaults are the settings of the main output, renditions override the encoder, crf and resolution.
+        """
         log("Generating FFmpeg WRITE command...")
+        # an explicit encoder preset replaces the custom encoder
+        customEncoder = self.custom_encoder if videoEncoder is None else None
+        if videoEncoder is None and customEncoder is None:
+            videoEncoder = self.video_encoder
+        if crf is None:
+            crf = self.crf
+        if resolution is None:
+            resolution = self.outputResolution
+        if outputFile is None:
+            outputFile = self.outputFile
+        if mergeStreams is None:
+            mergeStreams = self.merge_streams
+        if overwrite is None:
+            overwrite = self.overwrite
         if self.slowmo_mode:
             log("Slowmo mode enabled, will not merge audio or subtitles.")
-        multiplier = (self.fps * self.ceilInterpolateFactor) if not self.slowmo_mode else self.fps 
+        multiplier = (self.fps * self.interpolateFactor) if not self.slowmo_mode else self.fps
         if not self.benchmark:
             # maybe i can split this so i can just use ffmpeg normally like with vspipe
             command = [
                 f"{FFMPEG_PATH}",]
             
-            if self.custom_encoder is None:
-                pre_in_set = self.video_encoder.getPreInputSettings()
+            if customEncoder is None:
+                pre_in_set = videoEncoder.getPreInputSettings()
                 if pre_in_set is not None:
                     command += pre_in_set.split()
 
@@ -296,18 +690,19 @@ class FFMpegRender:
                 "-f",
                 "rawvideo",
                 "-pix_fmt",
-                "rgb24",
+                self.transport_format,
                 "-vcodec",
                 "rawvideo",
                 "-s",
-                f"{self.width * self.upscaleTimes}x{self.height * self.upscaleTimes}",
+                f"{self.pipeWidth}x{self.pipeHeight}",
                 "-r",
                 f"{multiplier}",
                 "-i",
                 "-",
             ]
 
-            if not self.slowmo_mode:
+            if not self.slowmo_mode and mergeStreams:
+                command += getTrimArguments(self.trimStart, self.trimDuration)
                 command += [
                     "-i",
                     f"{self.inputFile}",
@@ -332,18 +727,22 @@ class FFMpegRender:
                 "-loglevel",
                 "error",
             ]
-            if self.custom_encoder is not None:
-                for i in self.custom_encoder.split():
+            if customEncoder is not None:
+                for i in customEncoder.split():
                     command.append(i)
             else:
-                command += self.video_encoder.getPostInputSettings().split()
-                command += [self.video_encoder.getQualityControlMode(), str(self.crf)]
+                command += videoEncoder.getPostInputSettings().split()
+                command += [videoEncoder.getQualityControlMode(), str(crf)]
+
+            if resolution is not None:
+                # scaled by the encoder process, once per frame
+                command += ["-s", resolution]
 
             command.append(
-                f"{self.outputFile}",
+                f"{outputFile}",
             )
 
-            if self.overwrite:
+            if overwrite:
                 command.append("-y")
 
         else:
@@ -358,9 +757,9 @@ class FFMpegRender:
                 "-vcodec",
                 "rawvideo",
                 "-video_size",
-                f"{self.width*self.upscaleTimes}x{self.upscaleTimes*self.height}",
+                f"{self.pipeWidth}x{self.pipeHeight}",
                 "-pix_fmt",
-                "rgb24",
+                self.transport_format,
                 "-r",
                 str(multiplier),
                 "-i",
@@ -382,10 +781,15 @@ class FFMpegRender:
             stderr=subprocess.DEVNULL,
         )
         while True:
-            chunk = self.readProcess.stdout.read(self.inputFrameChunkSize)
-            if len(chunk) < self.inputFrameChunkSize:
+            with TRACER.span("decode.wait_slot"):
+                slot = self.readPool.acquire()
+            with TRACER.span("decode"):
+                bytesRead = self.readProcess.stdout.readinto(self.readPool.view(slot))
+            if bytesRead < self.inputFrameChunkSize:
+                self.readPool.release(slot)
                 break
-            self.readQueue.put(chunk)
+            self.readQueue.put(slot)
+            self.framesDecoded += 1
         log("Ending Video Read")
         self.readQueue.put(None)
         self.readingDone = True
@@ -428,6 +832,66 @@ class FFMpegRender:
         hours, minutes, seconds = convertTime(remaining_time)
         return f"{hours}:{minutes}:{seconds}"
 
+    def getQueueOccupancy(self) -> str:
+        """
+        A full read queue means the model is the bottleneck, a full write queue means the encoder is.
+        """
+        readOccupancy = self.readQueue.qsize() / self.readPool.numSlots
+        message = f"Read Queue: {round(readOccupancy * 100)}% Write Queue: {round(self.writeQueue.occupancy() * 100)}%"
+        for i, renditionWriter in enumerate(self.renditionWriters):
+            message += f" Rendition {i + 1}: {round(renditionWriter.queue.occupancy() * 100)}%"
+        return message
+
+    def setQueueMemory(self, queueMemory: int):
+        """
+        Changes the memory budget of the output queues while rendering, the input frame pool is preallocated and keeps its size.
+        """
+        writeQueueMemory = (queueMemory - queueMemory // 4) // (
+            len(self.renditionWriters) + 1
+        )
+        self.writeQueue.setMaxBytes(writeQueueMemory)
+        for renditionWriter in self.renditionWriters:
+            renditionWriter.queue.setMaxBytes(writeQueueMemory)
+        log(f"Queue memory changed to {queueMemory // 1024**2}MB")
+        return {"writeQueueBytes": writeQueueMemory}
+
+    def getStatus(self) -> dict:
+        elapsedTime = max(time.time() - self.startTime, 1e-6)
+        return {
+            "event": "progress",
+            "framesRendered": self.framesRendered,
+            "totalFrames": self.totalOutputFrames,
+            "eta": self.calculateETA(),
+            "paused": self.isPaused,
+            # size of the rgb frames in the preview shared memory
+            "preview": {"width": self.pipeWidth, "height": self.pipeHeight},
+            "fps": {
+                "decode": round(self.framesDecoded / elapsedTime, 2),
+                "model": round(self.framesProcessed / elapsedTime, 2),
+                "encode": round(self.framesRendered / elapsedTime, 2),
+            },
+            "queues": {
+                "read": self.readQueue.qsize(),
+                "readSlots": self.readPool.numSlots,
+                "write": self.writeQueue.qsize(),
+                "writeBytes": self.writeQueue.usedBytes,
+                "writeMaxBytes": self.writeQueue.maxBytes,
+                "renditions": [
+                    renditionWriter.queue.qsize()
+                    for renditionWriter in self.renditionWriters
+                ],
+            },
+            "duplicates": {
+                "skipped": self.framesSkipped,
+                "rate": round(self.framesSkipped / max(self.framesProcessed, 1), 4),
+            },
+            "memory": getProcessMemory(),
+        }
+
+    def broadcastEvent(self, event: dict):
+        if self.controlServer is not None:
+            self.controlServer.broadcast(event)
+
     def writeOutInformation(self, fcs):
         """
         fcs = framechunksize
@@ -446,11 +910,20 @@ class FFMpegRender:
                 # print out data to stdout
                 fps = round(self.framesRendered / (time.time() - self.startTime))
                 eta = self.calculateETA()
-                message = f"FPS: {fps} Current Frame: {self.framesRendered} ETA: {eta}"
+                message = f"FPS: {fps} Current Frame: {self.framesRendered} ETA: {eta} {self.getQueueOccupancy()}"
                 self.realTimePrint(message)
+                self.broadcastEvent(self.getStatus())
                 if self.sharedMemoryID is not None and self.previewFrame is not None:
                     # Update the shared array
-                    buffer[:fcs] = bytes(self.previewFrame)
+                    previewFrame = self.previewFrame
+                    if self.transport_format != "rgb24":
+                        previewFrame = bytesToImg(
+                            previewFrame,
+                            width=self.pipeWidth,
+                            height=self.pipeHeight,
+                            transportFormat=self.transport_format,
+                        )
+                    buffer[:fcs] = bytes(previewFrame)
 
             time.sleep(0.1)
 
@@ -466,31 +939,76 @@ class FFMpegRender:
         self.framesRendered: int = 1
         self.last_length: int = 0
         try:
-            with open (FFMPEG_LOG_FILE, "w") as f:  
-                with subprocess.Popen(
-                    self.getFFmpegWriteCommand(),
-                    stdin=subprocess.PIPE,
-                    stderr=f,
-                    stdout=f,
-                    text=True,
-                    universal_newlines=True,
-                ) as self.writeProcess:
-                    while True:
+            with open(FFMPEG_LOG_FILE, "w") as f:
+                self.writeProcess = None
+                if self.checkpoint is None:
+                    self.startWriteProcess(f)
+                for renditionWriter in self.renditionWriters:
+                    renditionWriter.start(f)
+                while True:
+                    with TRACER.span("encode.wait_frame"):
                         frame = self.writeQueue.get()
-                        if frame is None:
-                            break
-                        self.previewFrame = frame
+                    if frame is None:
+                        break
+                    if isinstance(frame, int):
+                        # renditions hold their own reference to the slot until they have written the frames before it
+                        for renditionWriter in self.renditionWriters:
+                            self.readPool.retain(frame)
+                            renditionWriter.queue.put(frame)
+                        # every frame queued before this read pool slot has been written, so it can be reused
+                        self.readPool.release(frame)
+                        continue
+                    if isinstance(frame, ChunkBoundary):
+                        self.finishChunk(frame.completedFrames)
+                        continue
+                    if self.writeProcess is None:
+                        self.startWriteProcess(f)
+                    if isinstance(frame, StagedFrame):
+                        # the copy back from the device can still be running
+                        with TRACER.span("encode.wait_readback"):
+                            frame.synchronize()
+                    self.previewFrame = frame
 
+                    with TRACER.span("encode"):
                         self.writeProcess.stdin.buffer.write(frame)
-                        self.framesRendered += 1
+                    for renditionWriter in self.renditionWriters:
+                        renditionWriter.queue.put(frame)
+                    self.framesRendered += 1
+                    if self.progress_value is not None:
+                        self.progress_value.value += 1
 
+                if self.checkpoint is None:
                     self.writeProcess.stdin.close()
                     self.writeProcess.wait()
+                elif not self.cancelled:
+                    self.finishCheckpointedRender()
+                for renditionWriter in self.renditionWriters:
+                    renditionWriter.finish()
+                    if renditionWriter.failed:
+                        printAndLog(
+                            f"\nERROR: Rendition {renditionWriter.spec.outputFile} did not finish, check the ffmpeg log"
+                        )
 
-                    renderTime = time.time() - self.startTime
-                    self.writingDone = True
+                renderTime = time.time() - self.startTime
+                self.writingDone = True
+                if self.trace_file is not None:
+                    self.writeTrace()
 
+                if self.cancelled:
+                    if self.checkpoint is None:
+                        # a checkpointed render keeps its chunks, so it can be continued later
+                        removeFile(self.outputFile)
+                        for renditionWriter in self.renditionWriters:
+                            removeFile(renditionWriter.spec.outputFile)
+                    printAndLog("\nRender Cancelled")
+                    self.broadcastEvent({"event": "done", "cancelled": True})
+                else:
                     printAndLog(f"\nTime to complete render: {round(renderTime, 2)}")
+                    self.broadcastEvent(
+                        {"event": "done", "cancelled": False, "renderTime": renderTime}
+                    )
+                if self.controlServer is not None:
+                    self.controlServer.close()
         except Exception as e:
             print(
                 f"ERROR: {e}\nPlease remove everything related to the app, and reinstall it if the problem persists across multiple input videos."
@@ -498,3 +1016,58 @@ class FFMpegRender:
             self.shm.close()
             self.shm.unlink()
             os._exit(1)
+
+    def writeTrace(self):
+        TRACER.writeChromeTrace(self.trace_file)
+        printAndLog(f"\nPipeline trace written to {self.trace_file}\n" + TRACER.summary())
+
+    def startWriteProcess(self, logFile):
+        if self.checkpoint is None:
+            command = self.getFFmpegWriteCommand()
+        else:
+            # chunks are video only, the audio and subtitles are muxed in when they are joined
+            self.chunkFile = self.checkpoint.nextChunkFile()
+            command = self.getFFmpegWriteCommand(
+                outputFile=self.chunkFile, mergeStreams=False, overwrite=True
+            )
+        self.writeProcess = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stderr=logFile,
+            stdout=logFile,
+            text=True,
+            universal_newlines=True,
+        )
+
+    def finishChunk(self, completedFrames: int):
+        """
+        Closes the encoder of the current chunk, and records it in the checkpoint once ffmpeg has finalized the file.
+        """
+        if self.checkpoint is None or self.writeProcess is None:
+            return
+        self.writeProcess.stdin.close()
+        if self.writeProcess.wait() != 0:
+            raise RuntimeError(f"Failed to encode {self.chunkFile}")
+        self.checkpoint.addChunk(self.chunkFile, completedFrames)
+        self.writeProcess = None
+
+    def finishCheckpointedRender(self):
+        if self.writeProcess is not None:
+            # frames written after the last boundary can not be resumed from, but they are still part of the output
+            self.finishChunk(self.firstFrameIndex + self.totalInputFrames)
+        concatVideoSegments(
+            self.checkpoint.chunkFiles(),
+            os.path.join(self.checkpoint.directory, "chunks.txt"),
+            outputFile=self.outputFile,
+            inputFile=(
+                self.inputFile
+                if not self.slowmo_mode and self.merge_streams
+                else None
+            ),
+            audio_encoder=self.audio_encoder,
+            audio_bitrate=self.audio_bitrate,
+            overwrite=self.overwrite,
+            inputStart=self.trimStart,
+            inputDuration=self.trimDuration,
+        )
+        self.checkpoint.remove()
@@ -1,11 +1,19 @@
-from threading import Thread
+from threading import Thread, Event
+from queue import Queue, Empty
 import os
 import math
-from time import sleep
+import time
+
+import numpy as np
 
 from .FFmpeg import FFMpegRender
 from .utils.SceneDetect import SceneDetect
-from .utils.Util import printAndLog, log, removeFile
+from .utils.DuplicateDetect import DuplicateDetector
+from .utils.Cadence import CadenceTracker
+from .utils.Util import printAndLog, log, transportFrameSize, parseResolution
+from .utils.ControlServer import ControlServer
+from .utils.Tracer import TRACER
+from .utils.Checkpoint import ChunkBoundary, fileSignature
 
 
 class Render(FFMpegRender):
@@ -46,6 +54,8 @@ class Render(FFMpegRender):
         interpolateModel=None,
         interpolateFactor: int = 1,
         tile_size=None,
+        auto_tile_size: bool = False,
+        upscale_memory_bytes: int = 0,
         # ffmpeg settings
         custom_encoder: str = "libx264",
         pixelFormat: str = "yuv420p",
@@ -56,7 +66,7 @@ class Render(FFMpegRender):
         audio_encoder_preset: str = "aac",
         audio_bitrate: str = "192k",
         # misc
-        pausedFile=None,
+        control_address: str = None,
         sceneDetectMethod: str = "pyscenedetect",
         sceneDetectSensitivity: float = 3.0,
         sharedMemoryID: str = None,
@@ -66,30 +76,61 @@ class Render(FFMpegRender):
         slomo_mode: bool = False,
         dynamic_scaled_optical_flow: bool = False,
         ensemble: bool = False,
+        transport_format: str = "rgb24",
+        exact_frame_count: bool = False,
+        start: str = None,
+        end: str = None,
+        renditions: list = None,
+        trace_file: str = None,
+        order: str = "auto",
+        upscale_batch_size: int = 1,
+        interpolate_batch_size: int = 1,
+        skip_duplicate_frames: bool = False,
+        duplicate_threshold: float = 2.0,
+        cadence_interpolation: bool = False,
+        motion_gate: bool = False,
+        queue_memory_bytes: int = None,
+        queue_memory_fraction: float = 0.25,
+        # segment settings
+        start_time: float = None,
+        frame_count: int = None,
+        timeline_offset: int = 0,
+        merge_streams: bool = True,
+        overlap_last_frame: bool = False,
+        progress_value=None,
+        # checkpoint settings
+        checkpoint_interval: float = 0,
     ):
-        if pausedFile is None:
-            pausedFile = os.path.basename(inputFile) + "_paused_state.txt"
         self.inputFile = inputFile
-        self.pausedFile = pausedFile
-        with open(self.pausedFile, "w") as f:
-            f.write("False")
         self.backend = backend
         self.upscaleModel = upscaleModel
         self.interpolateModel = interpolateModel
         self.tilesize = tile_size
+        self.autoTileSize = auto_tile_size
+        self.upscaleMemoryBytes = upscale_memory_bytes
+        self.interpolateBatchSize = interpolate_batch_size
+        # the pytorch upscaler resizes to the output resolution on the device, before the frames are copied back
+        self.resizeOnDevice = (
+            upscale_output_resolution is not None
+            and upscaleModel is not None
+            and backend in ("pytorch", "tensorrt")
+        )
+        self.upscaleOutputResolution = (
+            parseResolution(upscale_output_resolution) if self.resizeOnDevice else None
+        )
         self.device = device
         self.precision = precision
         self.upscaleTimes = 1  # if no upscaling, it will default to 1
         self.interpolateFactor = interpolateFactor
-        # max timestep is a hack to make sure ncnn cache frames too early, and ncnn breaks if i modify the code at all so ig this is what we are doing
-        self.maxTimestep = (interpolateFactor - 1) / interpolateFactor
         self.ncnn = self.backend == "ncnn"
         self.ceilInterpolateFactor = math.ceil(self.interpolateFactor)
         self.setupRender = self.returnFrame  # set it to not convert the bytes to array by default, and just pass chunk through
         self.setupFrame0 = None
         self.interpolateOption = None
         self.upscaleOption = None
-        self.isPaused = False
+        # set while the render is not paused, so resuming wakes the render thread right away
+        self.unpausedEvent = Event()
+        self.unpausedEvent.set()
         self.sceneDetectMethod = sceneDetectMethod
         self.sceneDetectSensitivty = sceneDetectSensitivity
         self.sharedMemoryID = sharedMemoryID
@@ -98,8 +139,42 @@ class Render(FFMpegRender):
         self.UHD_mode = UHD_mode
         self.dynamic_scaled_optical_flow = dynamic_scaled_optical_flow
         self.ensemble = ensemble
+        self.motionGate = motion_gate
+        # everything that changes the output, a checkpoint is only resumed if all of this matches
+        checkpointSettings = dict(
+            inputFile=fileSignature(inputFile),
+            upscaleModel=fileSignature(upscaleModel),
+            interpolateModel=fileSignature(interpolateModel),
+            interpolateFactor=interpolateFactor,
+            backend=backend,
+            precision=precision,
+            tile_size=tile_size,
+            auto_tile_size=auto_tile_size,
+            custom_encoder=custom_encoder,
+            pixelFormat=pixelFormat,
+            crf=crf,
+            video_encoder_preset=video_encoder_preset,
+            sceneDetectMethod=sceneDetectMethod,
+            sceneDetectSensitivity=sceneDetectSensitivity,
+            upscale_output_resolution=upscale_output_resolution,
+            UHD_mode=UHD_mode,
+            slomo_mode=slomo_mode,
+            dynamic_scaled_optical_flow=dynamic_scaled_optical_flow,
+            ensemble=ensemble,
+            transport_format=transport_format,
+            order=order,
+            skip_duplicate_frames=skip_duplicate_frames,
+            duplicate_threshold=duplicate_threshold,
+            cadence_interpolation=cadence_interpolation,
+            motion_gate=motion_gate,
+            start_time=start_time,
+            frame_count=frame_count,
+            start=start,
+            end=end,
+        )
         # get video properties early
-        self.getVideoProperties(inputFile)
+        self.getVideoProperties(inputFile, countPackets=exact_frame_count)
+        self.transport_format = self.checkTransportFormat(transport_format)
 
         printAndLog("Using backend: " + self.backend)
         # upscale has to be called first to get the scale of the upscale model
@@ -107,10 +182,21 @@ class Render(FFMpegRender):
             self.setupUpscale()
 
             printAndLog("Using Upscaling Model: " + self.upscaleModel)
+        self.upscaledWidth, self.upscaledHeight = self.upscaleOutputResolution or (
+            self.width * self.upscaleTimes,
+            self.height * self.upscaleTimes,
+        )
         if interpolateModel:
             self.setupInterpolate()
 
             printAndLog("Using Interpolation Model: " + self.interpolateModel)
+        self.upscaleFirst = self.planOrder(order)
+        if self.upscaleFirst:
+            printAndLog("Upscaling frames before interpolating them")
+            self.interpolateOption.hotUnload()
+            self.interpolateOption = self.buildInterpolate(
+                self.upscaledWidth, self.upscaledHeight
+            )
 
         super().__init__(
             inputFile=inputFile,
@@ -128,68 +214,426 @@ class Render(FFMpegRender):
             sharedMemoryID=sharedMemoryID,
             channels=3,
             upscale_output_resolution=upscale_output_resolution,
+            frames_resized=self.resizeOnDevice,
             slowmo_mode=slomo_mode,
+            transport_format=self.transport_format,
+            start_time=start_time,
+            frame_count=frame_count,
+            timeline_offset=timeline_offset,
+            overlap_last_frame=overlap_last_frame,
+            merge_streams=merge_streams,
+            progress_value=progress_value,
+            checkpoint_interval=checkpoint_interval,
+            checkpoint_settings=checkpointSettings,
+            start=start,
+            end=end,
+            renditions=renditions,
+            trace_file=trace_file,
+            queue_memory_bytes=queue_memory_bytes,
+            queue_memory_fraction=queue_memory_fraction,
         )
 
+        if control_address is not None:
+            self.controlServer = ControlServer(
+                control_address,
+                {
+                    "pause": lambda message: self.pause(),
+                    "resume": lambda message: self.resume(),
+                    "cancel": lambda message: self.cancel(),
+                    "set_queue_memory": lambda message: self.setQueueMemory(
+                        int(message["bytes"])
+                    ),
+                    "status": lambda message: self.getStatus(),
+                },
+            )
+
+        self.upscaleBatchSize = self.setupUpscaleBatch(upscale_batch_size)
+        self.duplicateDetector = None
+        self.cadenceTracker = None
+        if cadence_interpolation and interpolateModel:
+            self.cadenceTracker = CadenceTracker()
+        if (skip_duplicate_frames or self.cadenceTracker is not None) and (
+            upscaleModel or interpolateModel
+        ):
+            self.duplicateDetector = DuplicateDetector(
+                self.width,
+                self.height,
+                transportFormat=self.transport_format,
+                threshold=duplicate_threshold,
+            )
+
         self.sharedMemoryThread.start()
-        self.renderThread = Thread(target=self.render)
-        self.readPausedFileThread1 = Thread(target=self.readPausedFileThread)
-        self.ffmpegReadThread = Thread(target=self.readinVideoFrames)
-        self.ffmpegWriteThread = Thread(target=self.writeOutVideoFrames)
+        self.renderThread = Thread(target=self.render, name="render")
+        self.ffmpegReadThread = Thread(target=self.readinVideoFrames, name="decode")
+        self.ffmpegWriteThread = Thread(target=self.writeOutVideoFrames, name="encode")
 
         self.ffmpegReadThread.start()
         self.ffmpegWriteThread.start()
         self.renderThread.start()
-        self.readPausedFileThread1.start()
-
-    def readPausedFileThread(self):
-        activate = True
-        self.prevState = False
-        while not self.writingDone:
-            if os.path.isfile(self.pausedFile):
-                with open(self.pausedFile, "r") as f:
-                    self.isPaused = f.read().strip() == "True"
-                    activate = self.prevState != self.isPaused
-                if activate:
-                    if self.isPaused:
-                        if self.interpolateOption:
-                            self.interpolateOption.hotUnload()
-                        if self.upscaleOption:
-                            self.upscaleOption.hotUnload()
-                        print("\nRender Paused")
-                    else:
-                        print("\nResuming Render")
-                        if self.upscaleOption:
-                            self.upscaleOption.hotReload()
-                        if self.interpolateOption:
-                            self.interpolateOption.hotReload()
-                self.prevState = self.isPaused
-            sleep(1)
+
+    def checkTransportFormat(self, transport_format: str) -> str:
+        """
+        yuv transport converts colors on the device, so it is only available for the pytorch backends, and needs even dimensions for chroma subsampling.
+        """
+        if transport_format == "rgb24":
+            return transport_format
+        if self.backend not in ("pytorch", "tensorrt"):
+            printAndLog(
+                f"{transport_format} transport is not supported on the {self.backend} backend, falling back to rgb24"
+            )
+            return "rgb24"
+        if self.width % 2 or self.height % 2:
+            printAndLog(
+                f"{transport_format} transport needs an even resolution, falling back to rgb24"
+            )
+            return "rgb24"
+        return transport_format
+
+    def timeModel(self, call, iterations: int = 5, warmup: int = 2) -> float:
+        """Returns the mean time of call on a blank frame at the source resolution, in seconds"""
+        frame = np.zeros(
+            transportFrameSize(self.width, self.height, self.transport_format),
+            dtype=np.uint8,
+        )
+        for _ in range(warmup):
+            call(frame)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call(frame)
+        return (time.perf_counter() - start) / iterations
+
+    def setupUpscaleBatch(self, batchSize: int) -> int:
+        """
+        Decoded frames are only upscaled in batches when nothing has to run on them in between,
+        so without interpolation, or when upscaling first.
+        A batchSize of 0 picks the largest batch that fits in the free device memory, up to 8.
+        Tiled rendering keeps its memory limit by rendering one frame at a time, it batches the tiles of a frame instead.
+        """
+        if (
+            batchSize == 1
+            or not self.upscaleModel
+            or self.backend != "pytorch"
+            or (self.interpolateModel and not self.upscaleFirst)
+        ):
+            return 1
+        if self.upscaleOption.tilesize > 0:
+            log("Upscale batching is disabled while tiling")
+            return 1
+        # the render thread holds a whole batch of decoded frames, the decoder needs slots left to keep going
+        maxBatchSize = max(self.readPool.numSlots // 2, 1)
+        if batchSize == 0:
+            batchSize = self.upscaleOption.estimateBatchSize(min(8, maxBatchSize))
+        batchSize = min(batchSize, maxBatchSize)
+        log(f"Upscaling in batches of {batchSize} frames")
+        if self.benchmark:
+            sizes = sorted(
+                {2**i for i in range(batchSize.bit_length()) if 2**i <= batchSize}
+                | {batchSize}
+            )
+            for size in sizes:
+                seconds = self.timeModel(
+                    lambda frame: self.upscaleOption.upscale_batch([frame] * size)[
+                        0
+                    ].synchronize()
+                )
+                printAndLog(f"Upscale batch size {size}: {size / seconds:.2f} fps")
+        return batchSize
+
+    def readBatch(self) -> tuple[list[int], bool]:
+        """
+        Waits for one decoded slot, then takes whatever else is already decoded, up to the batch size.
+        Returns the slots and whether the end of the input was reached.
+        """
+        with TRACER.span("render.wait_frame"):
+            slot = self.readQueue.get()
+        if slot is None:
+            return [], True
+        slots = [slot]
+        while len(slots) < self.upscaleBatchSize:
+            try:
+                slot = self.readQueue.get_nowait()
+            except Empty:
+                break
+            if slot is None:
+                return slots, True
+            slots.append(slot)
+        return slots, False
+
+    def planOrder(self, order: str) -> bool:
+        """
+        Returns True if frames should be upscaled before they are interpolated.
+        Interpolating first upscales every output frame, upscaling first upscales every source frame once,
+        but interpolates at the upscaled resolution, which is estimated to cost as much more as it has pixels.
+        """
+        if not (self.upscaleModel and self.interpolateModel) or self.ceilInterpolateFactor < 2:
+            return False
+        if order == "interpolate_first":
+            return False
+        if self.backend == "ncnn":
+            if order == "upscale_first":
+                printAndLog(
+                    "Upscaling before interpolating is not supported with ncnn, interpolating first"
+                )
+            return False
+        if order == "upscale_first":
+            return True
+
+        upscaleTime = self.timeModel(
+            lambda frame: self.upscaleOption(
+                self.upscaleOption.frame_to_tensor(frame)
+            ).synchronize()
+        )
+        # each call after the first one writes ceilInterpolateFactor - 1 frames to the queue,
+        # the blank frames would pass the motion gate as static, so the model is timed without it
+        self.interpolateOption.bypassMotionGate = True
+        try:
+            interpolateTime = self.timeModel(
+                lambda frame: self.interpolateOption(
+                    img1=frame, writeQueue=Queue(), transition=False, upscaleModel=None
+                )
+            ) / (self.ceilInterpolateFactor - 1)
+        finally:
+            self.interpolateOption.bypassMotionGate = False
+        self.interpolateOption.resetFrames()
+
+        # on average every source frame gives interpolateFactor output frames, one of them may be the source frame itself
+        interpolatedFrames = self.interpolateFactor - 1
+        interpolateFirstTime = (
+            interpolatedFrames * interpolateTime
+            + self.interpolateFactor * upscaleTime
+        )
+        pixelRatio = (self.upscaledWidth * self.upscaledHeight) / (
+            self.width * self.height
+        )
+        upscaleFirstTime = upscaleTime + interpolatedFrames * interpolateTime * pixelRatio
+        log(
+            f"Estimated time per source frame, interpolate first: {interpolateFirstTime * 1000:.2f}ms,"
+            f" upscale first: {upscaleFirstTime * 1000:.2f}ms"
+        )
+        return upscaleFirstTime < interpolateFirstTime
+
+    def pause(self):
+        if self.isPaused or self.cancelled:
+            return {"paused": self.isPaused}
+        self.isPaused = True
+        self.unpausedEvent.clear()
+        if self.interpolateOption:
+            self.interpolateOption.hotUnload()
+        if self.upscaleOption:
+            self.upscaleOption.hotUnload()
+        print("\nRender Paused")
+        self.broadcastEvent({"event": "paused"})
+        return {"paused": True}
+
+    def resume(self):
+        if not self.isPaused:
+            return {"paused": False}
+        print("\nResuming Render")
+        if self.upscaleOption:
+            self.upscaleOption.hotReload()
+        if self.interpolateOption:
+            self.interpolateOption.hotReload()
+        self.isPaused = False
+        self.unpausedEvent.set()
+        self.broadcastEvent({"event": "resumed"})
+        return {"paused": False}
+
+    def cancel(self):
+        """
+        Stops reading new frames, the frames already in the pipeline are written and the encoders are closed.
+        """
+        self.cancelled = True
+        self.isPaused = False
+        self.unpausedEvent.set()
+        self.readProcess.terminate()
+        self.broadcastEvent({"event": "cancelled"})
+        return {"cancelled": True}
 
     def render(self):
-        while True:
+        # the previous slot is kept for one more frame, as interpolation and scene detection can hold on to the last frame
+        previousSlot = None
+        framesRead = 0
+        lastBoundary = self.firstFrameIndex
+        inputEnded = False
+        # what was written for the last frame that was not a duplicate, it is written again for its duplicates
+        lastOutputFrame = None
+        # the last unique frame when it fell between two output frames, it is only upscaled if a duplicate needs it
+        heldSource = None
+        # with cadence interpolation, the duplicates after the last drawing, they are written once the next drawing is known
+        heldFrames = 0
+        lastDrawing = None
+
+        def heldOutput():
+            # the output of the last unique frame, upscaled the first time a held frame is written
+            nonlocal lastOutputFrame, heldSource
+            if lastOutputFrame is None and heldSource is not None:
+                lastOutputFrame = self.upscaleOption(
+                    self.upscaleOption.frame_to_tensor(heldSource)
+                )
+                heldSource = None
+            return lastOutputFrame
+
+        while not inputEnded:
+            if self.cancelled:
+                # the decoder is stopped, give back the frames it already read so it can see the end of its output
+                while (slot := self.readQueue.get()) is not None:
+                    self.readPool.release(slot)
+                break
             if not self.isPaused:
-                frame = self.readQueue.get()
-                if frame is None:
-                    break
-
-                if self.interpolateModel:
-                    self.interpolateOption(
-                        img1=frame,
-                        writeQueue=self.writeQueue,
-                        transition=self.sceneDetect.detect(frame),
-                        upscaleModel=self.upscaleOption,
+                slots, inputEnded = self.readBatch()
+                frames = [self.readPool.view(slot) for slot in slots]
+                duplicates = [
+                    self.duplicateDetector is not None
+                    and self.duplicateDetector.isDuplicate(frame)
+                    for frame in frames
+                ]
+                uniqueFrames = [
+                    frame for frame, duplicate in zip(frames, duplicates) if not duplicate
+                ]
+                # the upscaled frames, and when upscaling first the same frames still on the device for the interpolation
+                if len(uniqueFrames) > 1 and self.upscaleFirst:
+                    upscaledTensors = self.upscaleOption.upscaleTensorBatch(uniqueFrames)
+                    upscaledFrames = zip(
+                        self.upscaleOption.stageBatch(upscaledTensors), upscaledTensors.split(1)
                     )
-                if self.upscaleModel:
-                    frame = self.upscaleOption(
-                        self.upscaleOption.frame_to_tensor(frame)
+                elif len(uniqueFrames) > 1:
+                    upscaledFrames = ((upscaled, None) for upscaled in self.upscaleOption.upscale_batch(uniqueFrames))
+                else:
+                    upscaledFrames = iter([(None, None)] * len(uniqueFrames))
+                for slot, frame, duplicate in zip(slots, frames, duplicates):
+                    framesRead += 1
+                    self.framesProcessed += 1
+
+                    isOverlapFrame = (
+                        self.overlap_last_frame and framesRead == self.totalInputFrames
+                    ) or (self.overlap_first_frame and framesRead == 1)
+                    position = self.firstFrameIndex + self.timelineOffset + framesRead - 1
+                    # the output frames from just after the previous frame up to this one, this frame itself is only written if one lands on it
+                    outputTimes = (
+                        self.timeline.outputTimes(position - 1, position)
+                        if self.interpolateModel
+                        else [position]
                     )
+                    onGrid = bool(outputTimes) and outputTimes[-1] == position
+                    if duplicate and (lastOutputFrame is not None or heldSource is not None):
+                        # hold the last frame instead of running the models, the interpolations between two equal frames are the frame itself
+                        self.framesSkipped += 1
+                        if self.cadenceTracker is not None:
+                            # written once the next drawing is known, re-timing may not need it at all
+                            heldFrames += 1
+                        else:
+                            for _ in range(len(outputTimes) - (onGrid and isOverlapFrame)):
+                                self.writeQueue.put(heldOutput())
+                        # nothing refers to the duplicate, the slot of the last unique frame is kept for as long as it is held
+                        self.writeQueue.put(slot)
+                    else:
+                        upscaled, upscaledTensor = (None, None) if duplicate else next(upscaledFrames)
+                        timesteps = [
+                            float(time - position + 1) for time in outputTimes if time != position
+                        ]
+                        if self.cadenceTracker is not None and lastDrawing is not None:
+                            heldOutputs, timesteps = self.cadenceTracker.plan(
+                                heldFrames + 1,
+                                [
+                                    time - lastDrawing
+                                    for time in self.timeline.outputTimes(lastDrawing, position)
+                                ],
+                            )
+                            for _ in range(heldOutputs):
+                                self.writeQueue.put(heldOutput())
+                        heldFrames = 0
+                        lastDrawing = position
+                        heldSource = None
+                        if self.upscaleFirst:
+                            # scene detection still looks at the source frame, the interpolation runs at the upscaled resolution
+                            transition = self.sceneDetect.detect(frame)
+                            if upscaled is None:
+                                upscaledTensor = self.upscaleOption.upscaleTensor(
+                                    self.upscaleOption.frame_to_tensor(frame)
+                                )
+                                upscaled = self.upscaleOption.stageTensor(upscaledTensor)
+                            # the interpolation takes the upscaled frame over on the device, the host copy is only written
+                            self.interpolateOption(
+                                img1=upscaledTensor,
+                                writeQueue=self.writeQueue,
+                                transition=transition,
+                                upscaleModel=None,
+                                timesteps=timesteps,
+                            )
+                            lastOutputFrame = upscaled
+                            if onGrid and not isOverlapFrame:
+                                self.writeQueue.put(upscaled)
+                        else:
+                            if self.interpolateModel:
+                                self.interpolateOption(
+                                    img1=frame,
+                                    writeQueue=self.writeQueue,
+                                    transition=self.sceneDetect.detect(frame),
+                                    upscaleModel=self.upscaleOption,
+                                    timesteps=timesteps,
+                                )
+                            lastOutputFrame = None
+                            if not onGrid and not isOverlapFrame:
+                                if upscaled is not None:
+                                    lastOutputFrame = upscaled
+                                elif self.upscaleModel:
+                                    heldSource = frame
+                                else:
+                                    lastOutputFrame = frame
+                            elif not isOverlapFrame:
+                                if upscaled is not None:
+                                    frame = upscaled
+                                elif self.upscaleModel:
+                                    frame = self.upscaleOption(
+                                        self.upscaleOption.frame_to_tensor(frame)
+                                    )
+
+                                self.writeQueue.put(frame)
+                                lastOutputFrame = frame
+                        if previousSlot is not None:
+                            self.writeQueue.put(previousSlot)
+                        previousSlot = slot
 
-                self.writeQueue.put(frame)
+                    completedFrames = self.firstFrameIndex + framesRead
+                    # a chunk can not end on held frames, their output is only written with the next drawing
+                    if (
+                        self.checkpoint is not None
+                        and completedFrames // self.checkpointFrames
+                        > lastBoundary // self.checkpointFrames
+                        and heldFrames == 0
+                    ):
+                        self.writeQueue.put(ChunkBoundary(completedFrames))
+                        lastBoundary = completedFrames
             else:
-                sleep(1)
+                # end the chunk while paused, so the process can be closed and the render resumed later
+                completedFrames = self.firstFrameIndex + framesRead
+                if (
+                    self.checkpoint is not None
+                    and completedFrames > lastBoundary
+                    and heldFrames == 0
+                ):
+                    self.writeQueue.put(ChunkBoundary(completedFrames))
+                    lastBoundary = completedFrames
+                self.unpausedEvent.wait(0.1)
+        if not self.cancelled:
+            # the video ends on held frames, there is no next drawing to interpolate to
+            if heldFrames:
+                for _ in self.timeline.outputTimes(lastDrawing, lastDrawing + heldFrames):
+                    self.writeQueue.put(heldOutput())
+        if self.duplicateDetector is not None and framesRead:
+            log(
+                f"Skipped {self.framesSkipped} of {framesRead} frames as duplicates ({self.framesSkipped / framesRead:.1%})"
+            )
+        if self.cadenceTracker is not None and self.cadenceTracker.drawings:
+            log(
+                f"Re-timed {self.cadenceTracker.retimedDrawings} of {self.cadenceTracker.drawings} drawings, last cadence {self.cadenceTracker.cadence()}"
+            )
+        motionGate = getattr(self.interpolateOption, "motionGate", None)
+        if motionGate is not None:
+            log(motionGate.summary())
+        if self.checkpoint is not None:
+            self.writeQueue.put(ChunkBoundary(self.firstFrameIndex + framesRead))
         self.writeQueue.put(None)
-        removeFile(self.pausedFile)
 
     def setupUpscale(self):
         """
@@ -212,9 +656,14 @@ class Render(FFMpegRender):
                 height=self.height,
                 backend=self.backend,
                 tilesize=self.tilesize,
+                autoTile=self.autoTileSize,
+                memoryBudget=self.upscaleMemoryBytes,
+                outputResolution=self.upscaleOutputResolution,
                 trt_optimization_level=self.trt_optimization_level,
+                transportFormat=self.transport_format,
             )
             self.upscaleTimes = self.upscaleOption.getScale()
+            self.tilesize = self.upscaleOption.tilesize
 
         if self.backend == "ncnn":
             from .ncnn.UpscaleNCNN import UpscaleNCNN, getNCNNScale
@@ -249,6 +698,7 @@ class Render(FFMpegRender):
             sceneChangeSensitivity=self.sceneDetectSensitivty,
             width=self.width,
             height=self.height,
+            transportFormat=self.transport_format,
         )
         if self.sceneDetectMethod != "none":
             printAndLog("Scene Detection Enabled")
@@ -256,28 +706,30 @@ class Render(FFMpegRender):
         else:
             printAndLog("Scene Detection Disabled")
 
+        self.interpolateOption = self.buildInterpolate(self.width, self.height)
+
+    def buildInterpolate(self, width: int, height: int):
         if self.backend == "ncnn":
             from .ncnn.InterpolateNCNN import InterpolateRIFENCNN
 
-            self.interpolateOption = InterpolateRIFENCNN(
+            return InterpolateRIFENCNN(
                 interpolateModelPath=self.interpolateModel,
-                width=self.width,
-                height=self.height,
-                max_timestep=self.maxTimestep,
+                width=width,
+                height=height,
                 interpolateFactor=self.ceilInterpolateFactor,
             )
 
         if self.backend == "pytorch" or self.backend == "tensorrt":
             from .pytorch.InterpolateTorch import InterpolateFactory
 
-            self.interpolateOption = InterpolateFactory.build_interpolation_method(
+            return InterpolateFactory.build_interpolation_method(
                 self.interpolateModel,
                 self.backend,
             )(
                 modelPath=self.interpolateModel,
                 ceilInterpolateFactor=self.ceilInterpolateFactor,
-                width=self.width,
-                height=self.height,
+                width=width,
+                height=height,
                 device=self.device,
                 dtype=self.precision,
                 backend=self.backend,
@@ -285,4 +737,7 @@ class Render(FFMpegRender):
                 trt_optimization_level=self.trt_optimization_level,
                 ensemble=self.ensemble,
                 dynamicScaledOpticalFlow=self.dynamic_scaled_optical_flow,
+                transportFormat=self.transport_format,
+                timestepBatchSize=self.interpolateBatchSize,
+                motionGate=self.motionGate,
             )
@@ -0,0 +1,310 @@
+import os
+import sys
+import time
+import multiprocessing
+from threading import Thread
+
+from .FFmpeg import EncoderSettings, convertTime, concatVideoSegments
+from .utils.MediaProbe import probeVideo, probePacketTimestamps, PacketTimestamps
+from .utils.ByteBudgetQueue import getQueueMemoryBudget
+from .utils.ControlServer import ControlServer
+from .utils.Timeline import OutputTimeline
+from .utils.Util import printAndLog, log, removeFolder, parseFramePosition
+
+
+def planSegments(
+    packets: PacketTimestamps,
+    numSegments: int,
+    startFrame: int = 0,
+    endFrame: int = None,
+) -> list[tuple[int, int]]:
+    """
+    Splits the frames from startFrame to endFrame into at most numSegments ranges of (startFrame, frameCount),
+    every range but the first starts on a keyframe.
+    """
+    if endFrame is None:
+        endFrame = len(packets.pts)
+    totalFrames = endFrame - startFrame
+    starts = [startFrame]
+    keyframes = [k for k in packets.keyframeIndexes if startFrame < k < endFrame]
+    if not keyframes:
+        return [(startFrame, totalFrames)]
+    for i in range(1, numSegments):
+        target = startFrame + i * totalFrames / numSegments
+        keyframe = min(keyframes, key=lambda k: abs(k - target))
+        if keyframe > starts[-1]:
+            starts.append(keyframe)
+    ends = starts[1:] + [endFrame]
+    return [(start, end - start) for start, end in zip(starts, ends)]
+
+
+def followPause(render, pauseEvent):
+    """Pauses and resumes the render of a worker process to match the event the parent process sets"""
+    while render.renderThread.is_alive():
+        if pauseEvent.is_set() != render.isPaused:
+            if pauseEvent.is_set():
+                render.pause()
+            else:
+                render.resume()
+        time.sleep(0.1)
+
+
+def renderSegment(renderSettings: dict, progressValue, pauseEvent=None):
+    """
+    Entry point of a worker process, renders one segment through its own Render instance.
+    """
+    # the parent process reports the combined progress, keep the per segment output out of the way
+    sys.stdout = open(os.devnull, "w")
+    from .RenderVideo import Render
+
+    render = Render(**renderSettings, progress_value=progressValue)
+    if pauseEvent is not None:
+        Thread(target=followPause, args=(render, pauseEvent), daemon=True).start()
+    render.renderThread.join()
+    render.ffmpegWriteThread.join()
+
+
+class SegmentedRender:
+    """
+    Renders a video as keyframe aligned segments, each in a worker process with its own decode -> model -> encode pipeline.
+    The encoded segments are joined with the ffmpeg concat demuxer, and the audio and subtitles of the input are muxed in once.
+    When interpolating, every segment but the last decodes the first frame of the next segment as well,
+    so the last pair of frames is interpolated the same way as it would be in a single render.
+
+    segments: int, the number of segments, at most one per keyframe
+    renderSettings: the keyword arguments of Render
+    """
+
+    def __init__(self, segments: int, **renderSettings):
+        self.segments = segments
+        self.renderSettings = renderSettings
+        self.inputFile = renderSettings["inputFile"]
+        self.outputFile = renderSettings["outputFile"]
+        self.interpolateFactor = renderSettings.get("interpolateFactor", 1)
+        self.isInterpolating = bool(renderSettings.get("interpolateModel"))
+        self.slomo_mode = renderSettings.get("slomo_mode", False)
+        self.overwrite = renderSettings.get("overwrite", False)
+        self.audio_encoder = EncoderSettings(
+            renderSettings.get("audio_encoder_preset", "aac")
+        )
+        self.audio_bitrate = renderSettings.get("audio_bitrate", "192k")
+        self.start = renderSettings.get("start")
+        self.end = renderSettings.get("end")
+        self.segmentDirectory = self.outputFile + "_segments"
+        self.last_length = 0
+        self.framesRendered = 0
+        self.workers = []
+        self.cancelled = False
+        # spawn, as cuda can not be used in a forked process
+        self.context = multiprocessing.get_context("spawn")
+        # set while paused, every worker follows it
+        self.pauseEvent = self.context.Event()
+        self.controlServer = None
+
+        if self.outputFile == "PIPE" or renderSettings.get("benchmark"):
+            raise ValueError("Segmented rendering needs an output file")
+
+        try:
+            self.segmentSettings = self.planSegmentSettings()
+        except FileNotFoundError as e:
+            # the segments are cut at keyframes, which only ffprobe can list
+            printAndLog(
+                f"WARN: Can not split the video into segments ({e}), rendering in a single process instead."
+            )
+            from .RenderVideo import Render
+
+            Render(**renderSettings)
+            return
+
+        controlAddress = renderSettings.get("control_address")
+        if controlAddress is not None:
+            self.controlServer = ControlServer(
+                controlAddress,
+                {
+                    "pause": lambda message: self.pause(),
+                    "resume": lambda message: self.resume(),
+                    "cancel": lambda message: self.cancel(),
+                    "status": lambda message: self.getStatus(),
+                },
+            )
+
+        self.render()
+
+    def planSegmentSettings(self) -> list[dict]:
+        metadata = probeVideo(self.inputFile)
+        packets = probePacketTimestamps(self.inputFile)
+        totalFrames = len(packets.pts)
+        startFrame = parseFramePosition(self.start, metadata.fps) if self.start else 0
+        endFrame = (
+            min(parseFramePosition(self.end, metadata.fps), totalFrames)
+            if self.end
+            else totalFrames
+        )
+        if not 0 <= startFrame < endFrame:
+            raise ValueError(
+                f"Invalid frame range {startFrame}-{endFrame}, the video has {totalFrames} frames"
+            )
+        plan = planSegments(packets, self.segments, startFrame, endFrame)
+        self.totalOutputFrames = OutputTimeline(self.interpolateFactor).frameCount(
+            0, endFrame - startFrame - 1
+        )
+        # the audio and subtitles are trimmed to the rendered range
+        self.trimStart = packets.timeOf(startFrame) if startFrame > 0 else None
+        self.trimDuration = (
+            (endFrame - startFrame) / metadata.fps
+            if self.start or self.end
+            else None
+        )
+        # seek half a frame early, so rounding never skips the keyframe a segment starts on
+        halfFrame = 0.5 / metadata.fps
+        extension = os.path.splitext(self.outputFile)[1]
+
+        # every worker has its own queues, so they share one budget
+        queueMemory = getQueueMemoryBudget(
+            self.renderSettings.get("queue_memory_bytes"),
+            self.renderSettings.get("queue_memory_fraction", 0.25),
+        ) // len(plan)
+
+        segmentSettings = []
+        for i, (startFrame, frameCount) in enumerate(plan):
+            isLastSegment = i == len(plan) - 1
+            overlap = self.isInterpolating and not isLastSegment
+            settings = dict(self.renderSettings)
+            settings.update(
+                outputFile=os.path.join(
+                    self.segmentDirectory, f"segment_{i:04d}{extension}"
+                ),
+                overwrite=True,
+                sharedMemoryID=None,
+                start_time=(
+                    max(packets.timeOf(startFrame) - halfFrame, 0.0)
+                    if startFrame > 0
+                    else None
+                ),
+                frame_count=frameCount + 1 if overlap else frameCount,
+                timeline_offset=startFrame - plan[0][0],
+                merge_streams=False,
+                overlap_last_frame=overlap,
+                start=None,
+                end=None,
+                queue_memory_bytes=queueMemory,
+                control_address=None,
+                trace_file=(
+                    f"{os.path.splitext(self.renderSettings['trace_file'])[0]}_segment{i:04d}.json"
+                    if self.renderSettings.get("trace_file")
+                    else None
+                ),
+            )
+            segmentSettings.append(settings)
+            log(f"Segment {i}: start frame {startFrame}, {frameCount} frames")
+        return segmentSettings
+
+    def render(self):
+        os.makedirs(self.segmentDirectory, exist_ok=True)
+        segmentSettings = self.segmentSettings
+        printAndLog(f"Rendering {len(segmentSettings)} segments in parallel")
+
+        context = self.context
+        progressValues = [context.RawValue("i", 0) for _ in segmentSettings]
+        workers = [
+            context.Process(
+                target=renderSegment, args=(settings, progressValue, self.pauseEvent)
+            )
+            for settings, progressValue in zip(segmentSettings, progressValues)
+        ]
+        self.startTime = time.time()
+        for worker in workers:
+            worker.start()
+        self.workers = workers
+        while any(worker.is_alive() for worker in workers):
+            self.framesRendered = sum(value.value for value in progressValues)
+            self.printProgress(self.framesRendered)
+            if self.controlServer is not None:
+                self.controlServer.broadcast(self.getStatus())
+            time.sleep(0.5)
+
+        if self.cancelled:
+            removeFolder(self.segmentDirectory)
+            printAndLog("\nRender Cancelled")
+            self.closeControlServer({"event": "done", "cancelled": True})
+            return
+
+        failed = [i for i, worker in enumerate(workers) if worker.exitcode != 0]
+        if failed:
+            printAndLog(f"\nERROR: Segments {failed} failed to render")
+            os._exit(1)
+
+        self.concatSegments([settings["outputFile"] for settings in segmentSettings])
+        removeFolder(self.segmentDirectory)
+        renderTime = time.time() - self.startTime
+        printAndLog(f"\nTime to complete render: {round(renderTime, 2)}")
+        self.closeControlServer(
+            {"event": "done", "cancelled": False, "renderTime": renderTime}
+        )
+
+    def pause(self):
+        if not self.pauseEvent.is_set():
+            self.pauseEvent.set()
+            print("\nRender Paused")
+            self.broadcastEvent({"event": "paused"})
+        return {"paused": True}
+
+    def resume(self):
+        if self.pauseEvent.is_set():
+            self.pauseEvent.clear()
+            print("\nResuming Render")
+            self.broadcastEvent({"event": "resumed"})
+        return {"paused": False}
+
+    def broadcastEvent(self, event: dict):
+        if self.controlServer is not None:
+            self.controlServer.broadcast(event)
+
+    def cancel(self):
+        self.cancelled = True
+        for worker in self.workers:
+            worker.terminate()
+        return {"cancelled": True}
+
+    def getStatus(self) -> dict:
+        elapsedTime = max(time.time() - self.startTime, 1e-6)
+        return {
+            "event": "progress",
+            "framesRendered": self.framesRendered,
+            "totalFrames": self.totalOutputFrames,
+            "paused": self.pauseEvent.is_set(),
+            "fps": {"encode": round(self.framesRendered / elapsedTime, 2)},
+            "segments": len(self.workers),
+        }
+
+    def closeControlServer(self, event: dict):
+        if self.controlServer is not None:
+            self.controlServer.broadcast(event)
+            self.controlServer.close()
+
+    def printProgress(self, framesRendered: int):
+        if framesRendered == 0:
+            return
+        elapsedTime = time.time() - self.startTime
+        remainingTime = int(
+            (self.totalOutputFrames - framesRendered) * elapsedTime / framesRendered
+        )
+        hours, minutes, seconds = convertTime(max(remainingTime, 0))
+        message = f"FPS: {round(framesRendered / elapsedTime)} Current Frame: {framesRendered} ETA: {hours}:{minutes}:{seconds}"
+        sys.stdout.write("\r" + " " * self.last_length)
+        sys.stdout.write("\r" + message)
+        sys.stdout.flush()
+        self.last_length = len(message)
+
+    def concatSegments(self, segmentFiles: list[str]):
+        concatVideoSegments(
+            segmentFiles,
+            os.path.join(self.segmentDirectory, "segments.txt"),
+            outputFile=self.outputFile,
+            inputFile=None if self.slomo_mode else self.inputFile,
+            audio_encoder=self.audio_encoder,
+            audio_bitrate=self.audio_bitrate,
+            overwrite=self.overwrite,
+            inputStart=self.trimStart,
+            inputDuration=self.trimDuration,
+        )
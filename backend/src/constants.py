@@ -29,6 +29,7 @@ else:
     CWD = os.getcwd()
 
 FFMPEG_PATH = os.path.join(CWD, "bin", "ffmpeg")
+FFPROBE_PATH = os.path.join(CWD, "bin", "ffprobe")
 FFMPEG_LOG_FILE = os.path.join(CWD, "ffmpeg_log.txt")
 MODELS_DIRECTORY = os.path.join(CWD, "models")
 HAS_SYSTEM_CUDA = checkForCUDA()
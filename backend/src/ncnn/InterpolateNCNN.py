@@ -2,6 +2,7 @@ from os import write
 from rife_ncnn_vulkan_python import wrapped
 from time import sleep
 from .UpscaleNCNN import UpscaleNCNN
+from ..utils.Tracer import traced
 from queue import Queue
 # built-in imports
 import pathlib
@@ -25,7 +26,6 @@ class Rife:
         channels: int = 3,
         width: int = 1920,
         height: int = 1080,
-        max_timestep: float = 1.0,
     ):
         self.image0_bytes = None
         self.raw_in_image0 = None
@@ -35,7 +35,8 @@ class Rife:
         self.height = height
         self.width = width
         self.channels = channels
-        self.max_timestep = max_timestep
+        # the frame image1 was last wrapped from, so every timestep of a pair reuses the same wrapped image
+        self.image1_source = None
         self.output_bytes = bytearray(width * height * channels)
         self.raw_out_image = wrapped.Image(
             self.output_bytes, self.width, self.height, self.channels
@@ -96,10 +97,21 @@ class Rife:
         self.image0_bytes = self.image1_bytes
         self.raw_in_image0 = self.raw_in_image1
 
+    def wrap_image1(self, image1_bytes):
+        if self.image1_source is not image1_bytes:
+            self.image1_bytes = bytearray(image1_bytes)
+            self.raw_in_image1 = wrapped.Image(
+                self.image1_bytes, self.width, self.height, self.channels
+            )
+            self.image1_source = image1_bytes
+
     def process_bytes(
         self, image0_bytes, image1_bytes, timestep: float = 0.5
     ) -> np.ndarray:
-        # print(timestep)
+        """
+        Interpolates at any timestep between the cached image0 and image1, a pair can be asked for any number of timesteps in any order.
+        advance() has to be called once the pair is done, image0_bytes is only read for the first pair.
+        """
         if timestep == 0.0:
             return image0_bytes
         elif timestep == 1.0:
@@ -109,21 +121,20 @@ class Rife:
             self.raw_in_image0 = wrapped.Image(
                 self.image0_bytes, self.width, self.height, self.channels
             )
-        self.image1_bytes = bytearray(image1_bytes)
-
-        self.raw_in_image1 = wrapped.Image(
-            self.image1_bytes, self.width, self.height, self.channels
-        )
+        self.wrap_image1(image1_bytes)
 
         self._rife_object.process(
             self.raw_in_image0, self.raw_in_image1, timestep, self.raw_out_image
         )
-
-        if timestep == self.max_timestep:
-            self.image0_bytes = self.image1_bytes
-            self.raw_in_image0 = self.raw_in_image1
         return bytes(self.output_bytes)
 
+    def advance(self, image1_bytes):
+        """Makes image1 the first image of the next pair, also when no timestep of this pair was interpolated"""
+        self.wrap_image1(image1_bytes)
+        self.image0_bytes = self.image1_bytes
+        self.raw_in_image0 = self.raw_in_image1
+        self.image1_source = None
+
 
 class InterpolateRIFENCNN:
     def __init__(
@@ -133,10 +144,8 @@ class InterpolateRIFENCNN:
         height: int = 1080,
         threads: int = 1,
         gpuid: int = 0,
-        max_timestep: int = 1,
         interpolateFactor: int = 2,
     ):
-        self.max_timestep = max_timestep
         self.interpolateFactor = interpolateFactor
         self.interpolateModelPath = interpolateModelPath
         self.width = width
@@ -156,7 +165,6 @@ class InterpolateRIFENCNN:
             channels=3,
             height=self.height,
             width=self.width,
-            max_timestep=self.max_timestep,
         )
 
     def hotUnload(self):
@@ -166,24 +174,27 @@ class InterpolateRIFENCNN:
     def hotReload(self):
         self.paused = False
 
-    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel: UpscaleNCNN=None):
+    @traced("interpolate")
+    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel: UpscaleNCNN=None, timesteps: list[float] | None = None):
+        if timesteps is None:
+            timesteps = [(n + 1) / self.interpolateFactor for n in range(self.interpolateFactor - 1)]
         if self.frame0 is None:
             self.frame0 = img1
             return
         if transition:
-            self.render.process_bytes(self.frame0, img1, self.max_timestep) # get the cache to skip to next frame
+            self.render.advance(img1)
             self.frame0 = img1
             if upscaleModel is not None:
                 img1 = upscaleModel(img1)
-            for n in range(self.interpolateFactor-1):
+            for _ in timesteps:
                 writeQueue.put(img1)
             return
-        for n in range(self.interpolateFactor-1):
+        for timestep in timesteps:
             while self.paused:
                 sleep(1)
-            timestep = (n + 1) * 1.0 / (self.interpolateFactor)
             frame = self.render.process_bytes(self.frame0, img1, timestep)
             if upscaleModel is not None:
                 frame = upscaleModel(frame)
             writeQueue.put(frame)
+        self.render.advance(img1)
         self.frame0 = img1
@@ -3,6 +3,8 @@ import os
 from time import sleep
 import math
 
+from ..utils.Tracer import traced
+
 try:
     from upscale_ncnn_py import UPSCALE
 
@@ -158,6 +160,7 @@ class UpscaleNCNN:
     def frame_to_tensor(self, frame: np.array) -> np.array:
         return frame
 
+    @traced("upscale")
     def __call__(self, imageChunk):
         while self.net is None:
             sleep(1)
@@ -168,7 +171,8 @@ class UpscaleNCNN:
             else:
                 return self.renderTiledImage(frame)
         elif method == "upscale_ncnn_py":
-            return self.net.process_bytes(imageChunk, self.width, self.height, 3)
+            # frames can be views into the recycled read pool, upscale_ncnn_py expects bytes
+            return self.net.process_bytes(bytes(imageChunk), self.width, self.height, 3)
 
     def renderTiledImage(self, img: np.ndarray):
         raise NotImplementedError(
@@ -185,15 +185,8 @@ class GIMMVFI_R(nn.Module):
             torch.cat([f01.unsqueeze(2), f10.unsqueeze(2)], dim=2),
         )
 
-    def predict_flow(self, f, cur_coord, cur_t, flows):
-        def check_for_nans(tensor, name):
-            if type(tensor) == list:
-                for t in tensor:
-                    if torch.isnan(t).any():
-                        print(f"NaNs found in {name}")
-            else:
-                if torch.isnan(tensor).any():
-                    print(f"NaNs found in {name}")
+    def prepare_latents(self, f, flows):
+        """The splatting weights and pixel latents of predict_flow, they do not depend on the timestep"""
         raft_flow01 = flows[:, :, 0].detach()
         raft_flow10 = flows[:, :, 1].detach()
         #check_for_nans(raft_flow01, "raft_flow01")
@@ -203,7 +196,6 @@ class GIMMVFI_R(nn.Module):
         weights1, weights2 = self.cal_splatting_weights(raft_flow01, raft_flow10)
         #check_for_nans(weights1, "weights1")
         #check_for_nans(weights2, "weights2")
-        strtype = self.fwarp_type + "-zeroeps"
         #check_for_nans(f, "f")
 
         # b,c,h,w
@@ -211,6 +203,13 @@ class GIMMVFI_R(nn.Module):
         pixel_latent_1 = self.cnn_encoder(f[:, :, 1])
         #check_for_nans(pixel_latent_0, "pixel_latent_0")
         #check_for_nans(pixel_latent_1, "pixel_latent_1")
+        return raft_flow01, raft_flow10, weights1, weights2, pixel_latent_0, pixel_latent_1
+
+    def predict_flow(self, f, cur_coord, cur_t, flows, latents=None):
+        if latents is None:
+            latents = self.prepare_latents(f, flows)
+        raft_flow01, raft_flow10, weights1, weights2, pixel_latent_0, pixel_latent_1 = latents
+        strtype = self.fwarp_type + "-zeroeps"
 
 
         tmp_pixel_latent_0 = softsplat(
@@ -358,7 +357,11 @@ class GIMMVFI_R(nn.Module):
         other_pred = [img_warp_4]
         return imgt_pred, flowt0_pred, flowt1_pred, other_pred
 
-    def forward(self, img_xs, coord=None, timestep=None, iters=None, ds_factor=None):
+    def prepare_pair(self, img_xs, iters=None, ds_factor=None):
+        """
+        The part of forward that only depends on the two frames: the RAFT flows in both directions, the features, corr_fn and the flow scalers.
+        Its result is passed to synthesize for every timestep of the pair, so RAFT only runs once per pair.
+        """
         indtype = img_xs.dtype
         indevice = img_xs.device
 
@@ -384,9 +387,35 @@ class GIMMVFI_R(nn.Module):
         ) = self.cal_bidirection_flow(
             255 * img_xs[:, :, 0], 255 * img_xs[:, :, 1], iters=iters
         )
+        latents = self.prepare_latents(normal_flows, flows)
+        return (
+            img_xs,
+            full_size_img,
+            normal_flows,
+            flows,
+            flow_scalers,
+            features0,
+            features1,
+            corr_fn,
+            latents,
+        )
+
+    def synthesize(self, pair, coord, timestep):
+        """The timestep part of forward, predict_flow and frame_synthesize on the result of prepare_pair"""
+        (
+            img_xs,
+            full_size_img,
+            normal_flows,
+            flows,
+            flow_scalers,
+            features0,
+            features1,
+            corr_fn,
+            latents,
+        ) = pair
 
         # List of flows
-        normal_inr_flows = self.predict_flow(normal_flows, coord, timestep, flows)
+        normal_inr_flows = self.predict_flow(normal_flows, coord, timestep, flows, latents)
         cur_flow_t = unnormalize_flow(normal_inr_flows, flow_scalers).squeeze()
 
         if cur_flow_t.ndim != 4:
@@ -406,6 +435,9 @@ class GIMMVFI_R(nn.Module):
 
         return imgt_pred[:, :, : self.height, : self.width]
 
+    def forward(self, img_xs, coord=None, timestep=None, iters=None, ds_factor=None):
+        return self.synthesize(self.prepare_pair(img_xs, iters, ds_factor), coord, timestep)
+
     def warp_frame(self, frame, flow):
         return warp(frame, flow)
 
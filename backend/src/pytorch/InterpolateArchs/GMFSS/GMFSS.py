@@ -90,11 +90,20 @@ class GMFSS(nn.Module):
 
         
 
-    def reuse(self, img0, img1):
-        feat11, feat12, feat13 = self.feat_ext(img0)
-        feat21, feat22, feat23 = self.feat_ext(img1)
-        feat_ext0 = [feat11, feat12, feat13]
-        feat_ext1 = [feat21, feat22, feat23]
+    def extract_features(self, img):
+        return list(self.feat_ext(img))
+
+    def reuse(self, img0, img1, feat_ext0=None, feat_ext1=None, scale=None):
+        """
+        Everything that only depends on the frame pair, not the timestep, so it can be computed once for all timesteps of a pair.
+        The feature pyramids only depend on one frame each, pass them in to reuse the ones of the previous pair.
+        """
+        if scale is not None:
+            self.scale = scale
+        if feat_ext0 is None:
+            feat_ext0 = self.extract_features(img0)
+        if feat_ext1 is None:
+            feat_ext1 = self.extract_features(img1)
 
         img0 = F.interpolate(img0, scale_factor=0.5, mode="bilinear")
         img1 = F.interpolate(img1, scale_factor=0.5, mode="bilinear")
@@ -119,13 +128,11 @@ class GMFSS(nn.Module):
 
         metric0, metric1 = self.metricnet(img0, img1, flow01, flow10)
 
-        return flow01, flow10, metric0, metric1, feat_ext0, feat_ext1
+        return flow01, flow10, metric0, metric1, feat_ext0, feat_ext1, img0, img1
 
-    def forward(self, img0, img1, timestep, scale=None):
-        if scale is not None:
-            self.scale = scale
-        dtype = img0.dtype
-        reuse_things = self.reuse(img0, img1)
+    def forward(self, img0, img1, timestep, scale=None, reuse_things=None):
+        if reuse_things is None:
+            reuse_things = self.reuse(img0, img1, scale=scale)
         flow01, metric0, feat11, feat12, feat13 = (
             reuse_things[0],
             reuse_things[2],
@@ -147,9 +154,9 @@ class GMFSS(nn.Module):
         Z1t = timestep * metric0
         Z2t = (1 - timestep) * metric1
 
-        img0 = F.interpolate(img0, scale_factor=0.5, mode="bilinear")
+        # the half resolution frames from reuse
+        img0, img1 = reuse_things[6], reuse_things[7]
         I1t = warp(img0, F1t, Z1t, strMode="soft")
-        img1 = F.interpolate(img1, scale_factor=0.5, mode="bilinear")
         I2t = warp(img1, F2t, Z2t, strMode="soft")
 
         if self.model_type == "union":
@@ -0,0 +1,37 @@
+import torch
+
+try:
+    from .interpolate import interpolate
+except:
+    from torch.nn.functional import interpolate
+
+
+def firstBlockScale(scale_list: list[float], scale: float | None = None) -> float:
+    """The factor the first block downscales by, scale_list is the one of the flownet, scale the runtime scale if one is given"""
+    if scale is None:
+        return scale_list[0]
+    return round(scale_list[0] / scale_list[-1]) / scale
+
+
+def pyramid(img, f=None, scale: float = 8):
+    """
+    The input of the first block for one frame, downscaled once so the frame can share it between both of its pairs.
+    f is the encode of the frame, None for models without an encoder.
+    """
+    if f is not None:
+        img = torch.cat((img[:, :3], f), 1)
+    return interpolate(img, scale_factor=1.0 / scale, mode="bilinear", align_corners=False)
+
+
+def firstInput(img0, img1, f0, f1, timestep, p0=None, p1=None):
+    """
+    The input of the first block, the block downscales it itself, unless it is made from the pyramids p0 and p1 of the frames.
+    f0 and f1 are None for models without an encoder.
+    """
+    if p0 is None:
+        frames = (img0, img1) if f0 is None else (img0, img1, f0, f1)
+        return torch.cat((*frames, timestep), 1)
+    # the timestep is constant, so cropping it is the same as downscaling it
+    p0, p1 = (x.expand(timestep.shape[0], -1, -1, -1) for x in (p0, p1))
+    frames = (p0, p1) if f0 is None else (p0[:, :3], p1[:, :3], p0[:, 3:], p1[:, 3:])
+    return torch.cat((*frames, timestep[:, :, : p0.shape[2], : p0.shape[3]]), 1)
@@ -30,6 +30,7 @@ try:
     from .interpolate import interpolate
 except:
     from torch.nn.functional import interpolate
+from .pyramid import firstInput
 
 
 def conv(in_planes, out_planes, kernel_size=3, stride=1, padding=1, dilation=1):
@@ -133,10 +134,11 @@ class IFBlock(nn.Module):
             nn.ConvTranspose2d(c, 4 * 6, 4, 2, 1), nn.PixelShuffle(2)
         )
 
-    def forward(self, x, flow=None, scale=1):
-        x = interpolate(
-            x, scale_factor=1.0 / scale, mode="bilinear", align_corners=False
-        )
+    def forward(self, x, flow=None, scale=1, prescaled=False):
+        if not prescaled:
+            x = interpolate(
+                x, scale_factor=1.0 / scale, mode="bilinear", align_corners=False
+            )
         if flow is not None:
             flow = (
                 interpolate(
@@ -190,24 +192,29 @@ class IFNet(nn.Module):
             raise ValueError("rife_trt_mode must be 'fast' or 'accurate'")
         self.warp = warp
 
-    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, f0, f1):
+    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, f0, f1, scale=None, p0=None, p1=None):
+        # the frames are shared by every timestep of a batch
+        img0, img1, f0, f1 = (x.expand(timestep.shape[0], -1, -1, -1) for x in (img0, img1, f0, f1))
         warped_img0 = img0
         warped_img1 = img1
         flow = None
         mask = None
-        
+        if scale is not None:
+            self.scale_list = [8 / scale, 4 / scale, 2 / scale, 1 / scale]
         for i in range(4):
             if flow is None:
                 flow, mask = self.blocks[i](
-                    torch.cat((img0, img1, f0, f1, timestep), 1),
+                    firstInput(img0, img1, f0, f1, timestep, p0, p1),
                     None,
                     scale=self.scale_list[i],
+                    prescaled=p0 is not None,
                 )
                 if self.ensemble:
                     f_, m_ = self.blocks[i](
-                        torch.cat((img1, img0, f1, f0, 1 - timestep), 1),
+                        firstInput(img1, img0, f1, f0, 1 - timestep, p1, p0),
                         None,
                         scale=self.scale_list[i],
+                        prescaled=p0 is not None,
                     )
                     flow = (flow + torch.cat((f_[:, 2:4], f_[:, :2]), 1)) / 2
                     mask = (mask + (-m_)) / 2
@@ -29,6 +29,7 @@ try:
     from .interpolate import interpolate
 except:
     from torch.nn.functional import interpolate
+from .pyramid import firstInput
 
 
 class MyPixelShuffle(nn.Module):
@@ -132,10 +133,11 @@ class IFBlock(nn.Module):
             nn.ConvTranspose2d(c, 4 * 13, 4, 2, 1), nn.PixelShuffle(2)
         )
 
-    def forward(self, x, flow=None, scale=1):
-        x = interpolate(
-            x, scale_factor=1.0 / scale, mode="bilinear", align_corners=False
-        )
+    def forward(self, x, flow=None, scale=1, prescaled=False):
+        if not prescaled:
+            x = interpolate(
+                x, scale_factor=1.0 / scale, mode="bilinear", align_corners=False
+            )
         if flow is not None:
             flow = (
                 interpolate(
@@ -173,7 +175,7 @@ class IFNet(nn.Module):
         self.encode = Head()
         self.device = device
         self.dtype = dtype
-        self.scaleList = [8 / scale, 4 / scale, 2 / scale, 1 / scale]
+        self.scale_list = [8 / scale, 4 / scale, 2 / scale, 1 / scale]
         if ensemble:
             import sys
             print("Ensemble is not supported with this model.",file=sys.stderr)
@@ -186,7 +188,9 @@ class IFNet(nn.Module):
        
         self.warp = warp
 
-    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, f0, f1, scale=None):
+    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, f0, f1, scale=None, p0=None, p1=None):
+        # the frames are shared by every timestep of a batch
+        img0, img1, f0, f1 = (x.expand(timestep.shape[0], -1, -1, -1) for x in (img0, img1, f0, f1))
         warped_img0 = img0
         warped_img1 = img1
         flow = None
@@ -196,9 +200,10 @@ class IFNet(nn.Module):
         for i in range(4):
             if flow is None:
                 flow, mask, feat = self.blocks[i](
-                    torch.cat((img0[:, :3], img1[:, :3], f0, f1, timestep), 1),
+                    firstInput(img0[:, :3], img1[:, :3], f0, f1, timestep, p0, p1),
                     None,
-                    scale=self.scaleList[i],
+                    scale=self.scale_list[i],
+                    prescaled=p0 is not None,
                 )
             else:
                 wf0 = self.warp(f0, flow[:, :2], tenFlow_div, backwarp_tenGrid)
@@ -217,7 +222,7 @@ class IFNet(nn.Module):
                         1,
                     ),
                     flow,
-                    scale=self.scaleList[i],
+                    scale=self.scale_list[i],
                 )
                 mask = m0
                 flow = flow + fd
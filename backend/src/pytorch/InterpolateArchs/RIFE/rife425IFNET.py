@@ -29,6 +29,7 @@ try:
     from .interpolate import interpolate
 except:
     from torch.nn.functional import interpolate
+from .pyramid import firstInput
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
@@ -117,10 +118,11 @@ class IFBlock(nn.Module):
             nn.ConvTranspose2d(c, 4 * 13, 4, 2, 1), nn.PixelShuffle(2)
         )
 
-    def forward(self, x, flow=None, scale=1):
-        x = interpolate(
-            x, scale_factor=1.0 / scale, mode="bilinear", align_corners=False
-        )
+    def forward(self, x, flow=None, scale=1, prescaled=False):
+        if not prescaled:
+            x = interpolate(
+                x, scale_factor=1.0 / scale, mode="bilinear", align_corners=False
+            )
         if flow is not None:
             flow = (
                 interpolate(
@@ -159,7 +161,7 @@ class IFNet(nn.Module):
         self.encode = Head()
         self.device = device
         self.dtype = dtype
-        self.scaleList = [16 / scale, 8 / scale, 4 / scale, 2 / scale, 1 / scale]
+        self.scale_list = [16 / scale, 8 / scale, 4 / scale, 2 / scale, 1 / scale]
         self.width = width
         self.height = height
         if ensemble:
@@ -169,19 +171,22 @@ class IFNet(nn.Module):
         from .warplayer import warp
         self.warp = warp
 
-    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, f0, f1, scale=None):
+    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, f0, f1, scale=None, p0=None, p1=None):
+        # the frames are shared by every timestep of a batch
+        img0, img1, f0, f1 = (x.expand(timestep.shape[0], -1, -1, -1) for x in (img0, img1, f0, f1))
         warped_img0 = img0
         warped_img1 = img1
         flow = None
         mask = None
         if scale is not None:
-            self.scale_list = [8 / scale, 4 / scale, 2 / scale, 1 / scale]
+            self.scale_list = [16 / scale, 8 / scale, 4 / scale, 2 / scale, 1 / scale]
         for i in range(5):
             if flow is None:
                 flow, mask, feat = self.blocks[i](
-                    torch.cat((img0, img1, f0, f1, timestep), 1),
+                    firstInput(img0, img1, f0, f1, timestep, p0, p1),
                     None,
-                    scale=self.scaleList[i],
+                    scale=self.scale_list[i],
+                    prescaled=p0 is not None,
                 )
             else:
                 wf0 = self.warp(f0, flow[:, :2], tenFlow_div, backwarp_tenGrid)
@@ -200,7 +205,7 @@ class IFNet(nn.Module):
                         1,
                     ),
                     flow,
-                    scale=self.scaleList[i],
+                    scale=self.scale_list[i],
                 )
                 mask = m0
                 flow = flow + fd
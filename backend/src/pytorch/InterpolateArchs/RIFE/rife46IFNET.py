@@ -30,6 +30,7 @@ try:
     from .interpolate import interpolate
 except:
     from torch.nn.functional import interpolate
+from .pyramid import firstInput
 
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -98,8 +99,9 @@ class IFBlock(nn.Module):
             nn.ConvTranspose2d(c, 4 * 6, 4, 2, 1), nn.PixelShuffle(2)
         )
 
-    def forward(self, x, flow=None, scale=1):
-        x = interpolate(x, scale_factor=1.0 / scale, mode="bilinear")
+    def forward(self, x, flow=None, scale=1, prescaled=False):
+        if not prescaled:
+            x = interpolate(x, scale_factor=1.0 / scale, mode="bilinear")
         if flow is not None:
             flow = (
                 interpolate(flow, scale_factor=1.0 / scale, mode="bilinear")
@@ -142,7 +144,9 @@ class IFNet(nn.Module):
         from .warplayer import warp
         self.warp = warp
 
-    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, scale=None):
+    def forward(self, img0, img1, timestep, tenFlow_div, backwarp_tenGrid, scale=None, p0=None, p1=None):
+        # the frames are shared by every timestep of a batch
+        img0, img1 = (x.expand(timestep.shape[0], -1, -1, -1) for x in (img0, img1))
         if scale is not None:
             self.scale_list = [8 / scale, 4 / scale, 2 / scale, 1 / scale]
         warped_img0 = img0
@@ -153,15 +157,17 @@ class IFNet(nn.Module):
         for i in range(4):
             if flow is None:
                 flow, mask = self.block[i](
-                    torch.cat((img0, img1, timestep), 1),
+                    firstInput(img0, img1, None, None, timestep, p0, p1),
                     None,
                     scale=self.scale_list[i],
+                    prescaled=p0 is not None,
                 )
                 if self.ensemble:
                     f1, m1 = self.block[i](
-                        torch.cat((img1, img0, 1 - timestep), 1),
+                        firstInput(img1, img0, None, None, 1 - timestep, p1, p0),
                         None,
                         scale=self.scale_list[i],
+                        prescaled=p0 is not None,
                     )
                     flow = (flow + torch.cat((f1[:, 2:4], f1[:, :2]), 1)) / 2
                     mask = (mask + (-m1)) / 2
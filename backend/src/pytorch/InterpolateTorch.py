@@ -19,6 +19,8 @@ from ..utils.Util import (
     warnAndLog,
     log
 )
+from ..utils.ColorConversion import yuv420ToRGB, rgbToYUV420
+from ..utils.Tracer import traced
 from ..constants import HAS_SYSTEM_CUDA
 from time import sleep
 
@@ -39,7 +41,62 @@ class DynamicScale:
     
     # limit gmfss scale to 1.0 max
 
+class MotionGate:
+    """
+    Sorts frame pairs by how much moves between them, so pairs that barely change skip the flownet.
+    The SSIM is taken on copies of both frames shrunk to thumbnailHeight, so the check costs a small fraction of a model call.
+    Pairs more similar than staticThreshold are a linear blend of their two frames, pairs more similar than reducedThreshold
+    run the flow at reducedScale times the usual scale, only the rest get full inference.
+    Models that can not change the flow scale per pair pass reducedScale=None, and the middle band gets full inference.
+    """
+
+    STATIC = "static"
+    REDUCED = "reduced"
+    FULL = "full"
+
+    def __init__(
+        self,
+        CompareNet: SSIM,
+        staticThreshold: float = 0.995,
+        reducedThreshold: float = 0.97,
+        reducedScale: float | None = 0.5,
+        thumbnailHeight: int = 256,
+    ):
+        self.CompareNet = CompareNet
+        self.staticThreshold = staticThreshold
+        self.reducedThreshold = reducedThreshold
+        self.reducedScale = reducedScale
+        self.thumbnailHeight = thumbnailHeight
+        self.pairs = {self.STATIC: 0, self.REDUCED: 0, self.FULL: 0}
+
+    @traced("interpolate.motion_gate")
+    @torch.inference_mode()
+    def check(self, frame0: torch.Tensor, frame1: torch.Tensor) -> str:
+        factor = self.thumbnailHeight / frame0.shape[2]
+        if factor < 1:
+            frame0, frame1 = (
+                F.interpolate(frame, scale_factor=factor, mode="area") for frame in (frame0, frame1)
+            )
+        similarity = self.CompareNet(frame0, frame1).item()
+        if similarity >= self.staticThreshold:
+            band = self.STATIC
+        elif similarity >= self.reducedThreshold and self.reducedScale is not None:
+            band = self.REDUCED
+        else:
+            band = self.FULL
+        self.pairs[band] += 1
+        return band
+
+    def summary(self) -> str:
+        total = sum(self.pairs.values())
+        return f"Motion gate over {total} pairs: " + ", ".join(
+            f"{band} {count} ({count / max(total, 1):.1%})" for band, count in self.pairs.items()
+        )
+
 class BaseInterpolate(metaclass=ABCMeta):
+    # set while the model is timed on blank frames, which the motion gate would find static
+    bypassMotionGate = False
+
     @abstractmethod
     def _load(self):
         """Loads in the model"""
@@ -58,6 +115,8 @@ class BaseInterpolate(metaclass=ABCMeta):
         self.backwarp_tenGrid = None
         self.doEncodingOnFrame = False # set this by default
         self.CompareNet = None
+        self.motionGate = None
+        self.transportFormat = "rgb24"
 
     @staticmethod
     def handleDevice(device:str) -> torch.device:
@@ -102,10 +161,69 @@ class BaseInterpolate(metaclass=ABCMeta):
     def hotReload(self):
         self._load()
 
+    def resetFrames(self):
+        """Forgets the cached previous frame, the next call starts a new sequence"""
+        self.frame0 = None
+        self.encode0 = None
+
+    def buildMotionGate(self, enabled: bool, reducedScale: float | None = 0.5) -> MotionGate | None:
+        if not enabled:
+            return None
+        log("Motion gate enabled")
+        return MotionGate(SSIM().to(device=self.device, dtype=self.dtype), reducedScale=reducedScale)
+
+    def checkMotion(self, frame1: torch.Tensor) -> str:
+        """The motion gate band of frame0 and frame1, every pair gets full inference without a gate"""
+        if self.motionGate is None or self.bypassMotionGate:
+            return MotionGate.FULL
+        return self.motionGate.check(
+            self.frame0[:, :, : self.height, : self.width], frame1[:, :, : self.height, : self.width]
+        )
+
+    @torch.inference_mode()
+    def writeBlends(self, frame1: torch.Tensor, timesteps: list[float], writeQueue: Queue, upscaleModel: UpscalePytorch = None):
+        """Writes a linear blend of frame0 and frame1 for every timestep, in place of the model output for a static pair"""
+        for timestep in timesteps:
+            output = torch.lerp(self.frame0, frame1, timestep)[:, :, : self.height, : self.width]
+            if upscaleModel is not None:
+                output = upscaleModel(upscaleModel.handoff_tensor(output))
+            else:
+                output = self.tensor_to_frame(output)
+            writeQueue.put(output)
+
+    def getPairScale(self, frame1: torch.Tensor, band: str) -> float | None:
+        """
+        The optical flow scale of frame0 and frame1, None keeps the scale the flownet was loaded with.
+        The flownet keeps the last scale it was given, so once the gate has reduced one pair, every pair has to pass its own.
+        """
+        if self.dynamicScaledOpticalFlow:
+            scale = self.dynamicScale.dynamicScaleCalculation(self.frame0, frame1)
+        elif self.motionGate is not None:
+            scale = self.scale
+        else:
+            scale = None
+        if band == MotionGate.REDUCED:
+            scale = max(0.25, scale * self.motionGate.reducedScale)
+        return scale
+
+    def getTimesteps(self, timesteps: list[float] | None) -> list[float]:
+        """The timesteps to render between frame0 and frame1, evenly spaced unless the caller re-times them"""
+        if timesteps is None:
+            return [(n + 1) / self.ceilInterpolateFactor for n in range(self.ceilInterpolateFactor - 1)]
+        return timesteps
+
+    def getTimestepTensor(self, timestep: float):
+        """The model input for a timestep, timesteps that were not cached on load are made on first use"""
+        if timestep not in self.timestepDict:
+            self.timestepDict[timestep] = self.makeTimestepTensor(timestep)
+        return self.timestepDict[timestep]
+
+    def makeTimestepTensor(self, timestep: float):
+        raise NotImplementedError
 
     @abstractmethod
     @torch.inference_mode()
-    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None): # type: ignore
+    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None, timesteps: list[float] | None = None): # type: ignore
         """Perform processing"""
 
     def initLog(self):
@@ -121,15 +239,29 @@ class BaseInterpolate(metaclass=ABCMeta):
             .div(255.0)
         )
 
+    @traced("interpolate.frame_to_tensor")
     @torch.inference_mode()
     def frame_to_tensor(self, frame) -> torch.Tensor:
         with torch.cuda.stream(self.prepareStream): # type: ignore
-            frame = self.norm(
-                torch.frombuffer(
-                    frame,
-                    dtype=torch.uint8,
-                ).to(device=self.device, dtype=self.dtype, non_blocking=True)
-            )
+            if isinstance(frame, torch.Tensor):
+                # handed over on the device by the upscaler when upscaling first, copied so the upscaler's memory is not held on to
+                frame = frame.to(dtype=self.dtype, copy=True)
+            elif self.transportFormat != "rgb24":
+                frame = yuv420ToRGB(
+                    torch.frombuffer(frame, dtype=torch.uint8).to(
+                        device=self.device, non_blocking=True
+                    ),
+                    self.width,
+                    self.height,
+                    self.transportFormat,
+                ).to(dtype=self.dtype)
+            else:
+                frame = self.norm(
+                    torch.frombuffer(
+                        frame,
+                        dtype=torch.uint8,
+                    ).to(device=self.device, dtype=self.dtype, non_blocking=True)
+                )
             frame = F.pad(frame, self.padding)
 
         self.prepareStream.synchronize()
@@ -140,8 +272,19 @@ class BaseInterpolate(metaclass=ABCMeta):
         self.f0encode = None
         self.img0 = None
 
+    def sourceFrame(self, img1, frame1: torch.Tensor, upscaleModel: UpscalePytorch = None):
+        """What is written for frame1 in place of an interpolation, ex: on a transition"""
+        if upscaleModel is not None:
+            return upscaleModel(upscaleModel.handoff_tensor(frame1[:, :, : self.height, : self.width]))
+        if isinstance(img1, torch.Tensor):
+            return self.tensor_to_frame(frame1[:, :, : self.height, : self.width])
+        return img1
+
+    @traced("interpolate.tensor_to_frame")
     @torch.inference_mode()
     def tensor_to_frame(self, frame: torch.Tensor):
+        if self.transportFormat != "rgb24":
+            return rgbToYUV420(frame, self.transportFormat).cpu().numpy()
         return frame.squeeze_(0).permute(1, 2, 0).mul(255).float().byte().contiguous().cpu().numpy()
 
 
@@ -159,12 +302,15 @@ class InterpolateGIMMTorch(BaseInterpolate):
         UHDMode: bool = False,
         ensemble: bool = False,
         dynamicScaledOpticalFlow: bool = False,
+        transportFormat: str = "rgb24",
+        motionGate: bool = False,
         *args,
         **kwargs,
     ):
         self.interpolateModel = modelPath
         self.width = width
         self.height = height
+        self.transportFormat = transportFormat
         self.device = self.handleDevice(device)
         self.dtype = self.handlePrecision(dtype)
         if ensemble:
@@ -180,6 +326,8 @@ class InterpolateGIMMTorch(BaseInterpolate):
             self.scale = 0.25 # GIMM uses fat amounts of vram, needs really low flow resolution for UHD
         self.doEncodingOnFrame = False
         self.initLog()
+        # the flow coordinates are built for one scale, so the middle band of the gate runs at full scale
+        self.motionGate = self.buildMotionGate(motionGate, reducedScale=None)
         self._load()
 
     @torch.inference_mode()
@@ -209,22 +357,13 @@ class InterpolateGIMMTorch(BaseInterpolate):
             
             # caching the timestep tensor in a dict with the timestep as a float for the key
             
+            self.s_shape = s_shape
             self.timestepDict = {}
-            self.coordDict = {}
 
             for n in range(self.ceilInterpolateFactor):
                 timestep = n / (self.ceilInterpolateFactor)
-                timestep_tens = n * 1 /  self.ceilInterpolateFactor * torch.ones(xs.shape[0]).to(xs.device).to(self.dtype).reshape(-1, 1, 1, 1)
-                self.timestepDict[timestep] = timestep_tens
-                coord = (self.flownet.sample_coord_input(
-                        1,
-                        s_shape,
-                        [1 / self.ceilInterpolateFactor * n],
-                        device=self.device,
-                        upsample_ratio=self.scale,
-                ).to(non_blocking=True, dtype=self.dtype, device=self.device),None)
-                self.coordDict[timestep] = coord
-            
+                self.timestepDict[timestep] = self.makeTimestepTensor(timestep)
+
             log("GIMM loaded")
             log("Scale: " + str(self.scale))
             log("Using System CUDA: " + str(HAS_SYSTEM_CUDA))
@@ -235,9 +374,22 @@ class InterpolateGIMMTorch(BaseInterpolate):
                     "TensorRT is not implemented for GIMM yet, falling back to PyTorch"
                 )
         self.prepareStream.synchronize()
-    
+
     @torch.inference_mode()
-    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None): # type: ignore
+    def makeTimestepTensor(self, timestep: float):
+        timestep_tens = timestep * torch.ones(1, device=self.device, dtype=self.dtype).reshape(-1, 1, 1, 1)
+        coord = (self.flownet.sample_coord_input(
+                1,
+                self.s_shape,
+                [timestep],
+                device=self.device,
+                upsample_ratio=self.scale,
+        ).to(non_blocking=True, dtype=self.dtype, device=self.device),None)
+        return coord, timestep_tens
+
+    @traced("interpolate")
+    @torch.inference_mode()
+    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None, timesteps: list[float] | None = None): # type: ignore
         
         with torch.cuda.stream(self.stream):  # type: ignore
             if self.frame0 is None:
@@ -245,38 +397,43 @@ class InterpolateGIMMTorch(BaseInterpolate):
                 self.stream.synchronize()
                 return
             frame1 = self.frame_to_tensor(img1)
-            for n in range(self.ceilInterpolateFactor-1):
+            timesteps = self.getTimesteps(timesteps)
+            if not transition and timesteps and self.checkMotion(frame1) == MotionGate.STATIC:
+                self.writeBlends(frame1, timesteps, writeQueue, upscaleModel)
+                timesteps = []
+            if not transition and timesteps:
+                while self.flownet is None:
+                    sleep(1)
+                xs = torch.cat((self.frame0.unsqueeze(2), frame1.unsqueeze(2)), dim=2).to(
+                self.device, non_blocking=True,dtype=self.dtype
+                )
+                # RAFT and everything else that does not depend on the timestep runs once for the pair
+                with torch.autocast(enabled=True,device_type='cuda'):
+                    pair = self.flownet.prepare_pair(xs, ds_factor=self.scale)
+            for timestep in timesteps:
                 if not transition:
-                    timestep = (n + 1) * 1.0 / (self.ceilInterpolateFactor)
-                    coord = self.coordDict[timestep]
-                    timestep_tens = self.timestepDict[timestep]
-                    xs = torch.cat((self.frame0.unsqueeze(2), frame1.unsqueeze(2)), dim=2).to(
-                    self.device, non_blocking=True,dtype=self.dtype
-                    )
-
-                    while self.flownet is None:
-                        sleep(1)
+                    coord, timestep_tens = self.getTimestepTensor(timestep)
                     with torch.autocast(enabled=True,device_type='cuda'):
-                        output = self.flownet(xs, coord, timestep_tens, ds_factor=self.scale)
+                        output = self.flownet.synthesize(pair, coord, timestep_tens)
                     
                     if torch.isnan(output).any():
                         # if there are nans in output, reload with float32 precision and process.... dumb fix but whatever
                         print("NaNs in output, returning the first image",file=sys.stderr)
+                        fallback = self.frame0[:, :, : self.height, : self.width]
                         if upscaleModel is not None:
-                            img1 = upscaleModel(upscaleModel.frame_to_tensor(self.tensor_to_frame(img1)))
-                        writeQueue.put(img1)
+                            writeQueue.put(upscaleModel(upscaleModel.handoff_tensor(fallback)))
+                        else:
+                            writeQueue.put(self.tensor_to_frame(fallback))
 
                     else:
                         if upscaleModel is not None:
-                            output = upscaleModel(upscaleModel.frame_to_tensor(self.tensor_to_frame(output)))
+                            output = upscaleModel(upscaleModel.handoff_tensor(output))
                         else:
                             output = self.tensor_to_frame(output)
                         writeQueue.put(output)
                 
                 else:
-                    if upscaleModel is not None:
-                            img1 = upscaleModel(frame1[:, :, : self.height, : self.width])
-                    writeQueue.put(img1)    
+                    writeQueue.put(self.sourceFrame(img1, frame1, upscaleModel))
             self.copyTensor(self.frame0, frame1)
 
         self.stream.synchronize()
@@ -295,6 +452,8 @@ class InterpolateGMFSSTorch(BaseInterpolate):
         UHDMode: bool = False,
         ensemble: bool = False,
         dynamicScaledOpticalFlow: bool = False,
+        transportFormat: str = "rgb24",
+        motionGate: bool = False,
         *args,
         **kwargs,
     ):
@@ -302,6 +461,7 @@ class InterpolateGMFSSTorch(BaseInterpolate):
         self.interpolateModel = modelPath
         self.width = width
         self.height = height
+        self.transportFormat = transportFormat
         self.device = self.handleDevice(device)
         self.dtype = self.handlePrecision(dtype)
         self.backend = backend
@@ -312,8 +472,11 @@ class InterpolateGMFSSTorch(BaseInterpolate):
         self.dynamicScaledOpticalFlow = dynamicScaledOpticalFlow
         self.UHDMode = UHDMode
         self.CompareNet = None
+        # feature pyramid of frame0, carried over from when it was frame1 of the previous pair
+        self.feat0 = None
         if UHDMode:
             self.scale = 0.5
+        self.motionGate = self.buildMotionGate(motionGate)
         self._load()
 
     @torch.inference_mode()
@@ -335,7 +498,7 @@ class InterpolateGMFSSTorch(BaseInterpolate):
             from .InterpolateArchs.GMFSS.GMFSS import GMFSS
 
             _pad = 64
-            if self.dynamicScaledOpticalFlow:
+            if self.dynamicScaledOpticalFlow or self.motionGate is not None:
                 tmp = max(_pad, int(_pad / 0.25))
             else:
                 tmp = max(_pad, int(_pad / self.scale))
@@ -346,10 +509,7 @@ class InterpolateGMFSSTorch(BaseInterpolate):
             self.timestepDict = {}
             for n in range(self.ceilInterpolateFactor):
                 timestep = n / (self.ceilInterpolateFactor)
-                timestep_tens = torch.tensor(
-                    [timestep], dtype=self.dtype, device=self.device
-                ).to(non_blocking=True)
-                self.timestepDict[timestep] = timestep_tens
+                self.timestepDict[timestep] = self.makeTimestepTensor(timestep)
             self.flownet = GMFSS(
                 model_path=self.interpolateModel,
                 scale=self.scale,
@@ -373,37 +533,52 @@ class InterpolateGMFSSTorch(BaseInterpolate):
         self.prepareStream.synchronize()
 
     @torch.inference_mode()
-    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None):  # type: ignore
+    def makeTimestepTensor(self, timestep: float):
+        return torch.tensor([timestep], dtype=self.dtype, device=self.device)
+
+    @traced("interpolate")
+    @torch.inference_mode()
+    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None, timesteps: list[float] | None = None):  # type: ignore
         if self.frame0 is None:
             self.frame0 = self.frame_to_tensor(img1)
+            self.feat0 = None
             self.stream.synchronize()
             return
         frame1 = self.frame_to_tensor(img1)
+        timesteps = self.getTimesteps(timesteps)
+        feat1 = None
         with torch.cuda.stream(self.stream):  # type: ignore
+            band = self.checkMotion(frame1) if not transition and timesteps else MotionGate.FULL
+            if band == MotionGate.STATIC:
+                self.writeBlends(frame1, timesteps, writeQueue, upscaleModel)
+                timesteps = []
+            if not transition and timesteps:
+                while self.flownet is None:
+                    sleep(1)
+                closest_value = self.getPairScale(frame1, band)
+                # the flow, metric and features of the pair are the same for every timestep, only warping and fusion run per timestep
+                if self.feat0 is None:
+                    self.feat0 = self.flownet.extract_features(self.frame0)
+                feat1 = self.flownet.extract_features(frame1)
+                reuse_things = self.flownet.reuse(
+                    self.frame0, frame1, self.feat0, feat1, scale=closest_value
+                )
 
-            if self.dynamicScaledOpticalFlow:
-                closest_value = self.dynamicScale.dynamicScaleCalculation(self.frame0,frame1)
-            else:
-                closest_value = None
-
-            for n in range(self.ceilInterpolateFactor-1):
+            for timestep in timesteps:
                 if not transition:
-                    timestep = (n + 1) * 1.0 / (self.ceilInterpolateFactor)
-                    while self.flownet is None:
-                        sleep(1)
-                    timestep = self.timestepDict[timestep]
-                    output = self.flownet(self.frame0, frame1, timestep, closest_value)
+                    timestep = self.getTimestepTensor(timestep)
+                    output = self.flownet(self.frame0, frame1, timestep, reuse_things=reuse_things)
                     if upscaleModel is not None:
-                        output = upscaleModel(upscaleModel.frame_to_tensor(self.tensor_to_frame(output)))
+                        output = upscaleModel(upscaleModel.handoff_tensor(output))
                     else:
                         output = self.tensor_to_frame(output)
                     writeQueue.put(output)
                 else:
-                    if upscaleModel is not None:
-                        img1 = upscaleModel(frame1[:, :, : self.height, : self.width])
-                    writeQueue.put(img1)
+                    writeQueue.put(self.sourceFrame(img1, frame1, upscaleModel))
             
             self.copyTensor(self.frame0, frame1)
+            # a pair without interpolated frames leaves the features of frame1 to be extracted when they are needed
+            self.feat0 = feat1
            
         self.stream.synchronize()
 
@@ -422,6 +597,9 @@ class InterpolateRifeTorch(BaseInterpolate):
         UHDMode: bool = False,
         ensemble: bool = False,
         dynamicScaledOpticalFlow: bool = False,
+        transportFormat: str = "rgb24",
+        motionGate: bool = False,
+        timestepBatchSize: int = 1,
         # trt options
         trt_optimization_level: int = 5,
         *args,
@@ -429,8 +607,10 @@ class InterpolateRifeTorch(BaseInterpolate):
     ):
         
         self.interpolateModel = modelPath
+        self.requestedTimestepBatch = timestepBatchSize
         self.width = width
         self.height = height
+        self.transportFormat = transportFormat
 
         self.device:torch.device = self.handleDevice(device)
         self.dtype = self.handlePrecision(dtype)
@@ -441,6 +621,8 @@ class InterpolateRifeTorch(BaseInterpolate):
         self.CompareNet = None
         self.frame0 = None
         self.encode0 = None
+        self.pyramid0 = None
+        self.pyramidScale = None
         # set up streams for async processing
         self.scale = 1
         self.doEncodingOnFrame = True
@@ -453,6 +635,10 @@ class InterpolateRifeTorch(BaseInterpolate):
         self.UHDMode = UHDMode
         if self.UHDMode:
             self.scale = 0.5
+        # tensorrt engines are built for one flow scale, so the middle band of the gate runs at full scale
+        self.motionGate = self.buildMotionGate(
+            motionGate, reducedScale=None if backend == "tensorrt" else 0.5
+        )
         self._load()
 
     @torch.inference_mode()
@@ -517,7 +703,7 @@ class InterpolateRifeTorch(BaseInterpolate):
                     exit()
 
             # model unspecific setup
-            if self.dynamicScaledOpticalFlow:
+            if self.dynamicScaledOpticalFlow or (self.motionGate is not None and self.motionGate.reducedScale is not None):
                 tmp = max(_pad, int(_pad / 0.25)) # set pad to higher for better dynamic optical scale support
             else:
                 tmp = max(_pad, int(_pad / self.scale))
@@ -529,13 +715,7 @@ class InterpolateRifeTorch(BaseInterpolate):
             self.timestepDict = {}
             for n in range(self.ceilInterpolateFactor):
                 timestep = n / (self.ceilInterpolateFactor)
-                timestep_tens = torch.full(
-                    (1, 1, self.ph, self.pw),
-                    timestep,
-                    dtype=self.dtype,
-                    device=self.device,
-                ).to(non_blocking=True)
-                self.timestepDict[timestep] = timestep_tens
+                self.timestepDict[timestep] = self.makeTimestepTensor(timestep)
             # rife specific setup
             self.set_rife_args()  # sets backwarp_tenGrid and tenFlow_div
             self.flownet = IFNet(
@@ -576,6 +756,9 @@ class InterpolateRifeTorch(BaseInterpolate):
                     self.dynamicScale = DynamicScale(possible_values=possible_values, CompareNet=CompareNet)
                     print("Dynamic Scaled Optical Flow Enabled")
 
+            self.timestepBatch = self.selectTimestepBatch()
+            log(f"Timesteps per flownet pass: {self.timestepBatch}")
+
             if self.backend == "tensorrt":
                 from .TensorRTHandler import TorchTensorRTHandler
 
@@ -599,6 +782,7 @@ class InterpolateRifeTorch(BaseInterpolate):
                             if self.trt_optimization_level is not None
                             else ""
                         )
+                        + (f"_batch-{self.timestepBatch}" if self.timestepBatch > 1 else "")
                     ),
                 )
                 trt_engine_path = base_trt_engine_path + ".dyn"
@@ -620,7 +804,7 @@ class InterpolateRifeTorch(BaseInterpolate):
                                 device=self.device,
                             ),
                             torch.zeros(
-                                [1, 1, self.ph, self.pw],
+                                [self.timestepBatch, 1, self.ph, self.pw],
                                 dtype=self.dtype,
                                 device=self.device,
                             ),
@@ -646,7 +830,7 @@ class InterpolateRifeTorch(BaseInterpolate):
                                 device=self.device,
                             ),
                             torch.zeros(
-                                [1, 1, self.ph, self.pw],
+                                [self.timestepBatch, 1, self.ph, self.pw],
                                 dtype=self.dtype,
                                 device=self.device,
                             ),
@@ -700,6 +884,80 @@ class InterpolateRifeTorch(BaseInterpolate):
         torch.cuda.empty_cache()
         self.prepareStream.synchronize()
 
+    @torch.inference_mode()
+    def makeTimestepTensor(self, timestep: float):
+        return torch.full(
+            (1, 1, self.ph, self.pw),
+            timestep,
+            dtype=self.dtype,
+            device=self.device,
+        )
+
+    def getTimestepTensors(self, timesteps: list[float]) -> torch.Tensor:
+        """The timesteps of a batch stacked on the batch dimension, cached by the tuple of timesteps"""
+        key = tuple(timesteps)
+        if key not in self.timestepDict:
+            self.timestepDict[key] = torch.cat([self.getTimestepTensor(timestep) for timestep in timesteps])
+        return self.timestepDict[key]
+
+    def batchTimesteps(self, timesteps: list[float]) -> list[list[float]]:
+        return [
+            timesteps[i : i + self.timestepBatch]
+            for i in range(0, len(timesteps), self.timestepBatch)
+        ]
+
+    @torch.inference_mode()
+    def selectTimestepBatch(self) -> int:
+        """
+        How many timesteps of a pair go through the flownet in one pass, 1 runs them one by one.
+        0 picks as many as there are timesteps per pair, up to what fits in the free device memory, measured with a pass of one timestep.
+        """
+        if self.requestedTimestepBatch:
+            return self.requestedTimestepBatch
+        maxBatch = max(self.ceilInterpolateFactor - 1, 1)
+        if self.device.type != "cuda" or maxBatch == 1:
+            return 1
+        frame = torch.zeros((1, 3, self.ph, self.pw), dtype=self.dtype, device=self.device)
+        args = [frame, frame, self.getTimestepTensors([0.5]), self.tenFlow_div, self.backwarp_tenGrid]
+        if self.doEncodingOnFrame:
+            encoded = self.encode(frame)
+            args += [encoded, encoded]
+        torch.cuda.synchronize(self.device)
+        baseline = torch.cuda.memory_allocated(self.device)
+        torch.cuda.reset_peak_memory_stats(self.device)
+        self.flownet(*args)
+        torch.cuda.synchronize(self.device)
+        perTimestep = max(torch.cuda.max_memory_allocated(self.device) - baseline, 1)
+        freeMemory, _ = torch.cuda.mem_get_info(self.device)
+        return max(1, min(maxBatch, int(freeMemory * 0.8 // perTimestep)))
+
+    @torch.inference_mode()
+    def getPyramids(self, frame1: torch.Tensor, encode1: torch.Tensor | None, scale: float | None):
+        """
+        The downscaled input of the first flownet block for both frames of a pair, it only depends on the frame, its encode and the scale,
+        so the one of frame0 is kept from the previous pair and only frame1 is downscaled, unless the scale changed.
+        """
+        from .InterpolateArchs.RIFE.pyramid import pyramid, firstBlockScale
+
+        firstScale = firstBlockScale(self.flownet.scale_list, scale)
+        pyramid1 = pyramid(frame1, encode1 if self.doEncodingOnFrame else None, firstScale)
+        if self.pyramid0 is None or self.pyramidScale != scale:
+            self.pyramid0 = pyramid(
+                self.frame0, self.encode0 if self.doEncodingOnFrame else None, firstScale
+            )
+            self.pyramidScale = scale
+        return self.pyramid0, pyramid1
+
+    def writeOutputs(self, output: torch.Tensor, count: int, writeQueue: Queue, upscaleModel: UpscalePytorch = None):
+        """Writes the first count frames of a batched flownet output"""
+        for i in range(count):
+            frame = output[i : i + 1]
+            if upscaleModel is not None:
+                frame = upscaleModel(upscaleModel.handoff_tensor(frame))
+            else:
+                frame = self.tensor_to_frame(frame)
+            writeQueue.put(frame)
+
     @torch.inference_mode()
     def set_rife_args(self):
         self.tenFlow_div = torch.tensor(
@@ -719,14 +977,16 @@ class InterpolateRifeTorch(BaseInterpolate):
         ).to(dtype=torch.float32, device=self.device)
         self.backwarp_tenGrid = torch.cat([tenHorizontal, tenVertical], 1)
 
+    @traced("interpolate")
     @torch.inference_mode()
-    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None):  # type: ignore
+    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None, timesteps: list[float] | None = None):  # type: ignore
         with torch.cuda.stream(self.stream):  # type: ignore
 
             if self.frame0 is None:
                 self.frame0 = self.frame_to_tensor(img1)
                 if self.doEncodingOnFrame:
                     self.encode0 = self.encode_Frame(self.frame0)
+                self.pyramid0 = None
                 self.stream.synchronize()
                 return
                 
@@ -734,16 +994,20 @@ class InterpolateRifeTorch(BaseInterpolate):
             if self.doEncodingOnFrame:
                 encode1 = self.encode_Frame(frame1)
             
-            if self.dynamicScaledOpticalFlow:
-                closest_value = self.dynamicScale.dynamicScaleCalculation(self.frame0,frame1)
-            else:
-                closest_value = None
-            for n in range(self.ceilInterpolateFactor-1):
+            timesteps = self.getTimesteps(timesteps)
+            band = self.checkMotion(frame1) if not transition and timesteps else MotionGate.FULL
+            if band == MotionGate.STATIC:
+                self.writeBlends(frame1, timesteps, writeQueue, upscaleModel)
+                timesteps = []
+            closest_value = self.getPairScale(frame1, band)
+            pyramid1 = None
+            for chunk in self.batchTimesteps(timesteps):
                 if not transition:
-                    timestep = (n + 1) * 1.0 / (self.ceilInterpolateFactor)
                     while self.flownet is None:
                         sleep(1)
-                    timestep = self.timestepDict[timestep]
+                    if pyramid1 is None:
+                        pyramid0, pyramid1 = self.getPyramids(frame1, encode1 if self.doEncodingOnFrame else None, closest_value) # type: ignore
+                    timestep = self.getTimestepTensors(chunk)
                     if self.doEncodingOnFrame:
                         output = self.flownet(
                             self.frame0,
@@ -753,25 +1017,27 @@ class InterpolateRifeTorch(BaseInterpolate):
                             self.backwarp_tenGrid,
                             self.encode0,
                             encode1, # type: ignore
-                            closest_value
+                            closest_value,
+                            p0=pyramid0,
+                            p1=pyramid1,
                         )
                     else:
                         output = self.flownet(
-                            self.frame0, frame1, timestep, self.tenFlow_div, self.backwarp_tenGrid, closest_value
+                            self.frame0, frame1, timestep, self.tenFlow_div, self.backwarp_tenGrid, closest_value, p0=pyramid0, p1=pyramid1
                         )
-                    if upscaleModel is not None:
-                        output = upscaleModel(upscaleModel.frame_to_tensor(self.tensor_to_frame(output)))
-                    else:
-                        output = self.tensor_to_frame(output)
-                    writeQueue.put(output)
+                    self.writeOutputs(output, len(chunk), writeQueue, upscaleModel)
                 else:
-                    if upscaleModel is not None:
-                        img1 = upscaleModel(frame1[:, :, : self.height, : self.width])
-                    writeQueue.put(img1)
+                    for _ in chunk:
+                        writeQueue.put(self.sourceFrame(img1, frame1, upscaleModel))
             
             self.copyTensor(self.frame0, frame1)
             if self.doEncodingOnFrame:
                 self.copyTensor(self.encode0, encode1) # type: ignore
+            # a transition skips the flownet, so there is no pyramid of frame1 to keep
+            if pyramid1 is not None:
+                self.copyTensor(self.pyramid0, pyramid1)
+            else:
+                self.pyramid0 = None
 
         self.stream.synchronize()
 
@@ -785,8 +1051,9 @@ class InterpolateRifeTorch(BaseInterpolate):
         return frame
 
 class InterpolateRifeTensorRT(InterpolateRifeTorch):
+    @traced("interpolate")
     @torch.inference_mode()
-    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None): # type: ignore
+    def __call__(self, img1, writeQueue:Queue, transition=False, upscaleModel:UpscalePytorch = None, timesteps: list[float] | None = None): # type: ignore
         with torch.cuda.stream(self.stream): # type: ignore
 
             if self.frame0 is None:
@@ -799,15 +1066,21 @@ class InterpolateRifeTensorRT(InterpolateRifeTorch):
             frame1 = self.frame_to_tensor(img1)
             if self.doEncodingOnFrame:
                 encode1 = self.encode_Frame(frame1)
-            
-            for n in range(self.ceilInterpolateFactor-1):
+
+            timesteps = self.getTimesteps(timesteps)
+            if not transition and timesteps and self.checkMotion(frame1) == MotionGate.STATIC:
+                self.writeBlends(frame1, timesteps, writeQueue, upscaleModel)
+                timesteps = []
+            for chunk in self.batchTimesteps(timesteps):
 
                 while self.flownet is None:
                     sleep(1)
 
                 if not transition:
-                    timestep = (n + 1) * 1.0 / (self.ceilInterpolateFactor)
-                    timestep = self.timestepDict[timestep]
+                    # the engine has a fixed batch size, a short batch is padded with its last timestep
+                    timestep = self.getTimestepTensors(
+                        chunk + [chunk[-1]] * (self.timestepBatch - len(chunk))
+                    )
 
                     if self.doEncodingOnFrame:
                         output = self.flownet(
@@ -824,17 +1097,11 @@ class InterpolateRifeTensorRT(InterpolateRifeTorch):
                             self.frame0, frame1, timestep, self.tenFlow_div, self.backwarp_tenGrid
                         )
 
-                    if upscaleModel is not None:
-                        output = upscaleModel(upscaleModel.frame_to_tensor(self.tensor_to_frame(output)))
-                    else:
-                        output = self.tensor_to_frame(output)
-
-                    writeQueue.put(output)
+                    self.writeOutputs(output, len(chunk), writeQueue, upscaleModel)
 
                 else:
-                    if upscaleModel is not None:
-                        img1 = upscaleModel(frame1[:, :, : self.height, : self.width])
-                    writeQueue.put(img1)
+                    for _ in chunk:
+                        writeQueue.put(self.sourceFrame(img1, frame1, upscaleModel))
             
             self.copyTensor(self.frame0, frame1)
             if self.doEncodingOnFrame:
@@ -0,0 +1,119 @@
+import weakref
+from collections import deque
+from threading import Lock
+
+import numpy as np
+import torch
+
+from ..utils.FramePool import StagedFrame
+
+
+class TransferEngine:
+    """
+    Moves raw frames between the host and a device through preallocated host buffers.
+
+    upload() copies the frame into one of numInputBuffers pinned staging buffers and starts the host to device copy on its own stream.
+    The calling stream waits on the copy, the host does not, so the next frame can be staged while the device is busy.
+    download() starts the device to host copy of a finished frame into a recycled buffer, and returns it as a StagedFrame without waiting for it.
+    A buffer goes back to its ring once every view of the frame is gone, so frames can sit in the write queues for as long as they need to.
+    Output buffers are pinned up to maxPinnedBytes, any buffers past that are pageable.
+
+    On the cpu the uploads are views of the frame, and the downloads are copied into the same recycled arrays.
+    """
+
+    def __init__(
+        self,
+        device: torch.device,
+        numInputBuffers: int = 2,
+        maxPinnedBytes: int = 512 * 1024**2,
+    ):
+        self.device = device
+        self.isCuda = device.type == "cuda"
+        self.numInputBuffers = numInputBuffers
+        self.maxPinnedBytes = maxPinnedBytes
+        self.pinnedBytes = 0
+        self.copyStream = torch.cuda.Stream(device) if self.isCuda else None
+        # size in bytes -> ring of (pinned tensor, event of its last copy)
+        self.inputBuffers: dict[int, list] = {}
+        self.nextInput: dict[int, int] = {}
+        # size in bytes -> every output buffer and the indexes of the free ones
+        self.outputBuffers: dict[int, list[tuple[torch.Tensor, np.ndarray]]] = {}
+        self.freeOutputs: dict[int, deque] = {}
+        self.lock = Lock()
+
+    def allocate(self, size: int, pinned: bool) -> torch.Tensor:
+        return torch.empty(size, dtype=torch.uint8, pin_memory=pinned and self.isCuda)
+
+    @torch.inference_mode()
+    def upload(self, frame) -> torch.Tensor:
+        """
+        Returns the raw frame as a flat uint8 tensor on the device, usable on the current stream.
+        The frame itself can be reused as soon as this returns.
+        """
+        source = torch.frombuffer(frame, dtype=torch.uint8)
+        if not self.isCuda:
+            return source
+        size = source.numel()
+        if size not in self.inputBuffers:
+            self.inputBuffers[size] = [
+                [self.allocate(size, pinned=True), None]
+                for _ in range(self.numInputBuffers)
+            ]
+            self.nextInput[size] = 0
+        index = self.nextInput[size]
+        self.nextInput[size] = (index + 1) % self.numInputBuffers
+        buffer = self.inputBuffers[size][index]
+        if buffer[1] is not None:
+            # only waits if the copy from numInputBuffers uploads ago is still running
+            buffer[1].synchronize()
+        buffer[0].copy_(source)
+        with torch.cuda.stream(self.copyStream):
+            output = buffer[0].to(self.device, non_blocking=True)
+            buffer[1] = torch.cuda.Event()
+            buffer[1].record(self.copyStream)
+        currentStream = torch.cuda.current_stream(self.device)
+        currentStream.wait_event(buffer[1])
+        output.record_stream(currentStream)
+        return output
+
+    def acquireOutput(self, size: int) -> int:
+        with self.lock:
+            if size not in self.outputBuffers:
+                self.outputBuffers[size] = []
+                self.freeOutputs[size] = deque()
+            if self.freeOutputs[size]:
+                return self.freeOutputs[size].popleft()
+            pinned = self.pinnedBytes + size <= self.maxPinnedBytes
+            if pinned and self.isCuda:
+                self.pinnedBytes += size
+            tensor = self.allocate(size, pinned)
+            self.outputBuffers[size].append((tensor, tensor.numpy()))
+            return len(self.outputBuffers[size]) - 1
+
+    def releaseOutput(self, size: int, index: int):
+        with self.lock:
+            self.freeOutputs[size].append(index)
+
+    @torch.inference_mode()
+    def download(self, tensor: torch.Tensor) -> StagedFrame:
+        """
+        Copies a uint8 tensor made on the current stream into a recycled host buffer of the same shape.
+        Call synchronize() on the result before reading it.
+        """
+        size = tensor.numel()
+        index = self.acquireOutput(size)
+        hostTensor, array = self.outputBuffers[size][index]
+        event = None
+        if self.isCuda:
+            self.copyStream.wait_stream(torch.cuda.current_stream(self.device))
+            with torch.cuda.stream(self.copyStream):
+                hostTensor.copy_(tensor.reshape(-1), non_blocking=True)
+                tensor.record_stream(self.copyStream)
+                event = torch.cuda.Event()
+                event.record(self.copyStream)
+        else:
+            hostTensor.copy_(tensor.reshape(-1))
+        frame = array.reshape(tensor.shape).view(StagedFrame)
+        frame.event = event
+        weakref.finalize(frame, self.releaseOutput, size, index)
+        return frame
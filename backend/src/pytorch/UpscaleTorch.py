@@ -1,15 +1,54 @@
 import os
 import math
+import json
+import hashlib
 
 import gc
 import torch as torch
 import torch.nn.functional as F
 from time import sleep
+from threading import Thread, Event
 
 from ..utils.Util import (
     printAndLog,
+    log,
+    getProcessMemory,
     check_bfloat16_support,
 )
+from ..utils.ColorConversion import yuv420ToRGB, rgbToYUV420
+from ..utils.Tracer import traced
+from ..utils.Checkpoint import fileSignature
+from ..utils.ByteBudgetQueue import getAvailableMemory
+from ..utils.FramePool import StagedFrame
+from .TransferEngine import TransferEngine
+
+# only this much of the memory budget is used by auto tiling, the rest absorbs fragmentation and other allocations
+AUTO_TILE_MEMORY_MARGIN = 0.8
+AUTO_TILE_MIN_SIZE = 64
+AUTO_TILE_MAX_BATCH_SIZE = 8
+AUTO_TILE_CACHE_VERSION = 2
+# how often the resident memory of the process is sampled during a cpu pass, in seconds
+AUTO_TILE_SAMPLE_INTERVAL = 0.002
+
+
+def _readAutoTileCache(cacheFile: str) -> dict:
+    try:
+        with open(cacheFile, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _writeAutoTileCache(cacheFile: str, key: str, value: dict):
+    cache = _readAutoTileCache(cacheFile)
+    cache[key] = value
+    try:
+        tmpFile = cacheFile + f".{os.getpid()}.tmp"
+        with open(tmpFile, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmpFile, cacheFile)
+    except OSError as e:
+        log(f"Failed to write auto tile cache: {e}")
 
 class UpscalePytorch:
     """A class for upscaling images using PyTorch.
@@ -24,6 +63,10 @@ class UpscalePytorch:
         backend (str, optional): The backend for inference. Defaults to "pytorch".
         trt_workspace_size (int, optional): The workspace size for TensorRT. Defaults to 0.
         trt_cache_dir (str, optional): The cache directory for TensorRT. Defaults to modelsDirectory().
+        transportFormat (str, optional): The pixel format of the raw frames going in and out (rgb24/yuv420p/nv12). Defaults to "rgb24".
+        autoTile (bool, optional): Pick the tile size and batch size from a memory probe of the model, overrides tilesize. Defaults to False.
+        memoryBudget (int, optional): Bytes auto tiling can use, 0 uses the free VRAM (or available RAM on cpu). Defaults to 0.
+        outputResolution (tuple[int, int], optional): (width, height) the output is resized to on the device before it is copied back. Defaults to None, the scale of the model.
 
     Attributes:
         tile_pad (int): The padding size for tiles.
@@ -57,6 +100,10 @@ class UpscalePytorch:
         height: int = 1080,
         tilesize: int = 0,
         backend: str = "pytorch",
+        transportFormat: str = "rgb24",
+        autoTile: bool = False,
+        memoryBudget: int = 0,
+        outputResolution: tuple[int, int] | None = None,
         # trt options
         trt_workspace_size: int = 0,
         trt_cache_dir: str = None,
@@ -83,6 +130,11 @@ class UpscalePytorch:
         self.tile = [self.tilesize, self.tilesize]
         self.modelPath = modelPath
         self.backend = backend
+        self.transportFormat = transportFormat
+        self.autoTile = autoTile
+        self.memoryBudget = memoryBudget
+        self.outputResolution = outputResolution
+        self.autoBatchSize = 1
         if trt_cache_dir is None:
             trt_cache_dir = os.path.dirname(
                 modelPath
@@ -96,6 +148,7 @@ class UpscalePytorch:
         # streams
         self.stream = torch.cuda.Stream()
         self.prepareStream = torch.cuda.Stream()
+        self.transfer = TransferEngine(self.device)
         self._load()
 
     @torch.inference_mode()
@@ -112,19 +165,11 @@ class UpscalePytorch:
                     modulo = 2
                 case _:
                     modulo = 1
+            if self.autoTile:
+                self.tilesize, self.autoBatchSize = self.selectTileSize(modulo)
+                self.tile = [self.tilesize, self.tilesize]
             if all(t > 0 for t in self.tile):
-                self.pad_w = (
-                    math.ceil(
-                        min(self.tile[0] + 2 * self.tile_pad, self.videoWidth) / modulo
-                    )
-                    * modulo
-                )
-                self.pad_h = (
-                    math.ceil(
-                        min(self.tile[1] + 2 * self.tile_pad, self.videoHeight) / modulo
-                    )
-                    * modulo
-                )
+                self.pad_h, self.pad_w = self.getPaddedTileSize(self.tilesize, modulo)
             else:
                 self.pad_w = self.videoWidth
                 self.pad_h = self.videoHeight
@@ -173,6 +218,23 @@ class UpscalePytorch:
         torch.cuda.empty_cache()
         self.prepareStream.synchronize()
 
+        # every tile is padded to the same shape, so as many as fit in memory go through the model together
+        self.tileBatchSize = 1
+        if self.autoTile and self.tilesize > 0 and self.backend == "pytorch":
+            self.tileBatchSize = self.autoBatchSize
+        elif (
+            all(t > 0 for t in self.tile)
+            and self.backend == "pytorch"
+            and self.device.type == "cuda"
+        ):
+            numTiles = math.ceil(self.videoWidth / self.tile[0]) * math.ceil(
+                self.videoHeight / self.tile[1]
+            )
+            self.tileBatchSize = self.measureBatchSize(
+                self.pad_h, self.pad_w, numTiles
+            )
+            log(f"Rendering {self.tileBatchSize} of {numTiles} tiles per forward pass")
+
     @torch.inference_mode()
     def handlePrecision(self, precision):
         if precision == "auto":
@@ -205,6 +267,9 @@ class UpscalePytorch:
         # get model attributes
         self.scale = model.scale
 
+        self.sizeRequirements = model.size_requirements
+        self.tiling = model.tiling
+
         model = model.model
         model.load_state_dict(model.state_dict(), assign=True)
         model.eval().to(self.device)
@@ -212,43 +277,333 @@ class UpscalePytorch:
             model.half()
         return model
 
+    @traced("upscale.frame_to_tensor")
     @torch.inference_mode()
     def frame_to_tensor(self, frame):
+        """
+        The conversion is queued on the prepare stream and not waited for, __call__ and upscale_batch make the upscale stream wait on it.
+        The frame can be reused as soon as this returns.
+        """
         with torch.cuda.stream(self.prepareStream):
-            output = (
-                torch.frombuffer(frame, dtype=torch.uint8)
-                .to(self.device, dtype=self.dtype, non_blocking=True)
+            if self.transportFormat != "rgb24":
+                return yuv420ToRGB(
+                    self.transfer.upload(frame),
+                    self.videoWidth,
+                    self.videoHeight,
+                    self.transportFormat,
+                ).to(dtype=self.dtype)
+            return (
+                self.transfer.upload(frame)
+                .to(dtype=self.dtype)
                 .reshape(self.videoHeight, self.videoWidth, 3)
                 .permute(2, 0, 1)
                 .unsqueeze(0)
                 .mul_(1 / 255)
             )
-        self.prepareStream.synchronize()
-        return output
+
+    def waitForInput(self, image: torch.Tensor):
+        if self.device.type == "cuda":
+            self.stream.wait_stream(self.prepareStream)
+            image.record_stream(self.stream)
+
+    @torch.inference_mode()
+    def handoff_tensor(self, image: torch.Tensor) -> torch.Tensor:
+        """
+        Takes a (1, 3, H, W) tensor in the range 0-1 produced by another model on the same device, ex: an interpolated frame.
+        Unlike frame_to_tensor(tensor_to_frame()) the frame stays on the device and is not quantized to uint8.
+        """
+        image = image.clamp(0.0, 1.0).to(device=self.device, dtype=self.dtype)
+        if self.device.type == "cuda":
+            # the upscale stream has to wait for the stream the tensor was made on
+            self.stream.wait_stream(torch.cuda.current_stream(self.device))
+            image.record_stream(self.stream)
+        return image
+
+    @torch.inference_mode()
+    def resizeOutput(self, output: torch.Tensor) -> torch.Tensor:
+        """Resizes to outputResolution, antialiased, so only the pixels that are encoded get copied back"""
+        if self.outputResolution is None:
+            return output
+        width, height = self.outputResolution
+        if output.shape[-2:] == (height, width):
+            return output
+        return F.interpolate(
+            output, size=(height, width), mode="bicubic", antialias=True, align_corners=False
+        )
 
     @torch.inference_mode()
-    def __call__(self, image:torch.Tensor) -> torch.Tensor:
+    def forward(self, image: torch.Tensor) -> torch.Tensor:
+        """Queues the upscale of a (1, 3, H, W) tensor on the upscale stream, the output is resized and in the range 0-1"""
         with torch.cuda.stream(self.stream):
             while self.model is None:
                 sleep(1)
+            self.waitForInput(image)
             if self.tilesize == 0:
                 output = self.model(image)
             else:
                 output = self.renderTiledImage(image)
-            output = (
-                output.clamp(0.0, 1.0)
-                .squeeze(0)
-                .permute(1, 2, 0)
-                .mul(255)
-                .float()
-                .byte()
-                .contiguous()
-                .cpu()
-                .numpy()
+            return self.resizeOutput(output).clamp(0.0, 1.0)
+
+    @traced("upscale")
+    @torch.inference_mode()
+    def upscaleTensor(self, image: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the upscaled (1, 3, H, W) frame on the device, for another model to take over without a copy to the host.
+        The upscale stream is waited for, so the frame can be read from any stream.
+        """
+        output = self.forward(image)
+        if self.device.type == "cuda":
+            self.stream.synchronize()
+        return output
+
+    @torch.inference_mode()
+    def stageTensor(self, output: torch.Tensor) -> StagedFrame:
+        """Converts an upscaled (1, 3, H, W) frame to the transport format and starts copying it back to the host"""
+        with torch.cuda.stream(self.stream):
+            if self.transportFormat != "rgb24":
+                output = rgbToYUV420(output, self.transportFormat)
+            else:
+                output = (
+                    output.squeeze(0)
+                    .permute(1, 2, 0)
+                    .mul(255)
+                    .float()
+                    .byte()
+                    .contiguous()
+                )
+            return self.transfer.download(output)
+
+    @traced("upscale")
+    @torch.inference_mode()
+    def __call__(self, image:torch.Tensor) -> StagedFrame:
+        """
+        Returns the upscaled frame while it is still being copied back, call synchronize() on it before reading it.
+        The span of this stage only covers queueing the work, the wait shows up where the frame is read.
+        """
+        return self.stageTensor(self.forward(image))
+
+    @torch.inference_mode()
+    def measurePassMemory(self, height: int, width: int, batchSize: int = 1) -> int:
+        """
+        Runs one forward pass of batchSize (3, height, width) inputs, and returns the memory it took in bytes.
+        On cuda this is the peak allocation, on cpu the peak of the resident memory sampled during the pass, above what it was before the pass.
+        """
+        image = torch.zeros(
+            (batchSize, 3, height, width), dtype=self.dtype, device=self.device
+        )
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+            baseline = torch.cuda.memory_allocated(self.device)
+            torch.cuda.reset_peak_memory_stats(self.device)
+            with torch.cuda.stream(self.stream):
+                self.model(image)
+            self.stream.synchronize()
+            return torch.cuda.max_memory_allocated(self.device) - baseline
+        # the peak resident memory of the process can not be reset, so it is sampled for this pass only
+        baseline = getProcessMemory()
+        peak = baseline
+        passDone = Event()
+
+        def samplePeak():
+            nonlocal peak
+            while not passDone.wait(AUTO_TILE_SAMPLE_INTERVAL):
+                peak = max(peak, getProcessMemory())
+
+        sampler = Thread(target=samplePeak, daemon=True)
+        sampler.start()
+        try:
+            output = self.model(image)
+            peak = max(peak, getProcessMemory())
+            del output
+        finally:
+            passDone.set()
+            sampler.join()
+        return max(peak - baseline, 0)
+
+    def fitsInMemory(self, height: int, width: int, batchSize: int, budget: float) -> bool:
+        try:
+            return self.measurePassMemory(height, width, batchSize) <= budget
+        except torch.cuda.OutOfMemoryError:
+            return False
+        except RuntimeError as e:
+            # cpu allocations that fail are a plain RuntimeError
+            if "memory" not in str(e):
+                raise
+            return False
+        finally:
+            if self.device.type == "cuda":
+                torch.cuda.empty_cache()
+
+    def getMemoryBudget(self) -> int:
+        if self.memoryBudget:
+            return self.memoryBudget
+        if self.device.type == "cuda":
+            freeMemory, _ = torch.cuda.mem_get_info(self.device)
+            return freeMemory
+        return getAvailableMemory() or 2 * 1024**3
+
+    def getPaddedTileSize(self, tilesize: int, modulo: int) -> tuple[int, int]:
+        """Returns the (height, width) every tile is padded to, including the size requirements of the model"""
+        pad_w = math.ceil(min(tilesize + 2 * self.tile_pad, self.videoWidth) / modulo) * modulo
+        pad_h = (
+            math.ceil(min(tilesize + 2 * self.tile_pad, self.videoHeight) / modulo) * modulo
+        )
+        extra_w, extra_h = self.sizeRequirements.get_padding(pad_w, pad_h)
+        return pad_h + extra_h, pad_w + extra_w
+
+    def selectTileSize(self, modulo: int) -> tuple[int, int]:
+        """
+        Returns the largest tile size (0 for the whole frame) and then the largest batch of those that fit in the memory budget.
+        Both are binary searched with real forward passes of the loaded model,
+        the result is cached per model, device, precision, resolution and budget.
+        """
+        from .spandrel import ModelTiling
+
+        if self.device.type != "cuda" and getProcessMemory() is None:
+            log("Auto tiling needs psutil to measure memory on the cpu, not tiling")
+            return 0, 1
+        deviceName = (
+            torch.cuda.get_device_name(self.device)
+            if self.device.type == "cuda"
+            else "cpu"
+        )
+        key = hashlib.sha1(
+            f"{AUTO_TILE_CACHE_VERSION}|{fileSignature(self.modelPath)}|{deviceName}|{self.dtype}"
+            f"|{self.videoWidth}x{self.videoHeight}|{self.tile_pad}|{self.memoryBudget}".encode()
+        ).hexdigest()
+        cacheFile = os.path.join(self.trt_cache_dir, "autotile_cache.json")
+        cached = _readAutoTileCache(cacheFile).get(key)
+        if cached is not None:
+            log(f"Using cached auto tile size: {cached}")
+            return cached["tilesize"], cached["batchSize"]
+
+        budget = self.getMemoryBudget() * AUTO_TILE_MEMORY_MARGIN
+        tilesize = 0
+        height, width = self.videoHeight, self.videoWidth
+        if self.tiling == ModelTiling.INTERNAL:
+            log("The model tiles internally, not tiling")
+        elif not self.fitsInMemory(height, width, 1, budget):
+            if self.tiling == ModelTiling.DISCOURAGED:
+                printAndLog(
+                    "The model does not fit in memory, tiling it, which may cause artifacts"
+                )
+            step = math.lcm(modulo, self.sizeRequirements.multiple_of)
+            low = math.ceil(max(AUTO_TILE_MIN_SIZE, self.sizeRequirements.minimum) / step)
+            high = math.ceil(max(width, height) / step) - 1
+            tilesize = low * step
+            while low <= high:
+                middle = (low + high) // 2
+                if self.fitsInMemory(
+                    *self.getPaddedTileSize(middle * step, modulo), 1, budget
+                ):
+                    tilesize = middle * step
+                    low = middle + 1
+                else:
+                    high = middle - 1
+            height, width = self.getPaddedTileSize(tilesize, modulo)
+            maxBatchSize = math.ceil(self.videoWidth / tilesize) * math.ceil(
+                self.videoHeight / tilesize
             )
-        self.stream.synchronize()
+        else:
+            maxBatchSize = AUTO_TILE_MAX_BATCH_SIZE
+
+        batchSize = 1
+        low, high = 2, maxBatchSize
+        while low <= high:
+            middle = (low + high) // 2
+            if self.fitsInMemory(height, width, middle, budget):
+                batchSize = middle
+                low = middle + 1
+            else:
+                high = middle - 1
+        printAndLog(
+            f"Auto tiling picked a tile size of {tilesize or 'the whole frame'}, {batchSize} per forward pass"
+        )
+        _writeAutoTileCache(cacheFile, key, {"tilesize": tilesize, "batchSize": batchSize})
+        return tilesize, batchSize
+
+    @torch.inference_mode()
+    def measureBatchSize(
+        self, height: int, width: int, maxBatchSize: int, memoryFraction: float = 0.5
+    ) -> int:
+        """
+        Returns how many (3, height, width) inputs fit in one forward pass, from the peak memory of a single input pass and the free device memory.
+        """
+        inputMemory = max(self.measurePassMemory(height, width), 1)
+        freeMemory, _ = torch.cuda.mem_get_info(self.device)
+        # the single input pass is already allocated, so it counts towards the budget
+        batchSize = int((freeMemory * memoryFraction + inputMemory) // inputMemory)
+        torch.cuda.empty_cache()
+        return max(1, min(batchSize, maxBatchSize))
+
+    def estimateBatchSize(self, maxBatchSize: int = 8, memoryFraction: float = 0.5) -> int:
+        """
+        Returns how many frames fit in one forward pass.
+        Tiled rendering batches its tiles instead, and tensorrt engines are built for a batch of 1, both always use 1.
+        """
+        if (
+            maxBatchSize <= 1
+            or self.tilesize > 0
+            or self.backend == "tensorrt"
+            or self.device.type != "cuda"
+        ):
+            return 1
+        if self.autoTile:
+            return min(self.autoBatchSize, maxBatchSize)
+        return self.measureBatchSize(
+            self.videoHeight, self.videoWidth, maxBatchSize, memoryFraction
+        )
+
+    @torch.inference_mode()
+    def frames_to_tensor(self, frames: list) -> torch.Tensor:
+        """Stacks raw frames into one (N, 3, H, W) tensor"""
+        images = [self.frame_to_tensor(frame) for frame in frames]
+        with torch.cuda.stream(self.prepareStream):
+            return torch.cat(images)
+
+    @torch.inference_mode()
+    def forwardBatch(self, frames: list) -> torch.Tensor:
+        """Queues the upscale of the raw frames as one (N, 3, H, W) forward pass on the upscale stream"""
+        images = self.frames_to_tensor(frames)
+        with torch.cuda.stream(self.stream):
+            while self.model is None:
+                sleep(1)
+            self.waitForInput(images)
+            return self.resizeOutput(self.model(images)).clamp(0.0, 1.0)
+
+    @traced("upscale.batch")
+    @torch.inference_mode()
+    def upscaleTensorBatch(self, frames: list) -> torch.Tensor:
+        """upscaleTensor for a batch of raw frames, the output stays on the device as one (N, 3, H, W) tensor"""
+        output = self.forwardBatch(frames)
+        if self.device.type == "cuda":
+            self.stream.synchronize()
         return output
 
+    @traced("upscale.batch")
+    @torch.inference_mode()
+    def upscale_batch(self, frames: list) -> list:
+        """
+        Upscales the raw frames with a single forward pass, and returns them in the same order.
+        The frames are copied back to the host in one transfer, the returned frames are views of one StagedFrame.
+        """
+        return self.stageBatch(self.forwardBatch(frames))
+
+    @torch.inference_mode()
+    def stageBatch(self, output: torch.Tensor) -> list:
+        """Converts an upscaled (N, 3, H, W) batch to the transport format and starts copying it back to the host in one transfer"""
+        with torch.cuda.stream(self.stream):
+            if self.transportFormat != "rgb24":
+                output = torch.stack(
+                    [
+                        rgbToYUV420(image.unsqueeze(0), self.transportFormat)
+                        for image in output
+                    ]
+                )
+            else:
+                output = output.permute(0, 2, 3, 1).mul(255).float().byte().contiguous()
+            return list(self.transfer.download(output))
+
     def getScale(self):
         return self.scale
 
@@ -270,7 +625,9 @@ class UpscalePytorch:
         tiles_x = math.ceil(width / tile[0])
         tiles_y = math.ceil(height / tile[1])
 
-        # loop over all tiles
+        # gather the padded tiles, they all have the shape (batch, channel, pad_h, pad_w)
+        inputTiles = []
+        regions = []
         for y in range(tiles_y):
             for x in range(tiles_x):
                 # extract tile from input image
@@ -301,37 +658,48 @@ class UpscalePytorch:
                 ]
 
                 h, w = input_tile.shape[2:]
-                input_tile = F.pad(
-                    input_tile, (0, self.pad_w - w, 0, self.pad_h - h), "replicate"
-                )
-
-                # process tile
-                output_tile = self.model(
-                    input_tile.to(device=self.device, dtype=self.dtype)
+                inputTiles.append(
+                    F.pad(
+                        input_tile, (0, self.pad_w - w, 0, self.pad_h - h), "replicate"
+                    )
                 )
 
-                output_tile = output_tile[:, :, : h * scale, : w * scale]
-
-                # output tile area on total image
-                output_start_x = input_start_x * scale
-                output_end_x = input_end_x * scale
-                output_start_y = input_start_y * scale
-                output_end_y = input_end_y * scale
-
                 # output tile area without padding
                 output_start_x_tile = (input_start_x - input_start_x_pad) * scale
-                output_end_x_tile = output_start_x_tile + input_tile_width * scale
                 output_start_y_tile = (input_start_y - input_start_y_pad) * scale
-                output_end_y_tile = output_start_y_tile + input_tile_height * scale
 
-                # put tile into output image
-                output[
-                    :, :, output_start_y:output_end_y, output_start_x:output_end_x
-                ] = output_tile[
-                    :,
-                    :,
-                    output_start_y_tile:output_end_y_tile,
-                    output_start_x_tile:output_end_x_tile,
+                regions.append(
+                    (
+                        # output tile area on total image
+                        slice(input_start_y * scale, input_end_y * scale),
+                        slice(input_start_x * scale, input_end_x * scale),
+                        # the same area on the output tile
+                        slice(
+                            output_start_y_tile,
+                            output_start_y_tile + input_tile_height * scale,
+                        ),
+                        slice(
+                            output_start_x_tile,
+                            output_start_x_tile + input_tile_width * scale,
+                        ),
+                    )
+                )
+
+        # process the tiles in batches, and put each one into the output image
+        for start in range(0, len(inputTiles), self.tileBatchSize):
+            output_tiles = self.model(
+                torch.cat(inputTiles[start : start + self.tileBatchSize]).to(
+                    device=self.device, dtype=self.dtype
+                )
+            )
+            for output_tile, (
+                output_y,
+                output_x,
+                output_y_tile,
+                output_x_tile,
+            ) in zip(output_tiles.split(batch), regions[start : start + self.tileBatchSize]):
+                output[:, :, output_y, output_x] = output_tile[
+                    :, :, output_y_tile, output_x_tile
                 ]
 
         return output
@@ -0,0 +1,90 @@
+import os
+from collections import deque
+from threading import Condition
+
+from .Util import log
+from .Tracer import TRACER
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MIN_QUEUE_MEMORY = 256 * 1024**2
+
+
+def itemSize(item) -> int:
+    """Frames count with their size in bytes, control items (slot tokens, None, chunk boundaries) are free"""
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        return len(item)
+    return getattr(item, "nbytes", 0)
+
+
+def getAvailableMemory() -> int | None:
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def getQueueMemoryBudget(memoryBytes: int = None, memoryFraction: float = 0.25) -> int:
+    """
+    Returns the amount of memory the frame queues are allowed to use,
+    memoryBytes if it is set, otherwise a fraction of the memory that is currently available.
+    """
+    if memoryBytes:
+        return memoryBytes
+    availableMemory = getAvailableMemory()
+    if availableMemory is None:
+        log("Could not get the available memory, using 2GB for the frame queues")
+        return 2 * 1024**3
+    return max(int(availableMemory * memoryFraction), MIN_QUEUE_MEMORY)
+
+
+class ByteBudgetQueue:
+    """
+    A FIFO queue that blocks put() while the frames in it would take more than maxBytes.
+    An empty queue always accepts one item, so a single frame larger than the budget can not deadlock it.
+    Implements the get/put/qsize subset of queue.Queue that the render threads use.
+    """
+
+    def __init__(self, maxBytes: int):
+        self.maxBytes = maxBytes
+        self.usedBytes = 0
+        self.items = deque()
+        self.condition = Condition()
+
+    def put(self, item):
+        size = itemSize(item)
+        with self.condition:
+            if self.items and self.usedBytes + size > self.maxBytes:
+                # only a put that has to wait for the consumer shows up in the trace
+                with TRACER.span("queue.wait_put"):
+                    while self.items and self.usedBytes + size > self.maxBytes:
+                        self.condition.wait()
+            self.items.append((item, size))
+            self.usedBytes += size
+            self.condition.notify_all()
+
+    def get(self):
+        with self.condition:
+            while not self.items:
+                self.condition.wait()
+            item, size = self.items.popleft()
+            self.usedBytes -= size
+            self.condition.notify_all()
+            return item
+
+    def setMaxBytes(self, maxBytes: int):
+        with self.condition:
+            self.maxBytes = maxBytes
+            self.condition.notify_all()
+
+    def qsize(self) -> int:
+        return len(self.items)
+
+    def occupancy(self) -> float:
+        """Fraction of the byte budget in use, from 0 to 1"""
+        return min(self.usedBytes / self.maxBytes, 1.0)
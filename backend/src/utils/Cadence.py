@@ -0,0 +1,42 @@
+from collections import Counter, deque
+from fractions import Fraction
+
+
+class CadenceTracker:
+    """
+    Tracks how many source frames each drawing of an animation is held for, ex: 2 for animation on twos,
+    and re-times the interpolation between two drawings so the in-betweens are spread evenly over the whole hold,
+    instead of the held frames being repeated and all of the motion happening in the last interval.
+    The cadence is the most common hold over a sliding window, holds longer than it (a pause in the motion)
+    keep the held frames and only interpolate the last interval, like a render without cadence detection.
+    """
+
+    def __init__(self, window: int = 24, maxCadence: int = 4):
+        self.maxCadence = maxCadence
+        self.holds = deque(maxlen=window)
+        self.drawings = 0
+        self.retimedDrawings = 0
+
+    def cadence(self) -> int:
+        if not self.holds:
+            return 1
+        return Counter(self.holds).most_common(1)[0][0]
+
+    def plan(self, hold: int, outputOffsets: list[Fraction]) -> tuple[int, list[float]]:
+        """
+        hold is how many source frames the previous drawing covered, including itself,
+        outputOffsets are the times of the output frames after the previous drawing, up to and including the next one, in source frames.
+        Returns how many times the output of the previous drawing is repeated, and the timesteps to interpolate at between the two drawings,
+        together they make up every output frame before the next drawing, so the frame count does not change.
+        """
+        self.drawings += 1
+        if hold <= self.maxCadence:
+            self.holds.append(hold)
+        if hold <= self.cadence():
+            if hold > 1:
+                self.retimedDrawings += 1
+            return 0, [float(offset / hold) for offset in outputOffsets if offset != hold]
+        heldOutputs = sum(offset <= hold - 1 for offset in outputOffsets)
+        return heldOutputs, [
+            float(offset - hold + 1) for offset in outputOffsets if hold - 1 < offset < hold
+        ]
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+from dataclasses import dataclass
+
+from .Util import log, removeFolder
+
+CHECKPOINT_VERSION = 1
+
+
+@dataclass
+class ChunkBoundary:
+    """
+    Put on the write queue after the last output frame of a chunk.
+    completedFrames is the number of source frames whose output, and the interpolated frames between them, is complete.
+    """
+
+    completedFrames: int
+
+
+def fileSignature(path: str | None) -> str | None:
+    """Cheap identity of a file (path, size, mtime), so a changed model or input invalidates a checkpoint"""
+    if path is None or not os.path.exists(path):
+        return path
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+class RenderCheckpoint:
+    """
+    Keeps the encoded chunks of a render and a manifest of them next to the output file,
+    so a crashed, killed or paused render can continue from the last completed chunk in a new process.
+    The manifest is only reused if it was written with the same settings hash.
+    """
+
+    def __init__(self, outputFile: str, settings: dict):
+        self.outputFile = outputFile
+        self.directory = outputFile + "_checkpoint"
+        self.manifestFile = os.path.join(self.directory, "manifest.json")
+        self.extension = os.path.splitext(outputFile)[1]
+        self.settingsHash = hashlib.sha1(
+            json.dumps(settings, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        self.chunks: list[dict] = []
+        self.load()
+
+    def load(self):
+        if os.path.isfile(self.manifestFile):
+            try:
+                with open(self.manifestFile, "r") as f:
+                    manifest = json.load(f)
+                if (
+                    manifest.get("version") == CHECKPOINT_VERSION
+                    and manifest.get("settingsHash") == self.settingsHash
+                    and all(
+                        os.path.isfile(os.path.join(self.directory, chunk["file"]))
+                        for chunk in manifest["chunks"]
+                    )
+                ):
+                    self.chunks = manifest["chunks"]
+                    return
+                log("Checkpoint does not match the current settings, starting over")
+            except Exception as e:
+                log(f"Failed to read checkpoint manifest: {e}")
+            removeFolder(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def save(self):
+        manifest = {
+            "version": CHECKPOINT_VERSION,
+            "settingsHash": self.settingsHash,
+            "completedFrames": self.completedFrames,
+            "chunks": self.chunks,
+        }
+        tmpFile = self.manifestFile + ".tmp"
+        with open(tmpFile, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmpFile, self.manifestFile)
+
+    @property
+    def completedFrames(self) -> int:
+        if not self.chunks:
+            return 0
+        return self.chunks[-1]["completedFrames"]
+
+    def nextChunkFile(self) -> str:
+        return os.path.join(self.directory, f"chunk_{len(self.chunks):05d}{self.extension}")
+
+    def addChunk(self, chunkFile: str, completedFrames: int):
+        self.chunks.append(
+            {"file": os.path.basename(chunkFile), "completedFrames": completedFrames}
+        )
+        self.save()
+        log(f"Checkpoint saved at frame {completedFrames}")
+
+    def chunkFiles(self) -> list[str]:
+        return [os.path.join(self.directory, chunk["file"]) for chunk in self.chunks]
+
+    def remove(self):
+        removeFolder(self.directory)
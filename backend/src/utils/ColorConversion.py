@@ -0,0 +1,66 @@
+import torch
+import torch.nn.functional as F
+
+# Kr, Kb for each matrix, frames over the pipe are limited range, the decoder converts them to bt601
+MATRIX_COEFFICIENTS = {
+    "bt601": (0.299, 0.114),
+    "bt709": (0.2126, 0.0722),
+}
+
+
+@torch.inference_mode()
+def yuv420ToRGB(
+    frame: torch.Tensor,
+    width: int,
+    height: int,
+    transportFormat: str = "yuv420p",
+    matrix: str = "bt601",
+) -> torch.Tensor:
+    """
+    Converts a flat uint8 yuv420p/nv12 frame into a (1, 3, H, W) float tensor in the range 0-1, on the device of the input.
+    """
+    kr, kb = MATRIX_COEFFICIENTS[matrix]
+    kg = 1 - kr - kb
+    lumaSize = width * height
+    chromaSize = lumaSize // 4
+    frame = frame.float()
+    y = frame[:lumaSize].view(1, 1, height, width)
+    if transportFormat == "nv12":
+        uv = frame[lumaSize:].view(height // 2, width // 2, 2).permute(2, 0, 1)
+        uv = uv.unsqueeze(0)
+    else:
+        uv = frame[lumaSize : lumaSize + 2 * chromaSize].view(1, 2, height // 2, width // 2)
+    uv = F.interpolate(uv, size=(height, width), mode="bilinear", align_corners=False)
+
+    y = (y - 16.0) / 219.0
+    cb = (uv[:, 0:1] - 128.0) / 224.0
+    cr = (uv[:, 1:2] - 128.0) / 224.0
+    r = y + 2 * (1 - kr) * cr
+    b = y + 2 * (1 - kb) * cb
+    g = (y - kr * r - kb * b) / kg
+    return torch.cat((r, g, b), dim=1).clamp_(0.0, 1.0)
+
+
+@torch.inference_mode()
+def rgbToYUV420(
+    image: torch.Tensor,
+    transportFormat: str = "yuv420p",
+    matrix: str = "bt601",
+) -> torch.Tensor:
+    """
+    Converts a (1, 3, H, W) tensor in the range 0-1 to a flat uint8 yuv420p/nv12 frame, on the device of the input.
+    """
+    kr, kb = MATRIX_COEFFICIENTS[matrix]
+    kg = 1 - kr - kb
+    image = image.float()
+    r, g, b = image[:, 0:1], image[:, 1:2], image[:, 2:3]
+    y = kr * r + kg * g + kb * b
+    cb = (b - y) / (2 * (1 - kb))
+    cr = (r - y) / (2 * (1 - kr))
+    uv = F.avg_pool2d(torch.cat((cb, cr), dim=1), kernel_size=2)
+
+    y = (y * 219.0 + 16.0).round_().clamp_(0, 255).byte()
+    uv = (uv * 224.0 + 128.0).round_().clamp_(0, 255).byte()
+    if transportFormat == "nv12":
+        uv = uv.squeeze(0).permute(1, 2, 0)
+    return torch.cat((y.flatten(), uv.flatten()))
@@ -0,0 +1,87 @@
+import os
+import json
+from threading import Thread, Lock
+from multiprocessing.connection import Listener, Connection
+
+from .Util import log
+
+
+class ControlServer:
+    """
+    Local endpoint the gui controls a render through.
+    Clients send JSON commands, ex: {"command": "pause"}, and receive JSON status events pushed with broadcast().
+    Every command is handled on the thread of its client, by the handler registered for it,
+    the return value of the handler is sent back as {"event": "reply", ...}.
+    """
+
+    def __init__(self, address: str, handlers: dict):
+        self.address = address
+        self.handlers = handlers
+        self.clients: list[Connection] = []
+        self.clientsLock = Lock()
+        # replies and broadcasts come from different threads, a message has to be sent whole
+        self.sendLock = Lock()
+        if not address.startswith("\\\\") and os.path.exists(address):
+            # left over from a render that did not exit cleanly
+            os.remove(address)
+        self.listener = Listener(address)
+        self.running = True
+        Thread(target=self.acceptClients, daemon=True).start()
+        log(f"Control server listening on {address}")
+
+    def acceptClients(self):
+        while self.running:
+            try:
+                client = self.listener.accept()
+            except OSError:
+                break
+            with self.clientsLock:
+                self.clients.append(client)
+            Thread(target=self.handleClient, args=(client,), daemon=True).start()
+
+    def handleClient(self, client: Connection):
+        while self.running:
+            try:
+                message = json.loads(client.recv_bytes())
+            except (EOFError, OSError):
+                break
+            except ValueError as e:
+                self.send(client, {"event": "error", "message": f"Invalid command: {e}"})
+                continue
+            command = message.get("command")
+            handler = self.handlers.get(command)
+            if handler is None:
+                self.send(client, {"event": "error", "message": f"Unknown command: {command}"})
+                continue
+            try:
+                reply = handler(message) or {}
+                self.send(client, {"event": "reply", "command": command, **reply})
+            except Exception as e:
+                log(f"Control command {command} failed: {e}")
+                self.send(client, {"event": "error", "command": command, "message": str(e)})
+        self.removeClient(client)
+
+    def send(self, client: Connection, event: dict):
+        try:
+            with self.sendLock:
+                client.send_bytes(json.dumps(event).encode())
+        except (OSError, ValueError):
+            self.removeClient(client)
+
+    def removeClient(self, client: Connection):
+        with self.clientsLock:
+            if client in self.clients:
+                self.clients.remove(client)
+        client.close()
+
+    def broadcast(self, event: dict):
+        with self.clientsLock:
+            clients = list(self.clients)
+        for client in clients:
+            self.send(client, event)
+
+    def close(self):
+        self.running = False
+        for client in list(self.clients):
+            self.removeClient(client)
+        self.listener.close()
@@ -0,0 +1,50 @@
+import numpy as np
+import cv2
+
+from .Tracer import traced
+
+THUMBNAIL_WIDTH = 160
+
+
+class DuplicateDetector:
+    """
+    Finds frames that are the same as the last frame that was not a duplicate, ex: the held frames of animation or a static screen capture.
+    Every frame is shrunk to a thumbnail with area averaging, which keeps small changes visible while averaging out compression noise,
+    it is a duplicate if no thumbnail pixel differs by more than threshold (0-255).
+    Frames are compared to the last unique frame, not the previous one, so a slow fade can not drift through as duplicates.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        transportFormat: str = "rgb24",
+        threshold: float = 2.0,
+    ):
+        self.width = width
+        self.height = height
+        self.transportFormat = transportFormat
+        self.threshold = threshold
+        thumbnailWidth = min(width, THUMBNAIL_WIDTH)
+        self.thumbnailSize = (thumbnailWidth, max(1, round(height * thumbnailWidth / width)))
+        self.reference = None
+
+    def thumbnail(self, frame) -> np.ndarray:
+        frame = np.frombuffer(frame, dtype=np.uint8)
+        if self.transportFormat == "rgb24":
+            image = frame.reshape(self.height, self.width, 3)
+        else:
+            # the luma plane comes first in both yuv420p and nv12
+            image = frame[: self.width * self.height].reshape(self.height, self.width)
+        return cv2.resize(image, self.thumbnailSize, interpolation=cv2.INTER_AREA)
+
+    @traced("duplicate_detect")
+    def isDuplicate(self, frame) -> bool:
+        thumbnail = self.thumbnail(frame)
+        if (
+            self.reference is not None
+            and cv2.absdiff(thumbnail, self.reference).max() <= self.threshold
+        ):
+            return True
+        self.reference = thumbnail
+        return False
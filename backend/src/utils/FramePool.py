@@ -0,0 +1,69 @@
+import numpy as np
+from queue import LifoQueue
+from threading import Lock
+
+
+class FramePool:
+    """
+    A preallocated set of raw frame slots that are recycled instead of allocating a new bytes object per frame.
+    Slots are handed between threads by index, the owner of a slot gives it back with release() once nothing references it.
+    Free slots are reused last in first out, so only as many slots as the pipeline actually holds at once are ever touched,
+    and the untouched rest of the buffer is never paged in.
+    Args:
+        frameSize: int: size of a single frame in bytes
+        maxBytes: int: total amount of memory the pool is allowed to use
+        minSlots: int: lower bound on the number of slots, regardless of maxBytes
+    """
+
+    def __init__(self, frameSize: int, maxBytes: int, minSlots: int = 4):
+        self.frameSize = frameSize
+        self.numSlots = max(minSlots, maxBytes // frameSize)
+        self.buffer = np.empty((self.numSlots, frameSize), dtype=np.uint8)
+        self.refCounts = [0] * self.numSlots
+        self.lock = Lock()
+        self.freeSlots = LifoQueue()
+        # reversed so slot 0 is handed out first
+        for slot in reversed(range(self.numSlots)):
+            self.freeSlots.put(slot)
+
+    def acquire(self) -> int:
+        """Blocks until a slot is free, and returns its index"""
+        slot = self.freeSlots.get()
+        self.refCounts[slot] = 1
+        return slot
+
+    def retain(self, slot: int):
+        """Adds an owner to a slot, each owner has to call release()"""
+        with self.lock:
+            self.refCounts[slot] += 1
+
+    def release(self, slot: int):
+        with self.lock:
+            self.refCounts[slot] -= 1
+            if self.refCounts[slot] > 0:
+                return
+        self.freeSlots.put(slot)
+
+    def view(self, slot: int) -> np.ndarray:
+        """Returns a writable uint8 view of the slot, this is not a copy"""
+        return self.buffer[slot]
+
+    def inUse(self) -> int:
+        return self.numSlots - self.freeSlots.qsize()
+
+
+class StagedFrame(np.ndarray):
+    """
+    A frame read back from a device into a recycled host buffer.
+    The copy can still be running when the frame is handed on, so anything reading it has to call synchronize() first.
+    event is anything with a synchronize() method (ex: a torch.cuda.Event), or None once the frame is complete.
+    """
+
+    def __array_finalize__(self, obj):
+        # views and slices of a staged frame wait for the same copy
+        self.event = getattr(obj, "event", None)
+
+    def synchronize(self):
+        if self.event is not None:
+            self.event.synchronize()
+            self.event = None
@@ -0,0 +1,308 @@
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+from dataclasses import dataclass, field, asdict
+from fractions import Fraction
+
+try:
+    from ..constants import CWD, FFPROBE_PATH
+except ImportError:
+    CWD = os.getcwd()
+    FFPROBE_PATH = os.path.join(CWD, "bin", "ffprobe")
+from .Util import log
+
+# kept next to the other app data, so the probe of a video survives between renders
+PROBE_CACHE_DIRECTORY = os.path.join(CWD, "probe_cache")
+PROBE_CACHE_VERSION = 1
+
+
+@dataclass
+class StreamInfo:
+    index: int
+    codec: str
+    language: str | None = None
+    title: str | None = None
+    channels: int | None = None
+
+
+@dataclass
+class VideoMetadata:
+    width: int
+    height: int
+    fps: float
+    frameRate: str  # exact average frame rate as a fraction string, ex: 24000/1001
+    timeBase: str
+    totalFrames: int
+    duration: float
+    isVFR: bool
+    codec: str
+    pixelFormat: str
+    bitrate: int
+    container: str
+    colorSpace: str | None = None
+    colorRange: str | None = None
+    colorPrimaries: str | None = None
+    colorTransfer: str | None = None
+    exactFrameCount: bool = False
+    audioStreams: list[StreamInfo] = field(default_factory=list)
+    subtitleStreams: list[StreamInfo] = field(default_factory=list)
+
+    def frameRateFraction(self) -> Fraction:
+        return Fraction(self.frameRate)
+
+    def timeBaseFraction(self) -> Fraction:
+        return Fraction(self.timeBase)
+
+    @staticmethod
+    def fromDict(data: dict) -> "VideoMetadata":
+        data = dict(data)
+        data["audioStreams"] = [StreamInfo(**s) for s in data["audioStreams"]]
+        data["subtitleStreams"] = [StreamInfo(**s) for s in data["subtitleStreams"]]
+        return VideoMetadata(**data)
+
+
+_memoryCache: dict[str, VideoMetadata] = {}
+_packetCache: dict[str, "PacketTimestamps"] = {}
+
+
+def getFFprobePath() -> str | None:
+    for path in (FFPROBE_PATH, FFPROBE_PATH + ".exe"):
+        if os.path.isfile(path):
+            return path
+    return shutil.which("ffprobe")
+
+
+def _cacheKey(inputFile: str, countPackets: bool) -> str:
+    stat = os.stat(inputFile)
+    key = f"{PROBE_CACHE_VERSION}|{os.path.realpath(inputFile)}|{stat.st_size}|{stat.st_mtime_ns}|{countPackets}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _readCache(key: str) -> VideoMetadata | None:
+    if key in _memoryCache:
+        return _memoryCache[key]
+    cacheFile = os.path.join(PROBE_CACHE_DIRECTORY, key + ".json")
+    if not os.path.isfile(cacheFile):
+        return None
+    try:
+        with open(cacheFile, "r") as f:
+            metadata = VideoMetadata.fromDict(json.load(f))
+    except Exception as e:
+        log(f"Failed to read probe cache: {e}")
+        return None
+    _memoryCache[key] = metadata
+    return metadata
+
+
+def _writeCache(key: str, metadata: VideoMetadata):
+    _memoryCache[key] = metadata
+    try:
+        os.makedirs(PROBE_CACHE_DIRECTORY, exist_ok=True)
+        cacheFile = os.path.join(PROBE_CACHE_DIRECTORY, key + ".json")
+        tmpFile = cacheFile + f".{os.getpid()}.tmp"
+        with open(tmpFile, "w") as f:
+            json.dump(asdict(metadata), f)
+        os.replace(tmpFile, cacheFile)
+    except Exception as e:
+        log(f"Failed to write probe cache: {e}")
+
+
+def _frameCountFromTags(stream: dict) -> int | None:
+    # matroska stores the frame count in the stream statistics tags
+    for tag, value in stream.get("tags", {}).items():
+        if tag.upper().startswith("NUMBER_OF_FRAMES"):
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def _fraction(value: str) -> Fraction:
+    try:
+        return Fraction(value)
+    except (ValueError, ZeroDivisionError):
+        return Fraction(0)
+
+
+def _parseStreamInfo(stream: dict) -> StreamInfo:
+    tags = stream.get("tags", {})
+    return StreamInfo(
+        index=stream["index"],
+        codec=stream.get("codec_name", "unknown"),
+        language=tags.get("language"),
+        title=tags.get("title"),
+        channels=stream.get("channels"),
+    )
+
+
+def parseProbeOutput(probe: dict, inputFile: str) -> VideoMetadata:
+    streams = probe.get("streams", [])
+    videoStreams = [
+        s
+        for s in streams
+        if s.get("codec_type") == "video"
+        and not s.get("disposition", {}).get("attached_pic", 0)
+    ]
+    if not videoStreams:
+        raise ValueError(f"No video stream found in {inputFile}")
+    video = videoStreams[0]
+    fmt = probe.get("format", {})
+
+    realFrameRate = _fraction(video.get("r_frame_rate", "0/0"))
+    frameRate = _fraction(video.get("avg_frame_rate", "0/0"))
+    if frameRate == 0:
+        frameRate = realFrameRate
+    duration = float(video.get("duration", fmt.get("duration", 0.0)))
+
+    exactFrameCount = False
+    if "nb_read_packets" in video:
+        totalFrames = int(video["nb_read_packets"])
+        exactFrameCount = True
+    elif "nb_frames" in video:
+        totalFrames = int(video["nb_frames"])
+    else:
+        totalFrames = _frameCountFromTags(video)
+        if totalFrames is None:
+            totalFrames = round(duration * frameRate)
+
+    return VideoMetadata(
+        width=int(video["width"]),
+        height=int(video["height"]),
+        fps=float(frameRate),
+        frameRate=str(frameRate),
+        timeBase=video.get("time_base", "1/1"),
+        totalFrames=totalFrames,
+        duration=duration,
+        isVFR=realFrameRate != frameRate,
+        codec=video.get("codec_name", "unknown"),
+        pixelFormat=video.get("pix_fmt", "unknown"),
+        bitrate=int(video.get("bit_rate", fmt.get("bit_rate", 0)) or 0),
+        container=os.path.splitext(inputFile)[1].lstrip("."),
+        colorSpace=video.get("color_space"),
+        colorRange=video.get("color_range"),
+        colorPrimaries=video.get("color_primaries"),
+        colorTransfer=video.get("color_transfer"),
+        exactFrameCount=exactFrameCount,
+        audioStreams=[
+            _parseStreamInfo(s) for s in streams if s.get("codec_type") == "audio"
+        ],
+        subtitleStreams=[
+            _parseStreamInfo(s) for s in streams if s.get("codec_type") == "subtitle"
+        ],
+    )
+
+
+def probeVideo(inputFile: str, countPackets: bool = False) -> VideoMetadata:
+    """
+    Runs ffprobe once and returns the metadata of the first video stream, along with the audio and subtitle streams.
+    countPackets demuxes the whole file to get an exact frame count, this is slower, but is correct for vfr and mkv input.
+    Results are cached on disk by path, size and modification time.
+    """
+    key = _cacheKey(inputFile, countPackets)
+    metadata = _readCache(key)
+    if metadata is None and not countPackets:
+        # an exact probe is just as good
+        metadata = _readCache(_cacheKey(inputFile, True))
+    if metadata is not None:
+        log(f"Using cached probe for {inputFile}")
+        return metadata
+
+    ffprobe = getFFprobePath()
+    if ffprobe is None:
+        raise FileNotFoundError("ffprobe not found")
+    command = [
+        ffprobe,
+        "-v",
+        "error",
+        "-print_format",
+        "json",
+        "-show_format",
+        "-show_streams",
+    ]
+    if countPackets:
+        command.append("-count_packets")
+    command.append(inputFile)
+    log("FFPROBE COMMAND: " + str(command))
+    output = subprocess.run(command, capture_output=True, text=True, check=True)
+    metadata = parseProbeOutput(json.loads(output.stdout), inputFile)
+    _writeCache(key, metadata)
+    return metadata
+
+
+@dataclass
+class PacketTimestamps:
+    """Presentation timestamps of every video packet, sorted, with the indexes of the keyframes among them."""
+
+    pts: list[int]
+    keyframeIndexes: list[int]
+    timeBase: Fraction
+    startTime: float
+
+    def timeOf(self, frameIndex: int) -> float:
+        """Position of a frame in seconds, relative to the start of the file (what ffmpeg -ss expects)"""
+        return float(self.pts[frameIndex] * self.timeBase) - self.startTime
+
+
+def probePacketTimestamps(inputFile: str) -> PacketTimestamps:
+    """
+    Lists the packets of the first video stream, this only demuxes the file, nothing is decoded.
+    The result is kept in memory for the lifetime of the process.
+    """
+    key = _cacheKey(inputFile, True)
+    if key in _packetCache:
+        return _packetCache[key]
+    ffprobe = getFFprobePath()
+    if ffprobe is None:
+        raise FileNotFoundError("ffprobe not found")
+    command = [
+        ffprobe,
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts,flags:stream=time_base:format=start_time",
+        "-print_format",
+        "json",
+        inputFile,
+    ]
+    log("FFPROBE COMMAND: " + str(command))
+    output = subprocess.run(command, capture_output=True, text=True, check=True)
+    probe = json.loads(output.stdout)
+
+    packets = [
+        (int(p["pts"]), "K" in p.get("flags", ""))
+        for p in probe.get("packets", [])
+        if p.get("pts") not in (None, "N/A")
+    ]
+    packets.sort(key=lambda p: p[0])
+    _packetCache[key] = PacketTimestamps(
+        pts=[p[0] for p in packets],
+        keyframeIndexes=[i for i, p in enumerate(packets) if p[1]],
+        timeBase=_fraction(probe["streams"][0].get("time_base", "1/1")),
+        startTime=float(probe.get("format", {}).get("start_time", 0.0) or 0.0),
+    )
+    return _packetCache[key]
+
+
+def getFrameTime(inputFile: str, frameIndex: int, fps: float) -> float:
+    """
+    Returns the position of frameIndex in seconds, relative to the start of the file.
+    Uses the real packet timestamps when ffprobe is available, and assumes a constant framerate otherwise.
+    """
+    try:
+        return probePacketTimestamps(inputFile).timeOf(frameIndex)
+    except Exception as e:
+        log(f"Could not get packet timestamps, assuming constant framerate: {e}")
+        return frameIndex / fps
+
+
+def getSeekTime(inputFile: str, frameIndex: int, fps: float) -> float:
+    """
+    Returns the position to pass to ffmpeg -ss to start decoding at frameIndex.
+    The position is half a frame early, so rounding never skips the frame.
+    """
+    return max(getFrameTime(inputFile, frameIndex, fps) - 0.5 / fps, 0.0)
@@ -3,6 +3,7 @@ import cv2
 from collections import deque
 import sys
 from .Util import bytesToImg
+from .Tracer import traced
 from .PySceneDetectUtils import ContentDetector
 
 
@@ -230,9 +231,11 @@ class SceneDetect:
         sceneChangeSensitivity: float = 2.0,
         width: int = 1920,
         height: int = 1080,
+        transportFormat: str = "rgb24",
     ):
         self.width = width
         self.height = height
+        self.transportFormat = transportFormat
         # this is just the argument from the command line, default is mean
         if sceneChangeMethod == "mean":
             self.detector = NPMeanSCDetect(sensitivity=sceneChangeSensitivity)
@@ -255,7 +258,13 @@ class SceneDetect:
         else:
             raise ValueError("Invalid scene change method")
 
+    @traced("scene_detect")
     def detect(self, frame):
-        frame = bytesToImg(frame, width=self.width, height=self.height)
+        frame = bytesToImg(
+            frame,
+            width=self.width,
+            height=self.height,
+            transportFormat=self.transportFormat,
+        )
         out = self.detector.sceneDetect(frame)
         return out
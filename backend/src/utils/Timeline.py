@@ -0,0 +1,42 @@
+from fractions import Fraction
+
+
+class OutputTimeline:
+    """
+    Places the output frames on the input: output frame j shows the input at time j / interpolateFactor,
+    measured in input frames from the first frame of the render.
+    The factor is kept as an exact fraction, so 2.5x writes 5 frames for every 2 input frames and never drifts.
+    """
+
+    def __init__(self, interpolateFactor: float):
+        self.factor = Fraction(interpolateFactor).limit_denominator(1001)
+
+    def outputTimes(self, start: int, end: int) -> list[Fraction]:
+        """The input times of the output frames after input frame start, up to and including input frame end"""
+        p, q = self.factor.numerator, self.factor.denominator
+        first = start * p // q + 1
+        last = end * p // q
+        return [Fraction(j * q, p) for j in range(first, last + 1)]
+
+    def isOnGrid(self, position: int) -> bool:
+        """Whether an output frame lands exactly on input frame position"""
+        return position * self.factor.numerator % self.factor.denominator == 0
+
+    def frameCount(
+        self, start: int, end: int, writeStart: bool = True, writeEnd: bool = True
+    ) -> int:
+        """
+        The number of output frames a render of input frames start to end (inclusive) writes.
+        The first frame has nothing before it to interpolate from, so only the frames after it are interpolated,
+        writeStart and writeEnd are False when the frame on start or end is written by another render.
+        """
+        if end < start:
+            return 0
+        p, q = self.factor.numerator, self.factor.denominator
+        count = end * p // q - start * p // q
+        if writeStart and self.isOnGrid(start):
+            count += 1
+        if not writeEnd and self.isOnGrid(end):
+            count -= 1
+        return count
+
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import functools
+import threading
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Records how long each pipeline stage takes, per thread, with perf_counter_ns.
+    Disabled by default, a disabled tracer hands out a shared no-op span, so the instrumented code pays one attribute check.
+    Spans of device work are only accurate where the stage synchronizes its stream before returning, which all the model stages do.
+    Nested spans (ex: the upscale inside an interpolation) are inclusive.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: list[tuple[str, int, int, int]] = []
+        self.threadNames: dict[int, str] = {}
+        self.startNs = time.perf_counter_ns()
+
+    def enable(self):
+        self.enabled = True
+        self.startNs = time.perf_counter_ns()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, startNs: int, endNs: int):
+        thread = threading.current_thread()
+        if thread.ident not in self.threadNames:
+            self.threadNames[thread.ident] = thread.name
+        # list.append is atomic, so the render threads do not need a lock here
+        self.events.append((name, thread.ident, startNs, endNs - startNs))
+
+    def writeChromeTrace(self, path: str):
+        """Writes the spans in the chrome trace event format, which chrome://tracing and ui.perfetto.dev can open"""
+        pid = os.getpid()
+        traceEvents = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self.threadNames.items()
+        ]
+        traceEvents += [
+            {
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "pid": pid,
+                "tid": tid,
+                "ts": (startNs - self.startNs) / 1000,
+                "dur": durationNs / 1000,
+            }
+            for name, tid, startNs, durationNs in self.events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": traceEvents, "displayTimeUnit": "ms"}, f)
+
+    def summary(self) -> str:
+        durations: dict[str, list[int]] = {}
+        for name, _, _, durationNs in self.events:
+            durations.setdefault(name, []).append(durationNs)
+        lines = [
+            f"{'stage':<24}{'count':>8}{'total s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        ]
+        for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            values.sort()
+            p50 = values[len(values) // 2]
+            p95 = values[min(int(len(values) * 0.95), len(values) - 1)]
+            lines.append(
+                f"{name:<24}{len(values):>8}{sum(values) / 1e9:>10.2f}{sum(values) / len(values) / 1e6:>10.2f}"
+                f"{p50 / 1e6:>10.2f}{p95 / 1e6:>10.2f}{values[-1] / 1e6:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+TRACER = Tracer()
+
+
+def traced(name: str):
+    """Decorator that records every call of the function as a span of the global tracer"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            with _Span(TRACER, name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -3,14 +3,17 @@ import warnings
 import numpy as np
 import cv2
 import shutil
+import multiprocessing
 
 try:
     from ..constants import CWD
 except ImportError:
     CWD = os.getcwd()
 
-with open(os.path.join(CWD, "backend_log.txt"), "w") as f:
-    pass
+# worker processes (segmented rendering) import this too, only the main process starts a new log
+if multiprocessing.parent_process() is None:
+    with open(os.path.join(CWD, "backend_log.txt"), "w") as f:
+        pass
 
 
 def removeFile(file):
@@ -53,10 +56,66 @@ def log(message: str):
         f.write(message + "\n")
 
 
+def getProcessMemory() -> int | None:
+    """Resident memory of this process in bytes, None if psutil is not installed"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def transportFrameSize(width: int, height: int, transportFormat: str = "rgb24") -> int:
+    """
+    Returns the size in bytes of one raw frame in the pixel format used on the ffmpeg pipes
+    """
+    if transportFormat in ("yuv420p", "nv12"):
+        return width * height * 3 // 2
+    return width * height * 3
+
+
+def parseFramePosition(position: str, fps: float) -> int:
+    """
+    Converts a position in the video to a frame index.
+    Accepts a frame index with an f suffix (240f), seconds (12.5) or a timestamp ([HH:]MM:SS[.ms]).
+    """
+    position = str(position).strip()
+    if position.lower().endswith("f"):
+        return int(position[:-1])
+    seconds = 0.0
+    for part in position.split(":"):
+        seconds = seconds * 60 + float(part)
+    return round(seconds * fps)
+
+
+def parseResolution(resolution: str) -> tuple[int, int]:
+    """Converts WxH (ex: 1920x1080) to (width, height)"""
+    try:
+        width, height = (int(value) for value in resolution.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid resolution {resolution}, expected WxH, ex: 1920x1080")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid resolution {resolution}, both sides must be positive")
+    return width, height
+
+
 def bytesToImg(
-    image: bytes, width, height, outputWidth: int = None, outputHeight: int = None
+    image: bytes,
+    width,
+    height,
+    outputWidth: int = None,
+    outputHeight: int = None,
+    transportFormat: str = "rgb24",
 ) -> np.ndarray:
-    frame = np.frombuffer(image, dtype=np.uint8).reshape(height, width, 3)
+    match transportFormat:
+        case "yuv420p":
+            frame = np.frombuffer(image, dtype=np.uint8).reshape(height * 3 // 2, width)
+            frame = cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_I420)
+        case "nv12":
+            frame = np.frombuffer(image, dtype=np.uint8).reshape(height * 3 // 2, width)
+            frame = cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_NV12)
+        case _:
+            frame = np.frombuffer(image, dtype=np.uint8).reshape(height, width, 3)
     if outputHeight and outputWidth:
         frame = cv2.resize(frame, dsize=(100, 100))
     return frame
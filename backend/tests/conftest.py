@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIRECTORY)
+
+# the backend keeps its log, probe cache and checkpoints in the working directory, keep them out of the tree
+os.chdir(tempfile.mkdtemp(prefix="rve_tests_"))
@@ -0,0 +1,76 @@
+from threading import Thread
+
+from src.utils.ByteBudgetQueue import (
+    ByteBudgetQueue,
+    MIN_QUEUE_MEMORY,
+    getQueueMemoryBudget,
+    itemSize,
+)
+
+
+def putInThread(queue: ByteBudgetQueue, item) -> Thread:
+    thread = Thread(target=queue.put, args=(item,), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_item_sizes():
+    assert itemSize(b"1234") == 4
+    assert itemSize(memoryview(bytearray(6))) == 6
+    # slot indexes, the end of the stream and chunk boundaries do not count against the budget
+    assert itemSize(3) == 0
+    assert itemSize(None) == 0
+
+
+def test_first_in_first_out():
+    queue = ByteBudgetQueue(100)
+    for item in (b"a", 1, None, b"b"):
+        queue.put(item)
+    assert [queue.get() for _ in range(4)] == [b"a", 1, None, b"b"]
+
+
+def test_put_blocks_over_the_budget():
+    queue = ByteBudgetQueue(10)
+    queue.put(b"x" * 8)
+    thread = putInThread(queue, b"y" * 4)
+    thread.join(0.2)
+    assert thread.is_alive()
+    assert queue.qsize() == 1
+
+    assert queue.get() == b"x" * 8
+    thread.join(1)
+    assert not thread.is_alive()
+    assert queue.usedBytes == 4
+
+
+def test_control_items_never_block():
+    queue = ByteBudgetQueue(10)
+    queue.put(b"x" * 10)
+    thread = putInThread(queue, None)
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_empty_queue_takes_a_frame_larger_than_the_budget():
+    queue = ByteBudgetQueue(10)
+    thread = putInThread(queue, b"x" * 100)
+    thread.join(1)
+    assert not thread.is_alive()
+    assert queue.occupancy() == 1.0
+
+
+def test_raising_the_budget_wakes_a_blocked_put():
+    queue = ByteBudgetQueue(10)
+    queue.put(b"x" * 8)
+    thread = putInThread(queue, b"y" * 4)
+    thread.join(0.2)
+    assert thread.is_alive()
+    queue.setMaxBytes(20)
+    thread.join(1)
+    assert not thread.is_alive()
+    assert queue.occupancy() == 0.6
+
+
+def test_memory_budget():
+    assert getQueueMemoryBudget(123) == 123
+    assert getQueueMemoryBudget(None, 0.25) >= MIN_QUEUE_MEMORY
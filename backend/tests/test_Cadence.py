@@ -0,0 +1,59 @@
+from fractions import Fraction
+
+from src.utils.Cadence import CadenceTracker
+from src.utils.Timeline import OutputTimeline
+
+
+def offsets(hold: int, interpolateFactor: float = 2) -> list[Fraction]:
+    """The output times after a drawing at input frame 0, up to the next drawing at input frame hold"""
+    return OutputTimeline(interpolateFactor).outputTimes(0, hold)
+
+
+def test_no_held_frames():
+    tracker = CadenceTracker()
+    assert tracker.plan(1, offsets(1)) == (0, [0.5])
+    assert tracker.retimedDrawings == 0
+
+
+def test_on_twos_the_in_betweens_are_spread_over_the_hold():
+    tracker = CadenceTracker()
+    assert tracker.plan(2, offsets(2)) == (0, [0.25, 0.5, 0.75])
+    assert tracker.cadence() == 2
+    assert tracker.retimedDrawings == 1
+
+
+def test_frame_count_does_not_change():
+    tracker = CadenceTracker()
+    for hold in (2, 2, 3, 1):
+        outputOffsets = offsets(hold, 2.5)
+        heldOutputs, timesteps = tracker.plan(hold, outputOffsets)
+        # the output on the next drawing is written with it
+        assert heldOutputs + len(timesteps) == len(outputOffsets) - (outputOffsets[-1] == hold)
+
+
+def test_a_pause_keeps_the_held_frames():
+    tracker = CadenceTracker()
+    tracker.plan(2, offsets(2))
+    tracker.plan(2, offsets(2))
+    # held for 3 on twos, the first 2 frames repeat and only the last interval is interpolated
+    assert tracker.plan(3, offsets(3)) == (4, [0.5])
+    assert tracker.retimedDrawings == 2
+
+
+def test_the_cadence_is_the_most_common_hold():
+    tracker = CadenceTracker(window=4)
+    for hold in (3, 3, 2):
+        tracker.plan(hold, offsets(hold))
+    assert tracker.cadence() == 3
+    for hold in (2, 2):
+        tracker.plan(hold, offsets(hold))
+    # the window only keeps the last 4 holds
+    assert tracker.cadence() == 2
+
+
+def test_long_holds_are_not_recorded():
+    tracker = CadenceTracker(maxCadence=4)
+    for _ in range(3):
+        tracker.plan(8, offsets(8))
+    assert tracker.cadence() == 1
+    assert tracker.plan(8, offsets(8))[0] == 14
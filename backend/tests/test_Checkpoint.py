@@ -0,0 +1,112 @@
+import os
+import math
+
+from src.FFmpeg import FFMpegRender
+from src.utils.Checkpoint import RenderCheckpoint, fileSignature
+
+
+def writeChunk(checkpoint: RenderCheckpoint, completedFrames: int) -> str:
+    chunkFile = checkpoint.nextChunkFile()
+    with open(chunkFile, "wb") as f:
+        f.write(b"chunk")
+    checkpoint.addChunk(chunkFile, completedFrames)
+    return chunkFile
+
+
+def test_new_checkpoint_starts_at_zero(tmp_path):
+    checkpoint = RenderCheckpoint(str(tmp_path / "out.mp4"), {"crf": 18})
+    assert checkpoint.completedFrames == 0
+    assert checkpoint.chunkFiles() == []
+    assert checkpoint.nextChunkFile().endswith("chunk_00000.mp4")
+
+
+def test_resumes_from_the_last_chunk(tmp_path):
+    outputFile = str(tmp_path / "out.mp4")
+    checkpoint = RenderCheckpoint(outputFile, {"crf": 18})
+    first = writeChunk(checkpoint, 240)
+    second = writeChunk(checkpoint, 480)
+
+    resumed = RenderCheckpoint(outputFile, {"crf": 18})
+    assert resumed.completedFrames == 480
+    assert resumed.chunkFiles() == [first, second]
+    assert resumed.nextChunkFile().endswith("chunk_00002.mp4")
+
+
+def test_different_settings_start_over(tmp_path):
+    outputFile = str(tmp_path / "out.mp4")
+    writeChunk(RenderCheckpoint(outputFile, {"crf": 18}), 240)
+
+    resumed = RenderCheckpoint(outputFile, {"crf": 20})
+    assert resumed.completedFrames == 0
+    assert os.listdir(resumed.directory) == []
+
+
+def test_missing_chunk_starts_over(tmp_path):
+    outputFile = str(tmp_path / "out.mp4")
+    checkpoint = RenderCheckpoint(outputFile, {"crf": 18})
+    writeChunk(checkpoint, 240)
+    os.remove(writeChunk(checkpoint, 480))
+
+    assert RenderCheckpoint(outputFile, {"crf": 18}).completedFrames == 0
+
+
+def test_corrupt_manifest_starts_over(tmp_path):
+    outputFile = str(tmp_path / "out.mp4")
+    checkpoint = RenderCheckpoint(outputFile, {"crf": 18})
+    writeChunk(checkpoint, 240)
+    with open(checkpoint.manifestFile, "w") as f:
+        f.write("{")
+
+    assert RenderCheckpoint(outputFile, {"crf": 18}).completedFrames == 0
+
+
+def test_file_signature_changes_with_the_file(tmp_path):
+    path = tmp_path / "model.pth"
+    path.write_bytes(b"a")
+    before = fileSignature(str(path))
+    path.write_bytes(b"ab")
+    assert fileSignature(str(path)) != before
+    assert fileSignature(None) is None
+    assert fileSignature("missing.pth") == "missing.pth"
+
+
+def resumeRender(tmp_path, completedFrames: int, interpolateFactor: float, firstFrameIndex: int = 0, totalInputFrames: int = 1000):
+    """Runs setupCheckpoint on a render with only the fields it reads, after a previous run completed completedFrames"""
+    outputFile = str(tmp_path / "out.mp4")
+    writeChunk(RenderCheckpoint(outputFile, {}), completedFrames)
+    render = FFMpegRender.__new__(FFMpegRender)
+    render.inputFile = str(tmp_path / "missing.mp4")
+    render.outputFile = outputFile
+    render.fps = 24.0
+    render.ceilInterpolateFactor = math.ceil(interpolateFactor)
+    render.firstFrameIndex = firstFrameIndex
+    render.totalInputFrames = totalInputFrames
+    render.frame_count = None
+    render.start_time = None
+    render.overlap_first_frame = False
+    render.setupCheckpoint(10, {})
+    return render
+
+
+def test_resume_without_interpolation_skips_the_written_frames(tmp_path):
+    render = resumeRender(tmp_path, 480, 1)
+    assert not render.overlap_first_frame
+    assert render.firstFrameIndex == 480
+    assert render.totalInputFrames == 520
+    assert render.checkpointFrames == 240
+
+
+def test_resume_with_interpolation_decodes_the_last_written_frame_again(tmp_path):
+    render = resumeRender(tmp_path, 480, 2)
+    assert render.overlap_first_frame
+    assert render.firstFrameIndex == 479
+    assert render.totalInputFrames == 521
+    # seeks half a frame before the frame it starts on
+    assert abs(render.start_time - (479 - 0.5) / 24) < 1e-9
+
+
+def test_resume_inside_a_frame_range(tmp_path):
+    # --start 100f, completedFrames counts from the start of the video
+    render = resumeRender(tmp_path, 480, 2, firstFrameIndex=100, totalInputFrames=900)
+    assert render.firstFrameIndex == 479
+    assert render.totalInputFrames == 521
@@ -0,0 +1,66 @@
+import pytest
+
+from src.FFmpeg import FFMpegRender
+from src.utils.Util import parseFramePosition
+
+
+def test_frame_index():
+    assert parseFramePosition("240f", 24) == 240
+    assert parseFramePosition(" 0F ", 24) == 0
+
+
+def test_seconds():
+    assert parseFramePosition("12.5", 24) == 300
+    assert parseFramePosition("0", 24) == 0
+
+
+def test_timestamps():
+    assert parseFramePosition("01:00", 24) == 1440
+    assert parseFramePosition("1:02:03.5", 24) == round(3723.5 * 24)
+
+
+def test_rounds_to_the_nearest_frame():
+    # 1 second at 23.976 fps is 23.976 frames
+    assert parseFramePosition("1", 24000 / 1001) == 24
+
+
+def frameRangeRender(tmp_path, totalInputFrames: int = 1000) -> FFMpegRender:
+    """A render with only the fields setupFrameRange reads"""
+    render = FFMpegRender.__new__(FFMpegRender)
+    render.inputFile = str(tmp_path / "missing.mp4")
+    render.fps = 24.0
+    render.totalInputFrames = totalInputFrames
+    render.timelineOffset = 0
+    render.start_time = None
+    render.trimStart = None
+    render.trimDuration = None
+    return render
+
+
+def test_frame_range(tmp_path):
+    render = frameRangeRender(tmp_path)
+    render.setupFrameRange("100f", "340f")
+    assert render.firstFrameIndex == 100
+    assert render.totalInputFrames == render.frame_count == 240
+    # the first rendered frame is at position 0 on the output timeline
+    assert render.firstFrameIndex + render.timelineOffset == 0
+    assert render.trimDuration == 10.0
+
+
+def test_end_is_clamped_to_the_video(tmp_path):
+    render = frameRangeRender(tmp_path)
+    render.setupFrameRange("900f", "2000f")
+    assert render.totalInputFrames == 100
+
+
+def test_start_only(tmp_path):
+    render = frameRangeRender(tmp_path)
+    render.setupFrameRange("10", None)
+    assert render.firstFrameIndex == 240
+    assert render.totalInputFrames == 760
+
+
+@pytest.mark.parametrize("start, end", [("500f", "500f"), ("600f", "500f"), ("1000f", None)])
+def test_empty_ranges(tmp_path, start, end):
+    with pytest.raises(ValueError):
+        frameRangeRender(tmp_path).setupFrameRange(start, end)
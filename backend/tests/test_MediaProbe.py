@@ -0,0 +1,88 @@
+import pytest
+
+from src.utils.MediaProbe import parseProbeOutput
+
+
+def videoStream(**fields) -> dict:
+    stream = {
+        "index": 0,
+        "codec_type": "video",
+        "codec_name": "h264",
+        "width": 1920,
+        "height": 1080,
+        "avg_frame_rate": "24000/1001",
+        "r_frame_rate": "24000/1001",
+        "time_base": "1/24000",
+        "pix_fmt": "yuv420p",
+        "duration": "10.010000",
+        "nb_frames": "240",
+    }
+    stream.update(fields)
+    return stream
+
+
+def test_reads_the_first_video_stream():
+    metadata = parseProbeOutput({"streams": [videoStream()]}, "input.mp4")
+    assert (metadata.width, metadata.height) == (1920, 1080)
+    assert metadata.frameRate == "24000/1001"
+    assert metadata.totalFrames == 240
+    assert metadata.container == "mp4"
+    assert not metadata.isVFR
+    assert not metadata.exactFrameCount
+
+
+def test_skips_cover_art():
+    cover = videoStream(index=0, codec_name="mjpeg", width=600, height=600, disposition={"attached_pic": 1})
+    metadata = parseProbeOutput({"streams": [cover, videoStream(index=1)]}, "input.mkv")
+    assert metadata.codec == "h264"
+    assert metadata.width == 1920
+
+
+def test_no_video_stream():
+    with pytest.raises(ValueError):
+        parseProbeOutput({"streams": [{"index": 0, "codec_type": "audio"}]}, "input.mp3")
+
+
+def test_counted_packets_are_exact():
+    metadata = parseProbeOutput({"streams": [videoStream(nb_read_packets="241")]}, "input.mp4")
+    assert metadata.totalFrames == 241
+    assert metadata.exactFrameCount
+
+
+def test_matroska_frame_count_tag():
+    stream = videoStream(tags={"NUMBER_OF_FRAMES-eng": "1234"})
+    del stream["nb_frames"]
+    assert parseProbeOutput({"streams": [stream]}, "input.mkv").totalFrames == 1234
+
+
+def test_frame_count_from_duration():
+    stream = videoStream(avg_frame_rate="25/1", r_frame_rate="25/1", duration="4.0")
+    del stream["nb_frames"]
+    assert parseProbeOutput({"streams": [stream]}, "input.webm").totalFrames == 100
+
+
+def test_missing_average_frame_rate_falls_back_to_the_real_one():
+    stream = videoStream(avg_frame_rate="0/0", r_frame_rate="30/1")
+    metadata = parseProbeOutput({"streams": [stream]}, "input.mp4")
+    assert metadata.fps == 30.0
+    assert not metadata.isVFR
+
+
+def test_variable_frame_rate():
+    stream = videoStream(avg_frame_rate="2997/100", r_frame_rate="60/1")
+    assert parseProbeOutput({"streams": [stream]}, "input.mp4").isVFR
+
+
+def test_audio_and_subtitle_streams():
+    probe = {
+        "streams": [
+            videoStream(),
+            {"index": 1, "codec_type": "audio", "codec_name": "aac", "channels": 2, "tags": {"language": "eng"}},
+            {"index": 2, "codec_type": "subtitle", "codec_name": "subrip", "tags": {"title": "Signs"}},
+        ],
+        "format": {"bit_rate": "5000000"},
+    }
+    metadata = parseProbeOutput(probe, "input.mkv")
+    assert metadata.bitrate == 5000000
+    assert [(s.index, s.codec, s.language, s.channels) for s in metadata.audioStreams] == [(1, "aac", "eng", 2)]
+    assert [(s.index, s.title) for s in metadata.subtitleStreams] == [(2, "Signs")]
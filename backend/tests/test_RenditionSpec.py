@@ -0,0 +1,30 @@
+import pytest
+
+from src.FFmpeg import RenditionSpec
+
+
+def test_output_only():
+    assert RenditionSpec.fromString("output=small.mp4") == RenditionSpec("small.mp4")
+
+
+def test_every_setting():
+    spec = RenditionSpec.fromString(
+        "output=small.mp4, encoder=x265, crf=28, resolution=1280x720"
+    )
+    assert spec == RenditionSpec(
+        outputFile="small.mp4", video_encoder_preset="x265", crf="28", resolution="1280x720"
+    )
+
+
+def test_values_can_contain_equals_signs():
+    assert RenditionSpec.fromString("output=a=b.mp4").outputFile == "a=b.mp4"
+
+
+def test_unknown_setting():
+    with pytest.raises(ValueError):
+        RenditionSpec.fromString("output=small.mp4,bitrate=5M")
+
+
+def test_output_is_required():
+    with pytest.raises(ValueError):
+        RenditionSpec.fromString("crf=28")
@@ -0,0 +1,65 @@
+from fractions import Fraction
+
+from src.SegmentedRender import planSegments
+from src.utils.MediaProbe import PacketTimestamps
+
+
+def packets(frameCount: int, keyframeInterval: int) -> PacketTimestamps:
+    return PacketTimestamps(
+        pts=[i * 1001 for i in range(frameCount)],
+        keyframeIndexes=list(range(0, frameCount, keyframeInterval)),
+        timeBase=Fraction(1, 24000),
+        startTime=0.0,
+    )
+
+
+def assertCovers(plan, startFrame, endFrame):
+    """The segments are contiguous and cover every frame of the range exactly once"""
+    assert plan[0][0] == startFrame
+    for (start, count), (nextStart, _) in zip(plan, plan[1:]):
+        assert start + count == nextStart
+    assert plan[-1][0] + plan[-1][1] == endFrame
+    assert all(count > 0 for _, count in plan)
+
+
+def test_segments_start_on_keyframes():
+    video = packets(100, 10)
+    plan = planSegments(video, 4)
+    assertCovers(plan, 0, 100)
+    assert len(plan) == 4
+    assert all(start in video.keyframeIndexes for start, _ in plan)
+
+
+def test_no_keyframe_inside_the_range():
+    assert planSegments(packets(100, 1000), 4) == [(0, 100)]
+
+
+def test_fewer_keyframes_than_segments():
+    plan = planSegments(packets(100, 50), 8)
+    assert plan == [(0, 50), (50, 50)]
+
+
+def test_one_segment():
+    assert planSegments(packets(100, 10), 1) == [(0, 100)]
+
+
+def test_frame_range():
+    video = packets(100, 10)
+    plan = planSegments(video, 3, startFrame=15, endFrame=85)
+    assertCovers(plan, 15, 85)
+    # only the first segment can start between keyframes
+    assert all(start in video.keyframeIndexes for start, _ in plan[1:])
+
+
+def test_keyframes_on_the_range_bounds_are_not_split_points():
+    # a segment starting on endFrame would be empty, one on startFrame would duplicate the first
+    plan = planSegments(packets(100, 10), 2, startFrame=10, endFrame=20)
+    assert plan == [(10, 10)]
+
+
+def test_time_of_a_frame():
+    video = PacketTimestamps(
+        pts=[2002, 3003, 4004], keyframeIndexes=[0], timeBase=Fraction(1, 24000), startTime=2002 / 24000
+    )
+    assert video.timeOf(0) == 0.0
+    assert abs(video.timeOf(2) - 2002 / 24000) < 1e-9
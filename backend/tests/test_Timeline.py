@@ -0,0 +1,64 @@
+import math
+from fractions import Fraction
+
+import pytest
+
+from src.utils.Timeline import OutputTimeline
+
+
+def simulatedFrameCount(factor: Fraction, start: int, end: int) -> int:
+    """Counts the output frames j / factor that land between input frames start and end"""
+    return sum(start <= Fraction(j) / factor <= end for j in range(math.ceil((end + 1) * factor) + 1))
+
+
+def test_output_times():
+    assert OutputTimeline(2).outputTimes(0, 2) == [Fraction(1, 2), 1, Fraction(3, 2), 2]
+    assert OutputTimeline(2.5).outputTimes(0, 2) == [Fraction(2, 5), Fraction(4, 5), Fraction(6, 5), Fraction(8, 5), 2]
+    assert OutputTimeline(2.5).outputTimes(3, 3) == []
+
+
+def test_factor_is_exact():
+    assert OutputTimeline(2.5).factor == Fraction(5, 2)
+    assert OutputTimeline(1 / 3).factor == Fraction(1, 3)
+
+
+@pytest.mark.parametrize("interpolateFactor", [1, 2, 2.5, 3, 1 / 3])
+@pytest.mark.parametrize("totalInputFrames", [1, 2, 7, 100])
+def test_frame_count(interpolateFactor, totalInputFrames):
+    timeline = OutputTimeline(interpolateFactor)
+    count = timeline.frameCount(0, totalInputFrames - 1)
+    assert count == 1 + math.floor((totalInputFrames - 1) * timeline.factor)
+    assert count == simulatedFrameCount(timeline.factor, 0, totalInputFrames - 1)
+
+
+@pytest.mark.parametrize("interpolateFactor", [2, 2.5, 3])
+@pytest.mark.parametrize("split", [1, 3, 4, 50])
+def test_segments_add_up_to_the_whole(interpolateFactor, split):
+    # the segment before the split stops before the frame on it, the next segment writes it
+    timeline = OutputTimeline(interpolateFactor)
+    first = timeline.frameCount(0, split, writeEnd=False)
+    second = timeline.frameCount(split, 99)
+    assert first + second == timeline.frameCount(0, 99)
+
+
+@pytest.mark.parametrize("interpolateFactor", [2, 2.5])
+def test_resume_does_not_write_the_overlapping_frame_again(interpolateFactor):
+    # resuming decodes the last written frame again, its output was already written
+    timeline = OutputTimeline(interpolateFactor)
+    written = timeline.frameCount(0, 40)
+    resumed = timeline.frameCount(40, 99, writeStart=False)
+    assert written + resumed == timeline.frameCount(0, 99)
+
+
+def test_on_grid():
+    timeline = OutputTimeline(2.5)
+    assert timeline.isOnGrid(0)
+    assert not timeline.isOnGrid(1)
+    assert timeline.isOnGrid(2)
+    assert OutputTimeline(2).isOnGrid(1)
+
+
+def test_empty_range():
+    assert OutputTimeline(2).frameCount(5, 4) == 0
+    assert OutputTimeline(2).frameCount(5, 5) == 1
+    assert OutputTimeline(2).frameCount(5, 5, writeStart=False) == 0
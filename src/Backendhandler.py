@@ -1,7 +1,14 @@
 import os
 import sys
 
-from .constants import BACKEND_PATH, PYTHON_PATH, PLATFORM, IS_INSTALLED, IS_FLATPAK
+from .constants import (
+    BACKEND_PATH,
+    PYTHON_PATH,
+    FFPROBE_PATH,
+    PLATFORM,
+    IS_INSTALLED,
+    IS_FLATPAK,
+)
 from .Util import (
     log,
     networkCheck,
@@ -72,6 +79,7 @@ class BackendHandler:
             if networkCheck():
                 # Dont flip these due to shitty code!
                 downloadDependencies.downloadFFMpeg()
+                downloadDependencies.downloadFFProbe()
                 downloadDependencies.downloadPython()
                 if PLATFORM == "win32":
                     downloadDependencies.downloadVCREDLIST()
@@ -80,6 +88,16 @@ class BackendHandler:
                     "Cannot install required dependencies!\nThe first launch of the app requires internet."
                 )
                 sys.exit()
+        elif not os.path.isfile(FFPROBE_PATH) and networkCheck():
+            # installs from before ffprobe was shipped
+            downloadDependencies.downloadFFProbe()
+        if not os.path.isfile(FFPROBE_PATH):
+            from .ui.QTcustom import RegularQTPopup
+
+            log(f"ffprobe is missing from {FFPROBE_PATH}")
+            RegularQTPopup(
+                "FFProbe could not be installed!\nVideos will be opened with OpenCV, frame counts may be inaccurate and segmented renders will not work."
+            )
 
     def recursivlyCheckIfDepsOnFirstInstallToMakeSureUserHasInstalledAtLeastOneBackend(
         self, firstIter=True
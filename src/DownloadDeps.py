@@ -2,6 +2,7 @@ from .constants import (
     PLATFORM,
     PYTHON_PATH,
     FFMPEG_PATH,
+    FFPROBE_PATH,
     BACKEND_PATH,
     TEMP_DOWNLOAD_PATH,
     CWD,
@@ -155,6 +156,26 @@ class DownloadDependencies:
         move(ffmpegTempPath, FFMPEG_PATH)
         removeFolder(TEMP_DOWNLOAD_PATH)
 
+    def downloadFFProbe(self):
+        createDirectory(TEMP_DOWNLOAD_PATH)
+        ffprobeTempPath = os.path.join(TEMP_DOWNLOAD_PATH, "ffprobe")
+        link = "https://github.com/TNTwise/real-video-enhancer-models/releases/download/models/"
+        match PLATFORM:
+            case "linux":
+                link += "ffprobe"
+            case "win32":
+                link += "ffprobe.exe"
+            case "darwin":
+                link += "ffprobe-macos-bin"
+        log("Downloading FFProbe")
+        DownloadProgressPopup(
+            link=link, downloadLocation=ffprobeTempPath, title="Downloading FFProbe"
+        )
+        # give executable permissions to ffprobe
+        makeExecutable(ffprobeTempPath)
+        move(ffprobeTempPath, FFPROBE_PATH)
+        removeFolder(TEMP_DOWNLOAD_PATH)
+
     def pip(
         self,
         deps: list,
@@ -1,17 +1,91 @@
+import os
+import json
+import subprocess
+from fractions import Fraction
 import cv2
 
+from .constants import FFPROBE_PATH
+from .Util import log
+
+
+def probeVideo(inputFile: str) -> dict:
+    """
+    Returns the ffprobe json of the file, the backend parses it again with its own probe when rendering.
+    """
+    if not os.path.isfile(FFPROBE_PATH):
+        raise FileNotFoundError(f"ffprobe not found at {FFPROBE_PATH}")
+    output = subprocess.run(
+        [
+            FFPROBE_PATH,
+            "-v",
+            "error",
+            "-print_format",
+            "json",
+            "-show_format",
+            "-show_streams",
+            inputFile,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout)
+
 
 class VideoLoader:
     def __init__(self, inputFile):
         self.inputFile = inputFile
+        self.metadata: dict | None = None
+        self.videoStream: dict | None = None
+        self.capture = None
 
     def loadVideo(self):
+        try:
+            self.metadata = probeVideo(self.inputFile)
+            self.videoStream = next(
+                (
+                    s
+                    for s in self.metadata.get("streams", [])
+                    if s.get("codec_type") == "video"
+                    and not s.get("disposition", {}).get("attached_pic", 0)
+                ),
+                None,
+            )
+            return
+        except Exception as e:
+            log(f"ffprobe failed, falling back to opencv: {e}")
         self.capture = cv2.VideoCapture(self.inputFile, cv2.CAP_FFMPEG)
 
     def isValidVideo(self):
+        if self.metadata is not None:
+            return self.videoStream is not None
         return self.capture.isOpened()
 
     def getData(self):
+        if self.metadata is not None:
+            streams = self.metadata.get("streams", [])
+            video = self.videoStream
+            fmt = self.metadata.get("format", {})
+            self.width = int(video["width"])
+            self.height = int(video["height"])
+            self.bitrate = (
+                int(video.get("bit_rate", fmt.get("bit_rate", 0)) or 0) // 1000
+            )  # opencv reports kbps
+            self.videoContainer = self.inputFile.split(".")[-1]
+            self.codec_str = video.get("codec_name", "unknown")
+            frameRate = video.get("avg_frame_rate", "0/0")
+            if frameRate.endswith("/0"):
+                frameRate = video.get("r_frame_rate", "0/1")
+            self.fps = float(Fraction(frameRate))
+            self.duration = float(video.get("duration", fmt.get("duration", 0.0)))
+            self.total_frames = int(
+                video.get("nb_frames", round(self.duration * self.fps))
+            )
+            self.audioStreams = [s for s in streams if s.get("codec_type") == "audio"]
+            self.subtitleStreams = [
+                s for s in streams if s.get("codec_type") == "subtitle"
+            ]
+            return
         self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.bitrate = int(self.capture.get(cv2.CAP_PROP_BITRATE))
@@ -27,4 +101,6 @@ class VideoLoader:
         self.total_frames = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = self.capture.get(cv2.CAP_PROP_FPS)
         self.duration = self.total_frames / self.fps
+        self.audioStreams = []
+        self.subtitleStreams = []
         self.capture.release()
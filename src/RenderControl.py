@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from threading import Thread, Lock
+from multiprocessing.connection import Client, Connection
+
+from .Util import log
+
+
+def getControlAddress(name: str) -> str:
+    """
+    A unix domain socket path, or a named pipe on windows, passed to the backend with --control_address.
+    multiprocessing.connection picks the socket family from the form of the address.
+    """
+    if sys.platform == "win32":
+        return rf"\\.\pipe\rve_control_{name}"
+    return os.path.join(tempfile.gettempdir(), f"rve_control_{name}.sock")
+
+
+class RenderControlClient:
+    """
+    Connects to the control server of a render backend, sends it commands and passes its JSON events to onEvent.
+    The backend only starts listening once its models are loaded, so connecting is retried until isAlive returns False,
+    commands sent with queueUntilConnected before that are sent once connected.
+    """
+
+    def __init__(self, address: str, onEvent, isAlive):
+        self.address = address
+        self.onEvent = onEvent
+        self.isAlive = isAlive
+        self.connection: Connection | None = None
+        self.connecting = True
+        self.pendingCommands: list[bytes] = []
+        self.sendLock = Lock()
+        self.thread = Thread(target=self.receiveEvents, daemon=True)
+        self.thread.start()
+
+    def connect(self) -> bool:
+        while self.isAlive():
+            try:
+                connection = Client(self.address)
+            except (FileNotFoundError, ConnectionRefusedError, OSError):
+                time.sleep(0.1)
+                continue
+            log(f"Connected to render control at {self.address}")
+            with self.sendLock:
+                self.connection = connection
+                self.connecting = False
+                try:
+                    for message in self.pendingCommands:
+                        connection.send_bytes(message)
+                except (OSError, ValueError):
+                    pass
+                self.pendingCommands.clear()
+            return True
+        with self.sendLock:
+            self.connecting = False
+            self.pendingCommands.clear()
+        return False
+
+    def receiveEvents(self):
+        if not self.connect():
+            return
+        while True:
+            try:
+                event = json.loads(self.connection.recv_bytes())
+            except (EOFError, OSError):
+                break
+            self.onEvent(event)
+            if event.get("event") == "done":
+                break
+        self.close()
+
+    def send(self, command: str, queueUntilConnected: bool = False, **arguments) -> bool:
+        """
+        Returns False if the command was not sent.
+        With queueUntilConnected, a command sent while the backend is still loading is kept and sent once it listens.
+        """
+        message = json.dumps({"command": command, **arguments}).encode()
+        with self.sendLock:
+            if self.connection is None:
+                if queueUntilConnected and self.connecting:
+                    self.pendingCommands.append(message)
+                    return True
+                return False
+            try:
+                self.connection.send_bytes(message)
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
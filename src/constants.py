@@ -29,6 +29,11 @@ FFMPEG_PATH = (
     if PLATFORM == "win32"
     else os.path.join(CWD, "bin", "ffmpeg")
 )
+FFPROBE_PATH = (
+    os.path.join(CWD, "bin", "ffprobe.exe")
+    if PLATFORM == "win32"
+    else os.path.join(CWD, "bin", "ffprobe")
+)
 PYTHON_PATH = (
     os.path.join(CWD, "python", "python", "python.exe")
     if PLATFORM == "win32"
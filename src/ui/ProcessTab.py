@@ -1,7 +1,6 @@
 import subprocess
 import os
 from threading import Thread
-import re
 import time
 
 from PySide6 import QtGui
@@ -17,11 +16,11 @@ from .QTcustom import (
 )
 from ..constants import BACKEND_PATH, PYTHON_PATH, MODELS_PATH, CUSTOM_MODELS_PATH
 from ..Util import (
-    currentDirectory,
     log,
     errorAndLog,
 )
 from ..DownloadModels import DownloadModel
+from ..RenderControl import RenderControlClient, getControlAddress
 from .SettingsTab import Settings
 from ..DiscordRPC import DiscordRPC
 from ..ModelHandler import (
@@ -142,21 +141,28 @@ class ProcessTab:
         self.parent.killRenderButton.clicked.connect(self.killRenderProcess)
 
     def killRenderProcess(self):
-        try:  # kills  render process if necessary
-            self.renderProcess.terminate()
-        except AttributeError:
+        renderProcess = getattr(self, "renderProcess", None)
+        if renderProcess is None:
             log("No render process!")
+            return
+        # cancelling lets the backend close the encoders, terminate if it is not listening yet
+        controlClient = getattr(self, "controlClient", None)
+        if controlClient is None or not controlClient.send("cancel"):
+            renderProcess.terminate()
 
     def pauseRender(self):
-        with open(self.pausedFile, "w") as f:
-            f.write("True")
+        # the backend only listens once the models are loaded, until then the command waits in the client
+        if not self.controlClient.send("pause", queueUntilConnected=True):
+            log("Could not pause, the render is not running")
+            return
         hide_layout_widgets(self.parent.onRenderButtonsContiainer)
         self.parent.startRenderButton.setVisible(True)
         self.parent.startRenderButton.setEnabled(True)
 
     def resumeRender(self):
-        with open(self.pausedFile, "w") as f:
-            f.write("False")
+        if not self.controlClient.send("resume", queueUntilConnected=True):
+            log("Could not resume, the render is not running")
+            return
         show_layout_widgets(self.parent.onRenderButtonsContiainer)
         self.parent.onRenderButtonsContiainer.setEnabled(True)
         self.parent.startRenderButton.setVisible(False)
@@ -270,9 +276,7 @@ class ProcessTab:
         self.outputVideoHeight = videoHeight * upscaleTimes
 
         # set up pausing
-        self.pausedFile = os.path.join(
-            currentDirectory(), os.path.basename(inputFile) + "_pausedState.txt"
-        )
+        self.controlAddress = getControlAddress(str(os.getpid()))
         show_layout_widgets(self.parent.onRenderButtonsContiainer)
         self.parent.startRenderButton.setVisible(False)
         self.parent.startRenderButton.clicked.disconnect()
@@ -343,8 +347,8 @@ class ProcessTab:
             f"{self.qualityToCRF[self.settings['video_quality']]}",
             "--tensorrt_opt_profile",
             f"{self.settings['tensorrt_optimization_level']}",
-            "--paused_file",
-            f"{self.pausedFile}",
+            "--control_address",
+            f"{self.controlAddress}",
         ]
 
         if upscaleModelFile:
@@ -415,6 +419,11 @@ class ProcessTab:
             stderr=subprocess.STDOUT,
             universal_newlines=True,
         )
+        self.controlClient = RenderControlClient(
+            self.controlAddress,
+            onEvent=self.onRenderEvent,
+            isAlive=lambda: self.renderProcess.poll() is None,
+        )
         textOutput = []
         for line in iter(self.renderProcess.stdout.readline, b""):
             if self.renderProcess.poll() is not None:
@@ -437,9 +446,6 @@ class ProcessTab:
                 textOutput = textOutput[
                     :-1
                 ]  # slice the list to only get the last updated data
-                self.currentFrame = int(
-                    re.search(r"Current Frame: (\d+)", line).group(1)
-                )
             if any(char.isalpha() for char in line):
                 textOutput.append(line)
             # self.setRenderOutputContent(textOutput)
@@ -451,6 +457,17 @@ class ProcessTab:
                 log(line)
         self.onRenderCompletion()
 
+    def onRenderEvent(self, event: dict):
+        """
+        Called from the control client thread for every status event the backend pushes
+        """
+        if event.get("event") == "progress":
+            self.currentFrame = event["framesRendered"]
+            if "preview" in event:
+                self.workerThread.setPreviewResolution(
+                    event["preview"]["width"], event["preview"]["height"]
+                )
+
     def guiChangesOnRenderCompletion(self):
         # Have to swap the visibility of these here otherwise crash for some reason
         hide_layout_widgets(self.parent.onRenderButtonsContiainer)
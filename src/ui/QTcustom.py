@@ -106,21 +106,27 @@ class UpdateGUIThread(QThread):
                 self.shm = shared_memory.SharedMemory(
                     name=self.imagePreviewSharedMemoryID
                 )
-                image_bytes = self.shm.buf[
-                    : self.outputVideoHeight * self.outputVideoWidth * 3
-                ].tobytes()
+                with QMutexLocker(self._mutex):
+                    height, width = self.outputVideoHeight, self.outputVideoWidth
+                image_bytes = self.shm.buf[: height * width * 3].tobytes()
 
                 # Convert image bytes back to numpy array
                 image_array = np.frombuffer(image_bytes, dtype=np.uint8).reshape(
-                    (self.outputVideoHeight, self.outputVideoWidth, 3)
+                    (height, width, 3)
                 )
                 pixmap = self.convert_cv_qt(image_array)
                 self.latestPreviewPixmap.emit(pixmap)
-            except FileNotFoundError:
+            except (FileNotFoundError, ValueError):
                 # print("preview not available")
                 self.latestPreviewPixmap.emit(None)
             time.sleep(0.2)
 
+    def setPreviewResolution(self, width: int, height: int):
+        """The backend reports the size of the frames it writes, which can differ from the upscaled input size"""
+        with QMutexLocker(self._mutex):
+            self.outputVideoWidth = width
+            self.outputVideoHeight = height
+
     def convert_cv_qt(self, cv_img):
         """Convert from an opencv image to QPixmap"""
         # rgb_image = cv2.resize(cv_img, (1280, 720)) #Cound resize image if need be